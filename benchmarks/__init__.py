@@ -0,0 +1 @@
+"""Benchmarks for the bot hot paths. Each module is runnable with `python -m benchmarks.<name>`."""
@@ -0,0 +1,64 @@
+"""
+Cost of the ETA date and hour keyboards per tap: time to get the markup and its size on the wire.
+
+Compares the cached booking window calendar with rendering it on every tap and, when
+`aiogram3_calendar` is installed, with the full month calendar the bot used before.
+
+Usage:
+    python -m benchmarks.calendar [--calls 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date
+
+from tgbot.handlers.route import eta_calendar, eta_hours
+
+try:
+    from aiogram3_calendar import SimpleCalendar
+except ImportError:
+    SimpleCalendar = None
+
+
+def payload_size(markup) -> int:
+    """Size of the markup as sent to Telegram, in bytes."""
+    return len(json.dumps(markup.model_dump(exclude_none=True), ensure_ascii=False).encode())
+
+
+async def measure(get_markup, calls: int) -> float:
+    """Return the mean cost of getting the markup, in microseconds."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        markup = get_markup()
+        if asyncio.iscoroutine(markup):
+            await markup
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def main(calls: int) -> None:
+    today = date.today()
+    candidates = {
+        "window, cached": lambda: eta_calendar.markup("ru", today),
+        "window, rendered": lambda: eta_calendar._render("ru", today),
+        "hours, cached": lambda: eta_hours.markup("ru", date.max),
+        "hours, rendered": lambda: eta_hours._render("ru", eta_hours.first),
+    }
+    if SimpleCalendar is not None:
+        candidates["full month"] = lambda: SimpleCalendar().start_calendar()
+
+    print(f"{'keyboard':<17} | {'us/tap':>8} | {'bytes':>6}")
+    for name, get_markup in candidates.items():
+        cost = await measure(get_markup, calls)
+        markup = get_markup()
+        if asyncio.iscoroutine(markup):
+            markup = await markup
+        print(f"{name:<17} | {cost:>8.2f} | {payload_size(markup):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -0,0 +1,106 @@
+"""
+Per-message dispatch cost of reply keyboard button taps, with and without the dispatch index.
+
+A synthetic bot is built with one router per button (like the real handlers, each filtering
+on its label in every language) and a catch-all fallback at the end. The cost is measured
+for the last registered button, which is the worst case for the router walk, and for
+unmatched text, which ends at the fallback.
+
+Usage:
+    python -m benchmarks.dispatch_index [--updates 2000]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import Update
+
+from tgbot.middlewares.dispatch_index import DispatchIndexMiddleware
+from tgbot.services.dispatch_index import DispatchIndex
+
+LANGUAGES = (2, 5, 10)
+BUTTONS = (4, 16, 64)
+
+
+async def _noop(message) -> None:
+    return None
+
+
+def build_dispatcher(languages: int, buttons: int):
+    """Return a dispatcher with `buttons` button routers and the labels in every language."""
+    dp = Dispatcher()
+    labels = []
+    for button in range(buttons):
+        button_labels = [f"Button {button} ({language})" for language in range(languages)]
+        labels.extend(button_labels)
+        router = Router()
+        router.message.register(_noop, F.text.in_(button_labels))
+        dp.include_router(router)
+
+    fallback = Router()
+    fallback.message.register(_noop)
+    dp.include_router(fallback)
+    return dp, labels
+
+
+def make_update(bot: Bot, update_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(datetime.now(timezone.utc).timestamp()),
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 1, "is_bot": False, "first_name": "Driver"},
+                "text": text,
+            },
+        },
+        context={"bot": bot},
+    )
+
+
+async def measure(dp: Dispatcher, bot: Bot, update: Update, updates: int) -> float:
+    """Return the mean cost of feeding the update, in microseconds."""
+    started = time.perf_counter()
+    for _ in range(updates):
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / updates * 1_000_000
+
+
+async def main(updates: int) -> None:
+    logging.disable(logging.INFO)
+    bot = Bot(token="123456:BENCHMARK")
+
+    print(f"{'langs':>5} {'buttons':>7} | {'walk, last':>10} {'index, last':>11} | "
+          f"{'walk, miss':>10} {'index, miss':>11}  (us/update)")
+    for languages in LANGUAGES:
+        for buttons in BUTTONS:
+            plain, labels = build_dispatcher(languages, buttons)
+            indexed, _ = build_dispatcher(languages, buttons)
+            index = DispatchIndex(labels)
+            await index.compile(indexed)
+            indexed.message.outer_middleware(DispatchIndexMiddleware(index))
+
+            last = make_update(bot, 1, labels[-1])
+            miss = make_update(bot, 2, "free text")
+            results = [
+                await measure(plain, bot, last, updates),
+                await measure(indexed, bot, last, updates),
+                await measure(plain, bot, miss, updates),
+                await measure(indexed, bot, miss, updates),
+            ]
+            print(f"{languages:>5} {buttons:>7} | {results[0]:>10.1f} {results[1]:>11.1f} | "
+                  f"{results[2]:>10.1f} {results[3]:>11.1f}")
+
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000, help="updates fed per measurement")
+    args = parser.parse_args()
+    asyncio.run(main(args.updates))
@@ -0,0 +1,238 @@
+"""
+End-to-end throughput: the real Dispatcher, routers and middlewares against the stand-in backend.
+
+Builds the dispatcher the way bot.py does - routers_list, register_global_middlewares,
+the dispatch index, the terminal catalog and the bounded memory FSM storage - and feeds
+it synthetic updates with Dispatcher.feed_update. Bot API calls go to a session that
+answers locally; backend calls go over HTTP to an in-process stand-in.
+
+Scenarios, each run by `--drivers` drivers at once, `--concurrency` updates in flight:
+    location   one live location, then `--edits` edits of it
+    route      the route flow: add route, terminal, date, hour, container, size, type
+    terminals  the terminal list, a terminal's details and back to the list
+
+Reports updates per second, p50/p99 latency of feed_update and backend calls per update.
+
+Usage:
+    python -m benchmarks.end_to_end [--drivers 1000] [--scenarios location route terminals]
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update, User
+
+from bot import register_global_middlewares
+from infrastructure.some_api.api import MyApi
+from infrastructure.standin.server import Latency, StandinSettings, running_standin
+from tgbot.config import Config, Miscellaneous, TgBot
+from tgbot.handlers import routers_list
+from tgbot.keyboards.reply import button_label, reply_button_labels
+from tgbot.services.api_hooks import ApiRequestHooks
+from tgbot.services.dispatch_index import DispatchIndex
+from tgbot.services.i18n import catalog
+from tgbot.services.metrics import LatencyRecorder
+from tgbot.services.terminal_catalog import TerminalCatalog
+from tgbot.storage.memory import BoundedMemoryStorage
+
+TOKEN = "42:BENCHMARKBENCHMARKBENCHMARKBENCHMARK"
+FIRST_DRIVER = 1_000_000
+
+
+class LocalSession(BaseSession):
+    """Bot session that answers every Bot API call locally, as Telegram would."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def make_request(self, bot: Bot, method, timeout=None) -> Any:
+        self.calls += 1
+        if type(method).__name__ == "GetMe":
+            return User(id=42, is_bot=True, first_name="bot", username="bot")
+        if "Message" in str(method.__returning__):
+            chat_id = getattr(method, "chat_id", None) or 1
+            return Message(
+                message_id=1,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=chat_id, type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+
+class Updates:
+    """Builds raw updates with increasing ids."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+
+    def _message(self, driver: int, **fields: Any) -> Dict[str, Any]:
+        return {
+            "message_id": next(self.ids),
+            "date": int(time.time()),
+            "chat": {"id": driver, "type": "private"},
+            "from": {"id": driver, "is_bot": False, "first_name": "Driver"},
+            **fields,
+        }
+
+    def text(self, driver: int, text: str) -> Dict[str, Any]:
+        return {"update_id": next(self.ids), "message": self._message(driver, text=text)}
+
+    def location(self, driver: int, step: int, edit: bool = False) -> Dict[str, Any]:
+        location = {"latitude": 41.3 + step / 10000, "longitude": 69.2, "live_period": 900}
+        message = self._message(driver, location=location)
+        if edit:
+            message["edit_date"] = message["date"]
+            return {"update_id": next(self.ids), "edited_message": message}
+        return {"update_id": next(self.ids), "message": message}
+
+    def callback(self, driver: int, data: str) -> Dict[str, Any]:
+        return {
+            "update_id": next(self.ids),
+            "callback_query": {
+                "id": str(next(self.ids)),
+                "chat_instance": "benchmark",
+                "data": data,
+                "from": {"id": driver, "is_bot": False, "first_name": "Driver"},
+                "message": self._message(driver, text="menu"),
+            },
+        }
+
+
+def language(driver: int) -> str:
+    # The stand-in gives odd drivers Russian, even ones Uzbek
+    return ("uz", "ru")[driver % 2]
+
+
+def location_steps(updates: Updates, driver: int, edits: int) -> List[Dict[str, Any]]:
+    steps = [updates.location(driver, 0)]
+    steps += [updates.location(driver, step, edit=True) for step in range(1, edits + 1)]
+    return steps
+
+
+def route_steps(updates: Updates, driver: int, edits: int) -> List[Dict[str, Any]]:
+    tomorrow = date.today().toordinal() + 1
+    return [
+        updates.text(driver, button_label(language(driver), "add_route")),
+        updates.callback(driver, "T01"),
+        updates.callback(driver, f"d:{tomorrow}"),
+        updates.callback(driver, "h:9"),
+        updates.text(driver, "ABCD1234567"),
+        updates.callback(driver, "size_40"),
+        updates.callback(driver, "laden"),
+    ]
+
+
+def terminal_steps(updates: Updates, driver: int, edits: int) -> List[Dict[str, Any]]:
+    return [
+        updates.text(driver, button_label(language(driver), "terminal")),
+        updates.callback(driver, "terminal:1"),
+        updates.callback(driver, "back_terminals"),
+    ]
+
+
+SCENARIOS = {"location": location_steps, "route": route_steps, "terminals": terminal_steps}
+
+
+async def build_dispatcher(api_client: MyApi) -> Dispatcher:
+    config = Config(tg_bot=TgBot(token=TOKEN, admin_ids=[], use_redis=False), misc=Miscellaneous())
+    dp = Dispatcher(storage=BoundedMemoryStorage())
+    dp.include_routers(*routers_list)
+    catalog.compile()
+    dispatch_index = DispatchIndex(reply_button_labels())
+    await dispatch_index.compile(dp, config=config)
+    register_global_middlewares(
+        dp,
+        config,
+        api_client,
+        dispatch_index=dispatch_index,
+        terminal_catalog=TerminalCatalog(api_client),
+    )
+    return dp
+
+
+async def run_scenario(
+    dp: Dispatcher, bot: Bot, steps, drivers: int, edits: int, concurrency: int
+) -> Dict[str, Any]:
+    updates = Updates()
+    latency = LatencyRecorder(window=drivers * 16)
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def feed(raw: Dict[str, Any]) -> None:
+        nonlocal errors
+        update = Update.model_validate(raw, context={"bot": bot})
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+            latency.observe(time.perf_counter() - started)
+
+    async def driver(number: int) -> None:
+        for raw in steps(updates, number, edits):
+            await feed(raw)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(driver(FIRST_DRIVER + number) for number in range(drivers)))
+    elapsed = time.perf_counter() - started
+    return {
+        "updates": latency.count,
+        "rate": latency.count / elapsed,
+        **latency.percentiles((50, 99)),
+        "errors": errors,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = StandinSettings(latency=Latency(args.median, args.p99), terminals=args.terminals)
+    async with running_standin(settings) as (url, backend):
+        api_client = MyApi(base_url=url, hooks=ApiRequestHooks())
+        dp = await build_dispatcher(api_client)
+        bot = Bot(TOKEN, session=LocalSession())
+
+        print(
+            f"{'scenario':<10} | {'updates':>7} | {'updates/s':>9} | {'p50 ms':>7} | "
+            f"{'p99 ms':>7} | {'calls/upd':>9} | {'errors':>6}"
+        )
+        for name in args.scenarios:
+            calls_before = sum(backend.requests.values())
+            result = await run_scenario(
+                dp, bot, SCENARIOS[name], args.drivers, args.edits, args.concurrency
+            )
+            calls = sum(backend.requests.values()) - calls_before
+            print(
+                f"{name:<10} | {result['updates']:>7} | {result['rate']:>9.0f} | "
+                f"{result['p50'] * 1000:>7.1f} | {result['p99'] * 1000:>7.1f} | "
+                f"{calls / max(result['updates'], 1):>9.2f} | {result['errors']:>6}"
+            )
+        print(f"routes created: {len(backend.routes)}, Bot API calls: {bot.session.calls}")
+        await api_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=1000, help="drivers per scenario")
+    parser.add_argument("--edits", type=int, default=5, help="live location edits per driver")
+    parser.add_argument("--concurrency", type=int, default=200, help="updates in flight")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--median", type=float, default=0.005, help="backend median latency, s")
+    parser.add_argument("--p99", type=float, default=0.03, help="backend p99 latency, s")
+    parser.add_argument("--terminals", type=int, default=12, help="terminals the backend lists")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""
+FSM data footprint per active user: loose keys versus drafts.
+
+For a driver halfway through each flow the FSM data is built the way the handlers used
+to store it - loose keys, with a copy of the terminal map for route creation - and the
+way they store it now, as a draft. Reports the bytes a user holds in `MemoryStorage`,
+measured with tracemalloc, and the bytes written to Redis: JSON before, the codec after.
+
+Usage:
+    python -m benchmarks.fsm_footprint [--users 5000] [--terminals 12]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from tgbot.services.route_draft import RouteDraft
+from tgbot.storage import codec
+from tgbot.storage.drafts import RegistrationDraft, TrackingDraft
+
+
+def loose_route(user_id: int, terminals: int) -> dict:
+    return {
+        "language": "ru",
+        "truck_number": f"01W{user_id % 1000:03d}MC/106413BA",
+        "terminals": {f"Terminal {index:02d}": index for index in range(terminals)},
+        "selected_terminal_id": 3,
+        "selected_terminal_name": "Terminal 03",
+        "eta_date": "2026-10-20",
+        "eta_hour": "9",
+        "container_name": f"ABCD{user_id:07d}",
+    }
+
+
+def draft_route(user_id: int, terminals: int) -> dict:
+    draft = RouteDraft(
+        language="ru",
+        truck_number=f"01W{user_id % 1000:03d}MC/106413BA",
+        terminal_id=3,
+        terminal_name="Terminal 03",
+        eta_date="2026-10-20",
+        eta_hour="9",
+        container_name=f"ABCD{user_id:07d}",
+    )
+    return {RouteDraft.STATE_KEY: draft}
+
+
+def loose_registration(user_id: int, terminals: int) -> dict:
+    return {
+        "language": "uz",
+        "phone": f"+998901{user_id:06d}",
+        "first_name": "Aziz",
+        "last_name": "Karimov",
+    }
+
+
+def draft_registration(user_id: int, terminals: int) -> dict:
+    draft = RegistrationDraft("uz", f"+998901{user_id:06d}", "Aziz", "Karimov")
+    return {RegistrationDraft.STATE_KEY: draft}
+
+
+def loose_tracking(user_id: int, terminals: int) -> dict:
+    return {
+        "latitude": 41.311081 + user_id / 1e6,
+        "longitude": 69.240562,
+        "live_location_active": True,
+        "live_location_last_updated": datetime.now(timezone.utc),
+        "reminder_active": True,
+    }
+
+
+def draft_tracking(user_id: int, terminals: int) -> dict:
+    draft = TrackingDraft(True, 41.311081 + user_id / 1e6, 69.240562, time.time(), True)
+    return {TrackingDraft.STATE_KEY: draft}
+
+
+FLOWS = {
+    "route": (loose_route, draft_route),
+    "registration": (loose_registration, draft_registration),
+    "tracking": (loose_tracking, draft_tracking),
+}
+
+
+async def memory_per_user(build, users: int, terminals: int) -> float:
+    """Bytes each user adds to a MemoryStorage holding their state and data."""
+    storage = MemoryStorage()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for user_id in range(users):
+        key = StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+        await storage.set_state(key, "RouteCreationStates:waiting_for_container_name")
+        await storage.set_data(key, build(user_id, terminals))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / users
+
+
+def serialized_size(data: dict, dumps) -> int:
+    encoded = dumps(data)
+    return len(encoded.encode() if isinstance(encoded, str) else encoded)
+
+
+def json_dumps(data: dict) -> str:
+    # RedisStorage can't store the datetime the location handler kept, as str at best
+    return json.dumps(data, default=str)
+
+
+async def main(users: int, terminals: int) -> None:
+    print(f"{'flow':<13} | {'loose':>7} {'draft':>7} (memory, bytes/user) | "
+          f"{'json':>5} {'codec':>5} (stored, bytes/user)")
+    for name, (loose, draft) in FLOWS.items():
+        memory = [await memory_per_user(build, users, terminals) for build in (loose, draft)]
+        stored = (
+            serialized_size(loose(1, terminals), json_dumps),
+            serialized_size(draft(1, terminals), codec.dumps),
+        )
+        print(f"{name:<13} | {memory[0]:>7.0f} {memory[1]:>7.0f}                      | "
+              f"{stored[0]:>5} {stored[1]:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000, help="active users to store")
+    parser.add_argument("--terminals", type=int, default=12, help="terminals in the catalog")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.terminals))
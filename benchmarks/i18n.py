@@ -0,0 +1,75 @@
+"""
+Construction cost of the static reply keyboards, built on every reply versus once per language.
+
+For each keyboard the uncached builder (`__wrapped__`) is compared with the cached one:
+time per call, and the memory a reply holds on to while it is alive, measured with
+tracemalloc as the allocated blocks and bytes per call.
+
+Usage:
+    python -m benchmarks.i18n [--calls 5000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from tgbot.handlers import routers_list  # noqa: F401 - registers every translation namespace
+from tgbot.handlers.route import container_size_keyboard, container_type_keyboard
+from tgbot.handlers.support import support_cancel_keyboard
+from tgbot.keyboards.reply import main_menu_keyboard
+from tgbot.services.i18n import catalog
+
+KEYBOARDS = {
+    "main menu": main_menu_keyboard,
+    "support cancel": support_cancel_keyboard,
+    "container size": container_size_keyboard,
+    "container type": container_type_keyboard,
+}
+LANGUAGES = ("uz", "ru")
+
+
+def measure_time(build, calls: int) -> float:
+    """Return the mean cost of a call, in microseconds."""
+    started = time.perf_counter()
+    for index in range(calls):
+        build(LANGUAGES[index % len(LANGUAGES)])
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def measure_allocations(build, calls: int):
+    """Return the (blocks, bytes) per call that stay allocated while the results are alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [build(LANGUAGES[index % len(LANGUAGES)]) for index in range(calls)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del results
+    # The list holding the results is not part of a reply
+    list_size = 8 * calls
+    return max(blocks - 1, 0) / calls, max(size - list_size, 0) / calls
+
+
+def main(calls: int) -> None:
+    catalog.compile()
+    print(f"{'keyboard':<15} | {'built':>9} {'cached':>9} (us/call) | "
+          f"{'built':>12} {'cached':>12} (blocks, bytes/call)")
+    for name, keyboard in KEYBOARDS.items():
+        build = keyboard.__wrapped__
+        timings = measure_time(build, calls), measure_time(keyboard, calls)
+        built_blocks, built_bytes = measure_allocations(build, calls)
+        cached_blocks, cached_bytes = measure_allocations(keyboard, calls)
+        print(f"{name:<15} | {timings[0]:>9.2f} {timings[1]:>9.2f}           | "
+              f"{built_blocks:>5.0f} {built_bytes:>6.0f} {cached_blocks:>5.0f} {cached_bytes:>6.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000, help="calls per measurement")
+    args = parser.parse_args()
+    main(args.calls)
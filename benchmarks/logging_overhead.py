@@ -0,0 +1,124 @@
+"""
+Logging cost per live location update, as paid by the event loop.
+
+Every simulated update logs what the location handler logs: the [TRACKING] line with the
+coordinates and the backend response at DEBUG. The old way formats both with f-strings,
+writes synchronously and prints the response to stdout; the queued pipelines hand records
+to the listener thread, optionally rate limiting [TRACKING]. Output goes to /dev/null.
+Reports the time spent in the calling thread per update and the lines written.
+
+Usage:
+    python -m benchmarks.logging_overhead [--updates 20000]
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import time
+
+import betterlogging as bl
+
+from tgbot.services.log_pipeline import setup_queue_logging
+
+RESPONSE = {
+    "id": 123456,
+    "telegram_id": 700000001,
+    "latitude": 41.311081,
+    "longitude": 69.240562,
+    "horizontal_accuracy": 12.5,
+    "timestamp": "2025-01-01T12:00:00Z",
+    "is_live_period": True,
+    "truck": {"number": "01A123BC", "driver": "Driver", "terminals": list(range(20))},
+}
+
+
+class CountingStream:
+    """/dev/null that counts the lines written to it."""
+
+    def __init__(self):
+        self.file = open(os.devnull, "w")
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        self.lines += text.count("\n")
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def eager_update(logger: logging.Logger, step: int) -> None:
+    latitude, longitude = 41.3 + step * 1e-6, 69.2
+    logger.debug(f"Response data: {RESPONSE}")
+    print("Response data:", RESPONSE)
+    logger.info(
+        f"[TRACKING][EDIT] Live location updated: lat={latitude}, lon={longitude}, accuracy=12.5"
+    )
+
+
+def lazy_update(logger: logging.Logger, step: int) -> None:
+    latitude, longitude = 41.3 + step * 1e-6, 69.2
+    logger.debug("Response data: %s", RESPONSE)
+    logger.info(
+        "[TRACKING]%s Live location updated: lat=%s, lon=%s, accuracy=%s",
+        "[EDIT]",
+        latitude,
+        longitude,
+        12.5,
+    )
+
+
+def sync_logging(stream: CountingStream) -> None:
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(bl.ColorizedFormatter())
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def run(update, configure, updates: int):
+    stream = CountingStream()
+    listener = configure(stream)
+    logger = logging.getLogger("tgbot.handlers.location")
+    with contextlib.redirect_stdout(stream):
+        started = time.perf_counter()
+        for step in range(updates):
+            update(logger, step)
+        elapsed = time.perf_counter() - started
+    if listener is not None:
+        listener.stop()
+    return elapsed / updates * 1e6, stream.lines
+
+
+def main(updates: int) -> None:
+    candidates = {
+        "sync, f-strings, print": (eager_update, sync_logging),
+        "sync, lazy": (lazy_update, sync_logging),
+        "queue, text": (
+            lazy_update,
+            lambda stream: setup_queue_logging(tracking_rate=None, stream=stream),
+        ),
+        "queue, json": (
+            lazy_update,
+            lambda stream: setup_queue_logging(json_output=True, tracking_rate=None, stream=stream),
+        ),
+        "queue, json, 1/s": (
+            lazy_update,
+            lambda stream: setup_queue_logging(json_output=True, tracking_rate=1.0, stream=stream),
+        ),
+    }
+
+    print(f"{'pipeline':<24} | {'us/update':>9} | {'lines':>7}")
+    for name, (update, configure) in candidates.items():
+        per_update, lines = run(update, configure, updates)
+        print(f"{name:<24} | {per_update:>9.1f} | {lines:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20000, help="updates to simulate")
+    args = parser.parse_args()
+    main(args.updates)
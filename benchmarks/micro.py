@@ -0,0 +1,266 @@
+"""
+Micro-benchmarks of the bot's hot paths, with stored baselines to compare against.
+
+Every case is timed in repeats of enough calls to last at least --min-time seconds; the
+median of the repeats, per call, is its result. `run --save` stores the results as a
+baseline; `compare` runs the cases again and flags the ones slower than the baseline by
+more than --threshold, exiting with status 1 if there are any. Baselines are only
+comparable on the machine and Python they were taken with - refresh the baseline when
+either changes.
+
+Usage:
+    python -m benchmarks.micro run [--only keyboard] [--save benchmarks/baselines/micro.json]
+    python -m benchmarks.micro compare [--baseline benchmarks/baselines/micro.json]
+        [--threshold 0.15]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message, Update
+
+from benchmarks.end_to_end import TOKEN, LocalSession
+from bot import register_global_middlewares
+from tgbot.config import Config, Miscellaneous, TgBot
+from tgbot.handlers import routers_list
+from tgbot.handlers.location import process_location
+from tgbot.handlers.terminals import (
+    TerminalCallbackFactory,
+    terminal_details_message,
+    terminals_keyboard,
+)
+from tgbot.keyboards.reply import button_label, main_menu_keyboard, reply_button_labels
+from tgbot.services.dispatch_index import DispatchIndex
+from tgbot.services.i18n import catalog
+from tgbot.services.location_validation import validate_driver_location
+from tgbot.services.route_draft import RouteDraft
+from tgbot.services.terminal_catalog import TerminalCatalog
+from tgbot.storage.memory import BoundedMemoryStorage
+
+BASELINE = "benchmarks/baselines/micro.json"
+DRIVER = 700_000_001
+
+TERMINALS = [
+    {
+        "id": number,
+        "name": f"T{number:02d}",
+        "full_name": f"Container terminal {number}",
+        "address": f"Terminal street {number}, Tashkent",
+        "location": "Tashkent",
+        "capacity": 1000 + number * 10,
+        "working_days": "Mon-Sat 08:00-20:00",
+        "phone_numbers": f"+998 71 200 {number:02d} {number:02d}",
+        "email": f"terminal{number}@example.com",
+        "latitude": 41.2 + number / 1000,
+        "longitude": 69.2 + number / 1000,
+    }
+    for number in range(1, 13)
+]
+
+
+class MemoryApi:
+    """Backend client answering from memory, so the cases time the bot and not the network."""
+
+    async def get_user_profile(self, telegram_id: int) -> Dict[str, Any]:
+        return {"preferred_language": "ru", "truck_number": "01A123BC", "first_name": "Driver"}
+
+    async def get_terminals(self, telegram_id: int) -> List[Dict[str, Any]]:
+        return [{"id": t["id"], "name": t["name"]} for t in TERMINALS]
+
+    async def get_terminal(self, terminal_id: int, telegram_id: int) -> Dict[str, Any]:
+        return TERMINALS[terminal_id - 1]
+
+    async def get_latest_location(self, telegram_id: int) -> Dict[str, Any]:
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "is_live_period": True,
+        }
+
+    async def post_location(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": "ok"}
+
+
+def message(**fields: Any) -> Dict[str, Any]:
+    return {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": DRIVER, "type": "private"},
+        "from": {"id": DRIVER, "is_bot": False, "first_name": "Driver"},
+        **fields,
+    }
+
+
+def route_summary_full() -> str:
+    draft = RouteDraft("ru", "01A123BC", 1, "T01", "2025-01-02", "09")
+    draft.container_name = "ABCD1234567"
+    return draft.summary()
+
+
+async def route_summary_step(state: FSMContext) -> str:
+    """A route step as handlers take it: the draft decoded from storage, one field set."""
+    draft = await RouteDraft.load(state)
+    draft.container_size = "20" if draft.container_size == "40" else "40"
+    return draft.summary()
+
+
+async def build_cases() -> Dict[str, Callable[[], Any]]:
+    """Name -> callable to time; async callables return an awaitable."""
+    catalog.compile()
+    api = MemoryApi()
+    bot = Bot(TOKEN, session=LocalSession())
+    config = Config(tg_bot=TgBot(token=TOKEN, admin_ids=[], use_redis=False), misc=Miscellaneous())
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_routers(*routers_list)
+    dispatch_index = DispatchIndex(reply_button_labels())
+    await dispatch_index.compile(dp, config=config)
+    register_global_middlewares(
+        dp,
+        config,
+        api,
+        dispatch_index=dispatch_index,
+        terminal_catalog=TerminalCatalog(api),
+    )
+
+    terminals_menu = Update.model_validate(
+        {"update_id": 1, "message": message(text=button_label("ru", "terminal"))},
+        context={"bot": bot},
+    )
+    unmatched = Update.model_validate(
+        {"update_id": 2, "message": message(text="hello")}, context={"bot": bot}
+    )
+    live_location = Message.model_validate(
+        message(location={"latitude": 41.31, "longitude": 69.24, "live_period": 900}),
+        context={"bot": bot},
+    )
+    state = FSMContext(
+        storage=MemoryStorage(), key=StorageKey(bot_id=42, chat_id=DRIVER, user_id=DRIVER)
+    )
+    route_state = FSMContext(
+        storage=BoundedMemoryStorage(), key=StorageKey(bot_id=42, chat_id=DRIVER, user_id=DRIVER)
+    )
+    await RouteDraft("ru", "01A123BC", 1, "T01", "2025-01-02", "09", "ABCD1234567").save(
+        route_state
+    )
+    packed = TerminalCallbackFactory(terminal_id="7").pack()
+
+    return {
+        "keyboard.terminals_12": lambda: terminals_keyboard(TERMINALS, "ru"),
+        "keyboard.main_menu": lambda: main_menu_keyboard("ru"),
+        "callback.pack": lambda: TerminalCallbackFactory(terminal_id="7").pack(),
+        "callback.unpack": lambda: TerminalCallbackFactory.unpack(packed),
+        "route.summary_full": route_summary_full,
+        "route.summary_step": lambda: route_summary_step(route_state),
+        "terminals.details_message": lambda: terminal_details_message(TERMINALS[0], "ru"),
+        "dispatch.unmatched_text": lambda: dp.feed_update(bot, unmatched),
+        "dispatch.terminals_menu": lambda: dp.feed_update(bot, terminals_menu),
+        "location.validate": lambda: validate_driver_location(live_location, DRIVER, api),
+        "location.process": lambda: process_location(live_location, state, api, is_edit=True),
+    }
+
+
+async def _time(function: Callable[[], Any], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        result = function()
+        if asyncio.iscoroutine(result):
+            await result
+    return time.perf_counter() - started
+
+
+async def measure(function: Callable[[], Any], repeats: int, min_time: float) -> Dict[str, float]:
+    """Median and minimum time per call, in microseconds."""
+    # Warms caches up, such as the markups built once per language
+    await _time(function, 1)
+    calls = 1
+    while await _time(function, calls) < min_time:
+        calls *= 2
+    per_call = [await _time(function, calls) / calls * 1e6 for _ in range(repeats)]
+    return {"us": round(statistics.median(per_call), 3), "min": round(min(per_call), 3)}
+
+
+async def run(only: Optional[List[str]], repeats: int, min_time: float) -> Dict[str, Any]:
+    cases = await build_cases()
+    results = {}
+    for name, function in cases.items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = await measure(function, repeats, min_time)
+    return {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+        "taken": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """Print the comparison and return how many cases regressed."""
+    if baseline.get("python") != current["python"] or baseline.get("machine") != current["machine"]:
+        print(
+            f"Baseline taken on {baseline.get('machine')}, Python {baseline.get('python')}; "
+            "its numbers may not be comparable"
+        )
+    regressions = 0
+    print(f"{'case':<28} | {'base us':>9} | {'now us':>9} | {'change':>7} |")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<28} | {'-':>9} | {result['us']:>9.2f} | {'-':>7} | new")
+            continue
+        change = result["us"] / base["us"] - 1
+        verdict = ""
+        if change > threshold:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            verdict = "faster"
+        print(
+            f"{name:<28} | {base['us']:>9.2f} | {result['us']:>9.2f} | {change:>+7.1%} | {verdict}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "compare"):
+        command = commands.add_parser(name)
+        command.add_argument("--only", nargs="+", help="cases whose name contains any of these")
+        command.add_argument("--repeats", type=int, default=5, help="timed repeats per case")
+        command.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat")
+    commands.choices["run"].add_argument("--save", help="store the results as a baseline")
+    commands.choices["compare"].add_argument("--baseline", default=BASELINE)
+    commands.choices["compare"].add_argument(
+        "--threshold", type=float, default=0.15, help="slowdown counted as a regression"
+    )
+    args = parser.parse_args()
+
+    current = asyncio.run(run(args.only, args.repeats, args.min_time))
+    if args.command == "run":
+        print(f"{'case':<28} | {'us':>9} | {'min us':>9}")
+        for name, result in current["results"].items():
+            print(f"{name:<28} | {result['us']:>9.2f} | {result['min']:>9.2f}")
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(current, file, indent=2)
+                file.write("\n")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+FSM storage on Redis: aiogram's RedisStorage with loose JSON keys versus the pipelined hash storage.
+
+Every simulated update does what a route step does: read the state and the data, update
+the data and move to the next state. Reports updates per second, Redis round trips per
+update and the memory Redis uses per user (MEMORY USAGE of all of the user's keys).
+Needs a Redis server; the keys it writes are deleted afterwards.
+
+Usage:
+    python -m benchmarks.redis_storage [--url redis://localhost:6379/15] [--updates 5000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError
+
+from benchmarks.fsm_footprint import draft_route, loose_route
+from tgbot.storage.redis import PipelinedRedisStorage
+
+STATES = ("RouteCreationStates:waiting_for_eta_date", "RouteCreationStates:waiting_for_eta_hour")
+TERMINALS = 12
+
+
+class CountingRedis(Redis):
+    """Redis client that counts the commands and pipelines it sends, one round trip each."""
+
+    round_trips = 0
+
+    async def execute_command(self, *args, **options):
+        CountingRedis.round_trips += 1
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        CountingRedis.round_trips += 1
+        return super().pipeline(transaction, shard_hint)
+
+
+async def json_update(storage: RedisStorage, key: StorageKey, step: int) -> None:
+    await storage.get_state(key)
+    data = await storage.get_data(key)
+    data.update(loose_route(key.user_id, TERMINALS), eta_hour=str(step % 12 + 7))
+    await storage.set_data(key, data)
+    await storage.set_state(key, STATES[step % 2])
+
+
+async def hash_update(storage: PipelinedRedisStorage, key: StorageKey, step: int) -> None:
+    async with storage.batch():
+        await storage.get_state(key)
+        data = await storage.get_data(key)
+        data.update(draft_route(key.user_id, TERMINALS))
+        data["route"].eta_hour = str(step % 12 + 7)
+        await storage.set_data(key, data)
+        await storage.set_state(key, STATES[step % 2])
+
+
+async def run(update, storage, updates: int, users: int, concurrency: int) -> float:
+    """Return updates per second, `concurrency` users being served at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(step: int) -> None:
+        user_id = step % users
+        async with semaphore:
+            await update(storage, StorageKey(bot_id=42, chat_id=user_id, user_id=user_id), step)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(step) for step in range(updates)))
+    return updates / (time.perf_counter() - started)
+
+
+async def memory_per_user(redis: Redis, pattern: str, users: int) -> float:
+    total = 0
+    async for key in redis.scan_iter(match=pattern, count=1000):
+        total += await redis.memory_usage(key) or 0
+    return total / users
+
+
+async def cleanup(redis: Redis, pattern: str) -> None:
+    async for key in redis.scan_iter(match=pattern, count=1000):
+        await redis.delete(key)
+
+
+async def main(url: str, updates: int, users: int, concurrency: int) -> None:
+    redis = Redis.from_url(url)
+    try:
+        await redis.ping()
+    except (ConnectionError, OSError) as e:
+        print(f"Redis is not reachable at {url}: {e}")
+        return
+
+    candidates = {
+        "json keys": (
+            json_update,
+            RedisStorage(
+                CountingRedis.from_url(url), key_builder=DefaultKeyBuilder(prefix="bench-json")
+            ),
+            "bench-json:*",
+        ),
+        "hash, pipelined": (
+            hash_update,
+            PipelinedRedisStorage(CountingRedis.from_url(url), prefix="bench-hash"),
+            "bench-hash:*",
+        ),
+    }
+
+    print(f"{'storage':<16} | {'updates/s':>9} | {'trips/upd':>9} | {'bytes/user':>10}")
+    for name, (update, storage, pattern) in candidates.items():
+        await cleanup(redis, pattern)
+        trips_before = CountingRedis.round_trips
+        rate = await run(update, storage, updates, users, concurrency)
+        trips = CountingRedis.round_trips - trips_before
+        memory = await memory_per_user(redis, pattern, min(users, updates))
+        print(f"{name:<16} | {rate:>9.0f} | {trips / updates:>9.1f} | {memory:>10.0f}")
+        await cleanup(redis, pattern)
+        await storage.close()
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="redis://localhost:6379/15", help="Redis to run against")
+    parser.add_argument("--updates", type=int, default=5000, help="updates to simulate")
+    parser.add_argument("--users", type=int, default=1000, help="distinct users")
+    parser.add_argument("--concurrency", type=int, default=32, help="updates in flight")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.updates, args.users, args.concurrency))
@@ -0,0 +1,155 @@
+"""
+Replay a recording of updates into the dispatcher, against the stand-in backend.
+
+Feeds the updates recorded with RECORDER_PATH to the dispatcher built as in
+benchmarks.end_to_end: at their original pace (--speed 1), scaled (--speed 10 replays ten
+times faster) or as fast as possible (--speed 0). Updates of one chat are fed in order,
+one after another, as Telegram delivers them. Calendar dates picked in the recording are
+moved by as many days as have passed since, so route flows take the same path.
+
+Reports the replayed processing time next to the recorded one, so two builds replaying the
+same recording can be compared.
+
+Usage:
+    python -m benchmarks.replay recordings/updates-20250102T090000Z.jsonl.gz [--speed 0]
+        [--concurrency 200]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from benchmarks.end_to_end import TOKEN, LocalSession, build_dispatcher
+from infrastructure.some_api.api import MyApi
+from infrastructure.standin.server import Latency, StandinSettings, running_standin
+from tgbot.keyboards.calendar import DateCallbackFactory
+from tgbot.services.api_hooks import ApiRequestHooks
+from tgbot.services.metrics import LatencyRecorder
+from tgbot.services.recorder import read_recording
+
+
+def _event(raw: Dict[str, Any]) -> Dict[str, Any]:
+    return next((value for key, value in raw.items() if key != "update_id"), {})
+
+
+def chat_key(raw: Dict[str, Any]) -> Any:
+    event = _event(raw)
+    chat = event.get("chat") or (event.get("message") or {}).get("chat")
+    if chat:
+        return chat["id"]
+    user = event.get("from")
+    return user["id"] if user else raw.get("update_id")
+
+
+def recorded_day(entries: List[Dict[str, Any]]) -> Optional[int]:
+    """Ordinal of the day the recording started, from the first update that has a date."""
+    for entry in entries:
+        event = _event(entry["update"])
+        value = event.get("date") or (event.get("message") or {}).get("date")
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value).date().toordinal()
+        if isinstance(value, str):
+            return datetime.fromisoformat(value).date().toordinal()
+    return None
+
+
+def shift_dates(raw: Dict[str, Any], days: int) -> Dict[str, Any]:
+    callback = raw.get("callback_query")
+    if not days or not callback or not callback.get("data", "").startswith("d:"):
+        return raw
+    try:
+        picked = DateCallbackFactory.unpack(callback["data"])
+    except (TypeError, ValueError):
+        return raw
+    data = DateCallbackFactory(day=picked.day + days).pack()
+    return {**raw, "callback_query": {**callback, "data": data}}
+
+
+async def replay(dp, bot: Bot, entries: List[Dict[str, Any]], speed: float, concurrency: int):
+    loop = asyncio.get_running_loop()
+    days = date.today().toordinal() - (recorded_day(entries) or date.today().toordinal())
+    semaphore = asyncio.Semaphore(concurrency)
+    latency = LatencyRecorder(window=len(entries))
+    behind = LatencyRecorder(window=len(entries))
+    errors = 0
+    last: Dict[Any, asyncio.Task] = {}
+
+    async def feed(raw: Dict[str, Any], previous: Optional[asyncio.Task], due: float) -> None:
+        nonlocal errors
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        update = Update.model_validate(shift_dates(raw, days), context={"bot": bot})
+        async with semaphore:
+            started = time.perf_counter()
+            behind.observe(max(loop.time() - due, 0.0))
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+            latency.observe(time.perf_counter() - started)
+
+    started, first = loop.time(), entries[0]["t"]
+    for entry in entries:
+        due = started + (entry["t"] - first) / speed if speed else loop.time()
+        if due > loop.time():
+            await asyncio.sleep(due - loop.time())
+        raw = entry["update"]
+        key = chat_key(raw)
+        last[key] = asyncio.create_task(feed(raw, last.get(key), due))
+    await asyncio.gather(*last.values())
+    return loop.time() - started, latency, behind, errors
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Written as updates finish, replayed in the order they arrived
+    entries = sorted(read_recording(args.path), key=lambda entry: entry["t"])
+    if not entries:
+        print(f"No updates in {args.path}")
+        return
+
+    recorded = LatencyRecorder(window=len(entries))
+    for entry in entries:
+        recorded.observe(entry["ms"] / 1000)
+
+    settings = StandinSettings(latency=Latency(args.median, args.p99), seed=args.seed)
+    async with running_standin(settings) as (url, backend):
+        api_client = MyApi(base_url=url, hooks=ApiRequestHooks())
+        dp = await build_dispatcher(api_client)
+        bot = Bot(TOKEN, session=LocalSession())
+        elapsed, latency, behind, errors = await replay(
+            dp, bot, entries, args.speed, args.concurrency
+        )
+        calls = sum(backend.requests.values())
+        await api_client.close()
+
+    span = entries[-1]["t"] - entries[0]["t"]
+    print(f"{len(entries)} updates recorded over {span:.1f}s, replayed in {elapsed:.1f}s")
+    print(f"{'':<10} | {'p50 ms':>7} | {'p90 ms':>7} | {'p99 ms':>7}")
+    for name, recorder in (("recorded", recorded), ("replayed", latency), ("behind", behind)):
+        points = recorder.percentiles()
+        print(
+            f"{name:<10} | {points['p50'] * 1000:>7.1f} | {points['p90'] * 1000:>7.1f} | "
+            f"{points['p99'] * 1000:>7.1f}"
+        )
+    print(
+        f"updates/s: {len(entries) / elapsed:.0f}, backend calls/update: "
+        f"{calls / len(entries):.2f}, errors: {errors}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="recording written by the bot")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="pace relative to the recording, 0 for max"
+    )
+    parser.add_argument("--concurrency", type=int, default=200, help="updates in flight")
+    parser.add_argument("--median", type=float, default=0.005, help="backend median latency, s")
+    parser.add_argument("--p99", type=float, default=0.03, help="backend p99 latency, s")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the backend latencies")
+    asyncio.run(main(parser.parse_args()))
@@ -1,17 +1,40 @@
 import asyncio
+import atexit
 import logging
+from functools import partial
 
-import betterlogging as bl
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from aiogram.client.session.aiohttp import AiohttpSession
 
 from tgbot.config import Config, load_config
 from tgbot.handlers import routers_list
-from tgbot.middlewares.config import ConfigMiddleware
-from tgbot.middlewares.api import ApiMiddleware
-from tgbot.middlewares.language import LanguageMiddleware
-from tgbot.services import broadcaster
+from tgbot.middlewares.call_ledger import CallLedgerMiddleware, LedgerHandlerMiddleware
+from tgbot.middlewares.context import ContextMiddleware, LazyDataMiddleware
+from tgbot.middlewares.dispatch_index import DispatchIndexMiddleware
+from tgbot.middlewares.lanes import LaneMiddleware
+from tgbot.middlewares.metrics import HandlerMetricsMiddleware
+from tgbot.middlewares.recorder import RecordingMiddleware
+from tgbot.middlewares.shutdown import ShutdownMiddleware
+from tgbot.middlewares.storage import StorageBatchMiddleware
+from tgbot.middlewares.tracing import TracingMiddleware, trace_middlewares
+from tgbot.keyboards.reply import reply_button_labels
+from tgbot.services import auto_cancel, broadcaster, metrics, profiling, tracing
+from tgbot.services.api_hooks import ApiRequestHooks
+from tgbot.services.broadcaster import Broadcaster
+from tgbot.services.call_ledger import CallLedger
+from tgbot.services.catch_up import catch_up, stop_on_signals
+from tgbot.services.dispatch_index import DispatchIndex
+from tgbot.services.i18n import catalog
+from tgbot.services.lanes import UpdateLanes
+from tgbot.services.log_pipeline import setup_queue_logging
+from tgbot.services.loop_monitor import LoopMonitor
+from tgbot.services.outbox import Outbox
+from tgbot.services.recorder import Scrubber, UpdateRecorder, run_path
+from tgbot.services.shutdown import ShutdownCoordinator
+from tgbot.services.terminal_catalog import TerminalCatalog
+from tgbot.storage.memory import BoundedMemoryStorage
+from tgbot.storage.redis import PipelinedRedisStorage
+from tgbot.storage.traced import TracedStorage
 from infrastructure.some_api.api import MyApi
 
 
@@ -19,11 +42,12 @@ async def on_startup(bot: Bot, admin_ids: list[int]):
     await broadcaster.broadcast(bot, admin_ids, "Бот запустился!")
 
 
-async def delete_webhook(bot: Bot):
+async def delete_webhook(bot: Bot, drop_pending_updates: bool = True):
     """
     Deletes the webhook for the bot to ensure polling works correctly.
+    Pending updates are kept when they are going to be processed by the startup catch-up.
     """
-    await bot.delete_webhook(drop_pending_updates=True)
+    await bot.delete_webhook(drop_pending_updates=drop_pending_updates)
     logging.info("Webhook deleted before polling.")
 
 
@@ -36,7 +60,14 @@ async def on_shutdown(api_client):
         logging.info("API client closed successfully")
 
 
-def register_global_middlewares(dp: Dispatcher, config: Config, api_client=None, session_pool=None):
+def register_global_middlewares(
+    dp: Dispatcher,
+    config: Config,
+    api_client=None,
+    session_pool=None,
+    dispatch_index=None,
+    terminal_catalog=None,
+):
     """
     Register global middlewares for the given dispatcher.
     Global middlewares here are the ones that are applied to all the handlers (you specify the type of update)
@@ -46,44 +77,115 @@ def register_global_middlewares(dp: Dispatcher, config: Config, api_client=None,
     :param config: The configuration object from the loaded configuration.
     :param api_client: API client instance to be passed to handlers.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
+    :param dispatch_index: Optional compiled index of reply keyboard button handlers.
+    :param terminal_catalog: Terminal catalog shared by all handlers.
     :return: None
     """
     middleware_types = [
-        ConfigMiddleware(config),
+        ContextMiddleware(config, api_client, terminal_catalog),
         # DatabaseMiddleware(session_pool),
     ]
-    
-    if api_client:
-        middleware_types.append(ApiMiddleware(api_client))
-        middleware_types.append(LanguageMiddleware())
 
     for middleware_type in middleware_types:
         dp.message.outer_middleware(middleware_type)
+        dp.edited_message.outer_middleware(middleware_type)
         dp.callback_query.outer_middleware(middleware_type)
 
+    # Inner middlewares of the root router run for the handlers of all included routers
+    handler_metrics = HandlerMetricsMiddleware()
+    ledger_handler = LedgerHandlerMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+            observer.middleware(ledger_handler)
+
+    # The user profile is fetched only when the matched handler asks for it
+    dp.message.middleware(LazyDataMiddleware())
+    dp.callback_query.middleware(LazyDataMiddleware())
+
+    if dispatch_index:
+        # Registered last, so the indexed handlers get the same data as the router walk
+        dp.message.outer_middleware(DispatchIndexMiddleware(dispatch_index))
+
 
-def setup_logging():
+def register_update_middlewares(dp: Dispatcher, *middlewares):
+    """
+    Register update middlewares in front of the FSM middleware.
+
+    This way the shutdown tracking sees an update as soon as it arrives, and an update
+    that had to wait for a slot in the priority lanes reads the FSM state as it is when
+    it actually gets processed.
+
+    :param dp: The dispatcher instance.
+    :param middlewares: Update middlewares, in the order they should run.
+    :return: None
+    """
+    dp.update.outer_middleware.unregister(dp.fsm)
+    for middleware in middlewares:
+        dp.update.outer_middleware(middleware)
+    dp.update.outer_middleware(dp.fsm)
+
+
+def register_queue_gauges(lanes, outbox, shutdown, storage):
+    """
+    Publish the depths of the internal queues as gauges with every metrics snapshot.
+
+    :param lanes: The update priority lanes.
+    :param outbox: The outbox of Bot API calls.
+    :param shutdown: The shutdown coordinator, which tracks the updates in flight.
+    :param storage: The FSM storage.
+    :return: None
+    """
+    lane_pending = metrics.gauge(
+        "bot_lane_pending_updates", "Updates waiting for a processing slot, per lane", ("lane",)
+    )
+    outbox_waiting = metrics.gauge(
+        "bot_outbox_waiting_calls", "Bot API calls waiting for their rate limit"
+    )
+    in_flight = metrics.gauge("bot_updates_in_flight", "Updates being processed")
+    fsm_users = metrics.gauge(
+        "bot_fsm_memory_users", "Users in the in-memory FSM storage, per namespace", ("namespace",)
+    )
+    fsm_bytes = metrics.gauge(
+        "bot_fsm_memory_bytes", "Size of the in-memory FSM storage, per namespace", ("namespace",)
+    )
+
+    @metrics.collector
+    def collect_queue_depths():
+        for lane, depth in lanes.depth.items():
+            lane_pending.labels(lane).set(depth)
+        outbox_waiting.set(outbox.waiting)
+        in_flight.set(shutdown.in_flight)
+        if isinstance(storage, BoundedMemoryStorage):
+            for namespace, sizes in storage.stats()["namespaces"].items():
+                fsm_users.labels(namespace).set(sizes["users"])
+                fsm_bytes.labels(namespace).set(sizes["bytes"])
+
+
+def setup_logging(config: Config):
     """
     Set up logging configuration for the application.
 
-    This method initializes the logging configuration for the application.
-    It sets the log level to INFO and configures a basic colorized log for
-    output. The log format includes the filename, line number, log level,
-    timestamp, logger name, and log message.
+    Records are handed to a queue and written by a listener thread, so logging never
+    blocks the event loop: as colorized text by default, or as JSON lines. [TRACKING]
+    messages below WARNING, logged for every live location edit, are rate limited.
+    The listener is stopped at exit, after the last records are written.
+
+    Args:
+        config (Config): The configuration object.
 
     Returns:
         None
 
     Example usage:
-        setup_logging()
+        setup_logging(config)
     """
-    log_level = logging.INFO
-    bl.basic_colorized_config(level=log_level)
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s",
+    listener = setup_queue_logging(
+        level=logging.getLevelNamesMapping()[config.logging.level],
+        json_output=config.logging.json,
+        tracking_rate=config.logging.tracking_rate or None,
     )
+    atexit.register(listener.stop)
     logger = logging.getLogger(__name__)
     logger.info("Starting bot")
 
@@ -100,28 +202,206 @@ def get_storage(config):
 
     """
     if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
-            config.redis.dsn(),
-            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+        return PipelinedRedisStorage.from_url(
+            config.redis.dsn(), default_ttl=config.redis.fsm_ttl
         )
     else:
-        return MemoryStorage()
+        return BoundedMemoryStorage(
+            max_bytes=config.memory_storage.max_bytes,
+            idle_ttl=config.memory_storage.idle_ttl,
+        )
 
 
-async def main():
-    setup_logging()
+def get_tracer(config):
+    """
+    Return the tracer of updates, exporting to the file and collector set in the configuration.
+
+    Args:
+        config (Config): The configuration object.
+
+    Returns:
+        Tracer: The tracer; without exporters it doesn't trace at all.
+
+    """
+    exporters = []
+    if config.tracing.path:
+        exporters.append(tracing.FileExporter(config.tracing.path))
+    if config.tracing.zipkin_url:
+        exporters.append(tracing.ZipkinExporter(config.tracing.zipkin_url))
+    return tracing.Tracer(
+        sample_rate=config.tracing.sample_rate,
+        slow_threshold=config.tracing.slow_threshold,
+        exporters=exporters,
+    )
 
+
+async def main():
     config = load_config(".env")
+    setup_logging(config)
     storage = get_storage(config)
-    api_client = MyApi()
+    # Every backend client, also the ones handlers create on their own, is accounted
+    MyApi.hooks = ApiRequestHooks()
+    api_client = MyApi(base_url=config.api.base_url)
+    terminal_catalog = TerminalCatalog(api_client, ttl=config.terminals.cache_ttl)
+    lanes = UpdateLanes(
+        concurrency=config.lanes.concurrency,
+        low_latency_budget=config.lanes.low_latency_budget,
+        low_max_pending=config.lanes.low_max_pending,
+    )
+    shutdown = ShutdownCoordinator(
+        drain_timeout=config.shutdown.drain_timeout,
+        flush_timeout=config.shutdown.flush_timeout,
+    )
+
+    outbox = Outbox(
+        rate=config.outbox.rate,
+        per_chat_rate=config.outbox.per_chat_rate,
+        group_rate=config.outbox.group_rate,
+        per_chat_burst=config.outbox.per_chat_burst,
+        max_retry_after=config.outbox.max_retry_after,
+    )
+    # Every Bot API call of the handlers goes through the outbox
+    session = AiohttpSession()
+    session.middleware(outbox)
 
-    async with Bot(token=config.tg_bot.token) as bot:
-        dp = Dispatcher(storage=storage)
+    tracer = get_tracer(config)
+    call_ledger = CallLedger(config.call_ledger.path)
+
+    # Broadcasts pace themselves and only take the outbox's spare tokens, so their sends
+    # get a session of their own, without the outbox
+    broadcast_session = AiohttpSession()
+
+    async with Bot(token=config.tg_bot.token, session=session) as bot, Bot(
+        token=config.tg_bot.token, session=broadcast_session
+    ) as broadcast_bot:
+        dp = Dispatcher(storage=TracedStorage(storage) if tracer.exporters else storage)
         dp.include_routers(*routers_list)
-        register_global_middlewares(dp, config, api_client)
-        await delete_webhook(bot)
+        update_middlewares = [
+            ShutdownMiddleware(shutdown),
+            LaneMiddleware(lanes),
+            CallLedgerMiddleware(call_ledger),
+        ]
+        if tracer.exporters:
+            # First, so the trace covers the lanes wait and the shutdown check
+            update_middlewares.insert(0, TracingMiddleware(tracer))
+        recorder = None
+        if config.recorder.path:
+            scrubber = Scrubber(reply_button_labels()) if config.recorder.scrub else None
+            recorder = UpdateRecorder(run_path(config.recorder.path), scrubber)
+            # Before everything else, so updates rejected by the others are recorded too
+            update_middlewares.insert(0, RecordingMiddleware(recorder))
+            shutdown.register_flush("recorder", recorder.close)
+        if isinstance(storage, PipelinedRedisStorage):
+            update_middlewares.append(StorageBatchMiddleware(storage))
+        register_update_middlewares(dp, *update_middlewares)
+        shutdown.attach(dp)
+        # Profiles run outside of updates, so the drain doesn't wait for them
+        shutdown.register_flush("profiles", profiling.cancel)
+        shutdown.register_flush(
+            "auto_cancel_timers",
+            partial(auto_cancel.scheduler.persist, config.shutdown.timers_path),
+        )
+        broadcasts = Broadcaster(
+            broadcast_bot,
+            jobs_dir=config.broadcast.jobs_dir,
+            rate=config.broadcast.rate,
+            per_chat_rate=config.broadcast.per_chat_rate,
+            workers=config.broadcast.workers,
+            shared_bucket=outbox.global_bucket,
+        )
+        # Available to handlers as the `broadcaster` argument
+        dp["broadcaster"] = broadcasts
+        shutdown.register_flush("broadcasts", broadcasts.stop)
+        shutdown.register_flush("outbox", outbox.flush)
+        shutdown.register_flush("traces", tracer.close)
+        shutdown.register_flush("call_ledger", call_ledger.close)
+        snapshot_path = config.memory_storage.snapshot_path
+        if isinstance(storage, BoundedMemoryStorage) and snapshot_path:
+            # Users are read from the snapshot lazily, the first time they write to the bot
+            snapshot_users = storage.restore(snapshot_path)
+            logging.info("Restored the FSM snapshot of %d users", snapshot_users)
+            # Flushed after the drain, so it holds what the last updates wrote
+            shutdown.register_flush("fsm_snapshot", partial(storage.snapshot, snapshot_path))
+        restored = auto_cancel.scheduler.load(bot, storage, config.shutdown.timers_path)
+        logging.info("Restored %d auto-cancel timers", restored)
+        # Every translation module is imported with the routers by now
+        catalog.compile()
+        dispatch_index = DispatchIndex(reply_button_labels())
+        await dispatch_index.compile(dp, config=config)
+        register_global_middlewares(
+            dp,
+            config,
+            api_client,
+            dispatch_index=dispatch_index,
+            terminal_catalog=terminal_catalog,
+        )
+        if tracer.exporters:
+            trace_middlewares(dp)
+        await delete_webhook(bot, drop_pending_updates=not config.catch_up.enabled)
         await on_startup(bot, config.tg_bot.admin_ids)
-        await dp.start_polling(bot)
+        lanes_reporter = asyncio.create_task(lanes.report_periodically())
+        register_queue_gauges(lanes, outbox, shutdown, storage)
+        # Read by the /metrics endpoint of the API, which merges all bot processes
+        metrics_publisher = asyncio.create_task(
+            metrics.publish_periodically(config.metrics.directory, config.metrics.interval)
+        )
+        outbox_reporter = asyncio.create_task(outbox.report_periodically())
+        trace_exporter = asyncio.create_task(tracer.export_periodically())
+        ledger_writer = asyncio.create_task(call_ledger.write_periodically())
+        recorder_writer = None
+        if recorder is not None:
+            recorder_writer = asyncio.create_task(recorder.write_periodically())
+        monitor_tasks = []
+        if config.loop_monitor.enabled:
+            loop_monitor = LoopMonitor(
+                interval=config.loop_monitor.interval,
+                slow_threshold=config.loop_monitor.slow_threshold,
+            )
+            monitor_tasks.append(asyncio.create_task(loop_monitor.run()))
+            monitor_tasks.append(asyncio.create_task(loop_monitor.report_periodically()))
+        storage_tasks = []
+        if isinstance(storage, BoundedMemoryStorage):
+            storage_tasks.append(asyncio.create_task(storage.report_periodically()))
+            if snapshot_path:
+                storage_tasks.append(
+                    asyncio.create_task(
+                        storage.snapshot_periodically(
+                            snapshot_path, config.memory_storage.snapshot_interval
+                        )
+                    )
+                )
+        # Broadcasts interrupted by the last shutdown continue where they stopped
+        broadcasts.start(broadcasts.pending_jobs())
+        try:
+            interrupted = False
+            if config.catch_up.enabled:
+                with stop_on_signals(asyncio.Event()) as stop:
+                    report = await catch_up(
+                        bot,
+                        dp,
+                        max_callback_age=config.catch_up.max_callback_age,
+                        parallelism=config.catch_up.parallelism,
+                        stop=stop,
+                    )
+                interrupted = report.interrupted
+            if interrupted:
+                # Stopped before polling: the same drain and flushes as after it
+                await dp.emit_shutdown(bot=bot)
+            else:
+                # The bot session is closed by the context manager, after the shutdown drain
+                await dp.start_polling(bot, close_bot_session=False)
+        finally:
+            lanes_reporter.cancel()
+            metrics_publisher.cancel()
+            outbox_reporter.cancel()
+            trace_exporter.cancel()
+            ledger_writer.cancel()
+            if recorder_writer is not None:
+                recorder_writer.cancel()
+            for task in monitor_tasks:
+                task.cancel()
+            for task in storage_tasks:
+                task.cancel()
     await on_shutdown(api_client)
 
 
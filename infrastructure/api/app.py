@@ -4,9 +4,10 @@ import betterlogging as bl
 import fastapi
 from aiogram import Bot
 from fastapi import FastAPI
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
 from tgbot.config import load_config, Config
+from tgbot.services import metrics
 
 app = FastAPI()
 log_level = logging.INFO
@@ -20,3 +21,13 @@ bot = Bot(token=config.tg_bot.token)
 @app.post("/api")
 async def webhook_endpoint(request: fastapi.Request):
     return JSONResponse(status_code=200, content={"status": "ok"})
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Bot processes that haven't published for a few intervals are gone
+    stale_after = max(60.0, 3 * config.metrics.interval)
+    return PlainTextResponse(
+        metrics.exposition(config.metrics.directory, stale_after),
+        media_type="text/plain; version=0.0.4",
+    )
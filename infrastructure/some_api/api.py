@@ -1,23 +1,45 @@
 import base64
 import json
 import logging
+import re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import aiohttp
 import backoff
 
 from infrastructure.some_api.base import BaseClient
+from infrastructure.some_api.hooks import RequestHooks
+
+
+def _retry(details: Dict[str, Any]) -> None:
+    client, method, _, endpoint = details["args"][:4]
+    client.hooks.retry(method, endpoint)
+
+
+@lru_cache(maxsize=256)
+def endpoint_label(url: str) -> str:
+    """The URL with ids replaced, so requests to the same endpoint share their metrics."""
+    return re.sub(r"/\d+(?=/|$)", "/{id}", url.split("?", 1)[0])
 
 
 class MyApi(BaseClient):
     """API client for interacting with the backend service."""
 
-    def __init__(self, base_url: str = "https://khamraev.uz"):
+    # Hooks of the clients created without their own, set once by the application
+    hooks: RequestHooks = RequestHooks()
+
+    def __init__(
+        self, base_url: str = "https://khamraev.uz", hooks: Optional[RequestHooks] = None
+    ):
         """Initialize API client with base URL.
 
         Args:
             base_url: Base URL for the API
+            hooks: Observer of the client's requests, `MyApi.hooks` by default
         """
+        if hooks is not None:
+            self.hooks = hooks
         self.base_url = base_url
         self.bot_secret = "1234!@qwwqdsgfgh!@!2922U948U"
         self.logger = logging.getLogger(__name__)
@@ -107,7 +129,6 @@ class MyApi(BaseClient):
             url="/api/routes/telegram_create/",
             json=data,
         )
-        print("Result:", result)
         return result
 
     async def telegram_login(
@@ -181,7 +202,7 @@ class MyApi(BaseClient):
             # Return the list of truck numbers
             return result.get("trucks", [])
         except Exception as e:
-            self.logger.error(f"Error fetching recent trucks: {str(e)}")
+            self.logger.error("Error fetching recent trucks: %s", e)
             # If API endpoint doesn't exist yet or other error, return empty list
             return []
 
@@ -214,7 +235,7 @@ class MyApi(BaseClient):
             # Return the list of back numbers
             return result.get("back_numbers", [])
         except Exception as e:
-            self.logger.error(f"Error fetching recent back numbers: {str(e)}")
+            self.logger.error("Error fetching recent back numbers: %s", e)
             # If API endpoint doesn't exist yet or other error, return empty list
             return []
 
@@ -246,12 +267,6 @@ class MyApi(BaseClient):
         )
         return result
 
-    @backoff.on_exception(
-        backoff.expo,
-        aiohttp.ClientError,
-        max_time=5,
-        giveup=lambda e: hasattr(e, "status") and e.status in [400, 401, 403, 404],
-    )
     async def _make_request(
         self, method: str, url: str, **kwargs
     ) -> Tuple[int, Union[Dict[str, Any], str]]:
@@ -268,8 +283,28 @@ class MyApi(BaseClient):
         Raises:
             aiohttp.ClientError: On request failure
         """
+        endpoint = endpoint_label(url)
+        self.hooks.request(method, endpoint)
+        return await self._attempt(method, url, endpoint, **kwargs)
+
+    @backoff.on_exception(
+        backoff.expo,
+        aiohttp.ClientError,
+        max_time=5,
+        giveup=lambda e: hasattr(e, "status") and e.status in [400, 401, 403, 404],
+        on_backoff=_retry,
+    )
+    async def _attempt(
+        self, method: str, url: str, endpoint: str, **kwargs
+    ) -> Tuple[int, Union[Dict[str, Any], str]]:
+        """One attempt at a request, retried with backoff by the decorator."""
         session = await self._get_session()
+        with self.hooks.attempt(method, endpoint):
+            return await self._send(session, method, url, **kwargs)
 
+    async def _send(
+        self, session: aiohttp.ClientSession, method: str, url: str, **kwargs
+    ) -> Tuple[int, Union[Dict[str, Any], str]]:
         async with session.request(method, url, **kwargs) as response:
             try:
                 if response.content_type == "application/json":
@@ -277,8 +312,7 @@ class MyApi(BaseClient):
                 else:
                     data = await response.text()
 
-                self.logger.debug(f"Response data: {data}")
-                print("Response data:", data)
+                self.logger.debug("Response data: %s", data)
                 # Treat 201 as success
                 if response.status in [200, 201]:
                     return response.status, data
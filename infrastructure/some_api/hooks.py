@@ -0,0 +1,21 @@
+from contextlib import nullcontext
+from typing import Any, ContextManager
+
+
+class RequestHooks:
+    """
+    Observes the requests of `MyApi`, so the application can account, trace and measure
+    them without the client depending on it. This base class observes nothing.
+
+    `endpoint` is the URL with its ids replaced, e.g. /api/terminals/{id}/.
+    """
+
+    def request(self, method: str, endpoint: str) -> None:
+        """A request is made; called once, however many attempts it takes."""
+
+    def attempt(self, method: str, endpoint: str) -> ContextManager[Any]:
+        """Context of one attempt at a request; its exception, if any, passes through."""
+        return nullcontext()
+
+    def retry(self, method: str, endpoint: str) -> None:
+        """An attempt failed and the request is tried again."""
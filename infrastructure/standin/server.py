@@ -0,0 +1,303 @@
+"""
+Stand-in for the backend API, for load and integration testing without production.
+
+Implements every endpoint MyApi calls, keeping users, routes and locations in memory.
+Every response waits a latency drawn per endpoint from a log-normal distribution set by
+its median and p99, a share of requests fails with 503, and the size of the terminal list
+and of the responses is configurable. Drivers the stand-in hasn't seen are registered on
+first use, so load tests need no setup.
+
+Run it in-process with `running_standin`, or as a separate process:
+
+    python -m infrastructure.standin.server [--port 8081] [--median 0.05] [--p99 0.3]
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from aiohttp import web
+
+
+@dataclass
+class Latency:
+    """Log-normal response time, in seconds, given by its median and 99th percentile."""
+
+    median: float = 0.05
+    p99: float = 0.3
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        # 2.326 is the z-score of the 99th percentile
+        sigma = math.log(max(self.p99, self.median) / self.median) / 2.326
+        return rng.lognormvariate(math.log(self.median), sigma)
+
+
+@dataclass
+class StandinSettings:
+    """
+    Behaviour of the stand-in.
+
+    Attributes
+    ----------
+    latency : Latency
+        Response time of endpoints without their own entry in `latencies`.
+    latencies : dict
+        Response time per endpoint name, e.g. {"create_route": Latency(0.2, 1.0)}.
+    error_rate : float
+        Share of requests answered with 503, from 0 to 1.
+    terminals : int
+        How many terminals the terminal list holds.
+    recent_trucks : int
+        How many recent truck and back numbers are returned.
+    padding : int
+        Bytes of filler added to every object response, to simulate heavier payloads.
+    always_live : bool
+        Whether drivers without a posted location are reported as sharing a fresh live
+        location, so route flows can be driven without location updates first.
+    seed : int
+        Seed of the latency and error draws.
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    latencies: Dict[str, Latency] = field(default_factory=dict)
+    error_rate: float = 0.0
+    terminals: int = 12
+    recent_trucks: int = 3
+    padding: int = 0
+    always_live: bool = True
+    seed: int = 0
+
+
+class StandinBackend:
+    """In-memory state of the stand-in and its request handlers."""
+
+    def __init__(self, settings: Optional[StandinSettings] = None):
+        self.settings = settings or StandinSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.locations: Dict[int, Dict[str, Any]] = {}
+        self.routes: List[Dict[str, Any]] = []
+        self.requests: Dict[str, int] = {}
+        self.terminals = [
+            self._terminal(number) for number in range(1, self.settings.terminals + 1)
+        ]
+        self._filler = "x" * self.settings.padding
+
+    @staticmethod
+    def _terminal(number: int) -> Dict[str, Any]:
+        return {
+            "id": number,
+            "name": f"T{number:02d}",
+            "full_name": f"Container terminal {number}",
+            "address": f"Terminal street {number}, Tashkent",
+            "location": "Tashkent",
+            "capacity": 1000 + number * 10,
+            "working_days": "Mon-Sat 08:00-20:00",
+            "phone_numbers": f"+998 71 200 {number:02d} {number:02d}",
+            "email": f"terminal{number}@example.com",
+            "latitude": 41.2 + number / 1000,
+            "longitude": 69.2 + number / 1000,
+        }
+
+    def user(self, telegram_id: int) -> Dict[str, Any]:
+        user = self.users.get(telegram_id)
+        if user is None:
+            user = self.users[telegram_id] = {
+                "telegram_id": telegram_id,
+                "first_name": f"Driver {telegram_id}",
+                "last_name": "Standin",
+                "phone_number": f"+998{telegram_id % 10 ** 9:09d}",
+                "role": "driver",
+                "preferred_language": ("uz", "ru")[telegram_id % 2],
+                "truck_number": f"01A{telegram_id % 1000:03d}BC",
+            }
+        return user
+
+    def _json(self, data: Any, status: int = 200) -> web.Response:
+        if self._filler and isinstance(data, dict):
+            data = {**data, "padding": self._filler}
+        return web.json_response(data, status=status)
+
+    @web.middleware
+    async def conditions(self, request: web.Request, handler) -> web.StreamResponse:
+        """Delays every response and fails some, as set in the settings."""
+        name = request.match_info.route.name or "unknown"
+        self.requests[name] = self.requests.get(name, 0) + 1
+        latency = self.settings.latencies.get(name, self.settings.latency)
+        delay = latency.sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.settings.error_rate and self.rng.random() < self.settings.error_rate:
+            return web.json_response({"detail": "Service unavailable"}, status=503)
+        return await handler(request)
+
+    async def telegram_auth(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        user = self.user(int(payload["telegram_id"]))
+        for key in ("phone_number", "first_name", "last_name", "role", "truck_number"):
+            if payload.get(key):
+                user[key] = payload[key]
+        if payload.get("preferred_language"):
+            user["preferred_language"] = payload["preferred_language"]
+        token = f"standin-{user['telegram_id']}"
+        return self._json({"access": token, "refresh": token, "user": user}, status=201)
+
+    async def telegram_login(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        user = self.user(int(payload["telegram_id"]))
+        return self._json({"access": f"standin-{user['telegram_id']}"})
+
+    async def telegram_profile(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        return self._json(self.user(int(payload["telegram_id"])))
+
+    async def terminals_list(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            [
+                {"id": terminal["id"], "name": terminal["name"], "full_name": terminal["full_name"]}
+                for terminal in self.terminals
+            ]
+        )
+
+    async def terminal_detail(self, request: web.Request) -> web.Response:
+        terminal_id = int(request.match_info["terminal_id"])
+        if not 0 < terminal_id <= len(self.terminals):
+            return web.json_response({"detail": "Not found."}, status=404)
+        return self._json(self.terminals[terminal_id - 1])
+
+    async def create_route(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        route = {
+            "id": len(self.routes) + 1,
+            "status": "created",
+            **{key: value for key, value in payload.items() if key != "bot_secret"},
+        }
+        self.routes.append(route)
+        return self._json(route, status=201)
+
+    async def recent_trucks(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        limit = min(int(payload.get("limit", 3)), self.settings.recent_trucks)
+        telegram_id = int(payload["telegram_id"])
+        trucks = [f"{number:02d}A{telegram_id % 1000:03d}BC" for number in range(1, limit + 1)]
+        return self._json({"trucks": trucks})
+
+    async def recent_back_numbers(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        limit = min(int(payload.get("limit", 3)), self.settings.recent_trucks)
+        return self._json({"back_numbers": [f"{number:03d}BC" for number in range(1, limit + 1)]})
+
+    async def location_update(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        telegram_id = int(payload["telegram_id"])
+        self.locations[telegram_id] = {
+            "telegram_id": telegram_id,
+            "latitude": payload.get("latitude"),
+            "longitude": payload.get("longitude"),
+            "horizontal_accuracy": payload.get("horizontal_accuracy"),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "is_live_period": True,
+            "received": time.time(),
+        }
+        return self._json({"status": "ok"}, status=201)
+
+    async def location_latest(self, request: web.Request) -> web.Response:
+        telegram_id = int(request.match_info["telegram_id"])
+        location = self.locations.get(telegram_id)
+        if location is None:
+            if not self.settings.always_live:
+                return web.json_response({"detail": "Not found."}, status=404)
+            location = {
+                "telegram_id": telegram_id,
+                "latitude": 41.31,
+                "longitude": 69.24,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "is_live_period": True,
+            }
+        return self._json({key: value for key, value in location.items() if key != "received"})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.conditions])
+        app.router.add_post("/api/users/telegram-auth/", self.telegram_auth, name="telegram_auth")
+        app.router.add_post(
+            "/api/users/telegram-login/", self.telegram_login, name="telegram_login"
+        )
+        app.router.add_post(
+            "/api/users/telegram-profile/", self.telegram_profile, name="telegram_profile"
+        )
+        app.router.add_post(
+            "/api/terminals/list-via-telegram/", self.terminals_list, name="terminals_list"
+        )
+        app.router.add_post(
+            "/api/terminals/detail-via-telegram/{terminal_id:\\d+}/",
+            self.terminal_detail,
+            name="terminal_detail",
+        )
+        app.router.add_post("/api/routes/telegram_create/", self.create_route, name="create_route")
+        app.router.add_post("/api/routes/recent-trucks/", self.recent_trucks, name="recent_trucks")
+        app.router.add_post(
+            "/api/routes/recent-back-numbers/", self.recent_back_numbers, name="recent_back_numbers"
+        )
+        app.router.add_post(
+            "/api/routes/locations/telegram_update/", self.location_update, name="location_update"
+        )
+        app.router.add_get(
+            "/api/routes/locations/telegram_latest/{telegram_id:\\d+}/",
+            self.location_latest,
+            name="location_latest",
+        )
+        return app
+
+
+@asynccontextmanager
+async def running_standin(
+    settings: Optional[StandinSettings] = None, host: str = "127.0.0.1", port: int = 0
+) -> AsyncIterator[tuple]:
+    """
+    Serve a stand-in on this event loop for the duration of the block.
+    Yields its base URL, to give to MyApi, and the backend, to inspect its state.
+    """
+    backend = StandinBackend(settings)
+    runner = web.AppRunner(backend.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    try:
+        yield f"http://{host}:{bound_port}", backend
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the stand-in backend API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--median", type=float, default=0.05, help="median latency, seconds")
+    parser.add_argument("--p99", type=float, default=0.3, help="99th percentile latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument("--terminals", type=int, default=12, help="terminals in the list")
+    parser.add_argument("--padding", type=int, default=0, help="filler bytes per response")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = StandinSettings(
+        latency=Latency(args.median, args.p99),
+        error_rate=args.error_rate,
+        terminals=args.terminals,
+        padding=args.padding,
+        seed=args.seed,
+    )
+    web.run_app(StandinBackend(settings).app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
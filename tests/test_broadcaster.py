@@ -0,0 +1,112 @@
+import asyncio
+
+from tgbot.services.broadcaster import Broadcaster
+from tgbot.services.rate_limit import TokenBucket
+
+
+class RecordingBot:
+    """Stands in for the bot, taking `delay` seconds per message."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.delay)
+        self.sent.append(chat_id)
+
+
+def test_started_jobs_run_in_the_background_and_report(tmp_path):
+    bot = RecordingBot()
+    broadcaster = Broadcaster(bot, jobs_dir=str(tmp_path), rate=1000, per_chat_rate=1000)
+
+    async def scenario():
+        reports = []
+
+        async def notify(report):
+            reports.append(report)
+
+        job = broadcaster.submit([1, 2, 2, 3], "Notice")
+        task = broadcaster.start([job], notify)
+        assert not bot.sent
+        await task
+        assert sorted(bot.sent) == [1, 2, 3]
+        assert [(r.job_id, r.sent, r.total, r.interrupted) for r in reports] == [
+            (job.job_id, 3, 3, False)
+        ]
+        assert broadcaster.pending_jobs() == []
+
+    asyncio.run(scenario())
+
+
+def test_stopped_jobs_resume_without_duplicates(tmp_path):
+    bot = RecordingBot(delay=0.01)
+    broadcaster = Broadcaster(bot, jobs_dir=str(tmp_path), rate=100, per_chat_rate=100, workers=2)
+
+    async def scenario():
+        reports = []
+
+        async def notify(report):
+            reports.append(report)
+
+        job = broadcaster.submit(list(range(1, 41)), "Notice")
+        broadcaster.start([job], notify)
+        await asyncio.sleep(0.1)
+        # A running job isn't offered for resuming
+        assert broadcaster.pending_jobs() == []
+        assert await broadcaster.stop() == 2
+        assert reports[0].interrupted
+        sent_before = len(bot.sent)
+        assert 0 < sent_before < 40
+
+        assert [pending.job_id for pending in broadcaster.pending_jobs()] == [job.job_id]
+        await broadcaster.start(broadcaster.pending_jobs(), notify)
+        assert sorted(bot.sent) == list(range(1, 41))
+        assert not reports[1].interrupted
+        assert reports[1].skipped == sent_before
+
+    asyncio.run(scenario())
+
+
+def test_broadcasts_take_only_spare_tokens_of_the_shared_bucket():
+    shared = TokenBucket(rate=20, capacity=1)
+    bot = RecordingBot()
+    broadcaster = Broadcaster(bot, rate=1000, per_chat_rate=1000, shared_bucket=shared)
+
+    async def scenario():
+        replies = []
+
+        async def reply():
+            await shared.acquire()
+            replies.append(len(bot.sent))
+
+        job = broadcaster.submit(list(range(1, 11)), "Notice")
+        run = asyncio.create_task(broadcaster.run(job))
+        await asyncio.sleep(0.05)
+        # A reply waiting for the shared bucket goes before the broadcast's next send
+        await reply()
+        await run
+        assert len(bot.sent) == 10
+        assert replies[0] < 10
+
+    asyncio.run(scenario())
+
+
+def test_try_acquire_leaves_tokens_to_waiters():
+    async def scenario():
+        bucket = TokenBucket(rate=10, capacity=1)
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        bucket._tokens = 1.0
+        # A token is there, but it's the waiter's
+        assert not bucket.try_acquire()
+        await waiter
+
+        bucket.pause(10)
+        bucket._tokens = 1.0
+        assert not bucket.try_acquire()
+
+    asyncio.run(scenario())
@@ -0,0 +1,38 @@
+from datetime import date, datetime, timezone
+
+from tgbot.keyboards.calendar import DateWindowKeyboard, HourSlotsKeyboard
+
+# 20:30 UTC is 01:30 of the next day in Tashkent (UTC+5)
+EVENING_UTC = datetime(2025, 3, 10, 20, 30, tzinfo=timezone.utc)
+
+
+def test_hours_follow_the_booking_timezone():
+    hours = HourSlotsKeyboard(first=7, last=19)
+    tashkent_today = date(2025, 3, 11)
+
+    assert hours.first_hour(tashkent_today, EVENING_UTC) == 7
+    # The UTC date is already yesterday in Tashkent
+    assert hours.first_hour(date(2025, 3, 10), EVENING_UTC) == 7
+
+    midday_utc = datetime(2025, 3, 11, 9, 15, tzinfo=timezone.utc)
+    assert hours.first_hour(tashkent_today, midday_utc) == 15
+    assert not hours.is_bookable(tashkent_today, 14, midday_utc)
+    assert hours.is_bookable(tashkent_today, 15, midday_utc)
+    assert not hours.is_bookable(tashkent_today, 20, midday_utc)
+
+
+def test_no_slots_left_late_in_the_day():
+    hours = HourSlotsKeyboard(first=7, last=19)
+    late_utc = datetime(2025, 3, 11, 14, 5, tzinfo=timezone.utc)
+
+    assert not hours.has_slots(date(2025, 3, 11), late_utc)
+    assert hours.has_slots(date(2025, 3, 12), late_utc)
+
+
+def test_window_starts_today_in_the_booking_timezone():
+    calendar = DateWindowKeyboard(days=14)
+    today = datetime.now(calendar.tz).date()
+
+    first, last = calendar.window()
+    assert first == today
+    assert (last - first).days == 13
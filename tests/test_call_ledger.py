@@ -0,0 +1,58 @@
+import asyncio
+
+import aiohttp
+
+from infrastructure.some_api.api import MyApi
+from tgbot.services import api_hooks
+from tgbot.services.api_hooks import ApiRequestHooks
+from tgbot.services.call_ledger import CallLedger, set_handler
+
+
+class FlakyApi(MyApi):
+    """Fails the first `failures` attempts of every request, then succeeds."""
+
+    def __init__(self, failures: int):
+        super().__init__(base_url="http://backend.test", hooks=ApiRequestHooks())
+        self.failures = failures
+        self.attempts = 0
+
+    async def _get_session(self):
+        return None
+
+    async def _send(self, session, method, url, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise aiohttp.ClientError("Connection reset")
+        return 200, {"status": "ok"}
+
+
+def test_retried_requests_count_once_in_the_ledger():
+    client = FlakyApi(failures=1)
+    ledger = CallLedger()
+    retries = api_hooks.request_retries_total.labels("POST", "/api/routes/locations/telegram_update/")
+    retries_before = retries.value
+
+    async def update():
+        with ledger.track(update_id=1) as tracked:
+            set_handler("location")
+            await client.post_location({"telegram_id": 1})
+            return dict(tracked.calls)
+
+    calls = asyncio.run(update())
+
+    assert client.attempts == 2
+    assert calls == {"POST /api/routes/locations/telegram_update/": 1}
+    assert retries.value == retries_before + 1
+
+
+def test_repeated_calls_are_still_counted():
+    client = FlakyApi(failures=0)
+    ledger = CallLedger()
+
+    async def update():
+        with ledger.track(update_id=2) as tracked:
+            await client.get_terminal(terminal_id=1, telegram_id=1)
+            await client.get_terminal(terminal_id=2, telegram_id=1)
+            return dict(tracked.calls)
+
+    assert asyncio.run(update()) == {"POST /api/terminals/detail-via-telegram/{id}/": 2}
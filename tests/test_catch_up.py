@@ -0,0 +1,89 @@
+import asyncio
+import os
+import signal
+import time
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import Message, Update
+
+from benchmarks.end_to_end import TOKEN, LocalSession
+from tgbot.services.catch_up import catch_up, stop_on_signals
+
+
+def page(first: int, count: int):
+    return [
+        Update.model_validate(
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": update_id, "type": "private"},
+                    "text": "hello",
+                },
+            }
+        )
+        for update_id in range(first, first + count)
+    ]
+
+
+class Backlog:
+    """getUpdates over pages of pending updates, recording the offsets asked for."""
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.offsets = []
+
+    async def __call__(self, offset=None, limit=100, **kwargs):
+        self.offsets.append(offset)
+        while self.pages and offset is not None and self.pages[0][-1].update_id < offset:
+            self.pages.pop(0)
+        return self.pages[0][:limit] if self.pages else []
+
+
+def run(backlog: Backlog, stop_after=None):
+    async def scenario():
+        dp = Dispatcher()
+        stop = asyncio.Event()
+        handled = []
+
+        @dp.message(F.text)
+        async def handler(message: Message):
+            handled.append(message.message_id)
+            if len(handled) == stop_after:
+                stop.set()
+
+        bot = Bot(TOKEN, session=LocalSession())
+        bot.get_updates = backlog
+        report = await catch_up(bot, dp, stop=stop, parallelism=1)
+        return report, handled
+
+    return asyncio.run(scenario())
+
+
+def test_the_backlog_is_drained_page_by_page():
+    backlog = Backlog(page(1, 3), page(4, 2))
+    report, handled = run(backlog)
+    assert sorted(handled) == [1, 2, 3, 4, 5]
+    assert (report.received, report.processed, report.interrupted) == (5, 5, False)
+    assert backlog.offsets == [None, 4, 6]
+
+
+def test_a_stop_finishes_and_confirms_the_current_page():
+    backlog = Backlog(page(1, 3), page(4, 2))
+    report, handled = run(backlog, stop_after=1)
+    assert sorted(handled) == [1, 2, 3]
+    assert report.interrupted
+    # The last call confirms the first page and leaves the second one for the next start
+    assert backlog.offsets == [None, 4]
+    assert backlog.pages[0][0].update_id == 4
+
+
+def test_signals_set_the_stop_event_only_within_the_block():
+    async def scenario():
+        with stop_on_signals(asyncio.Event()) as stop:
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(stop.wait(), 1)
+        assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+    asyncio.run(scenario())
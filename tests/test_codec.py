@@ -0,0 +1,175 @@
+import random
+
+import pytest
+
+from tgbot.services.route_draft import RouteDraft
+from tgbot.storage import codec
+from tgbot.storage.codec import CodecError, Draft, dumps, loads, register
+from tgbot.storage.drafts import RegistrationDraft, TrackingDraft
+
+
+@register
+class VersionedDraft(Draft):
+    """Version 2 appended `note`; version 1 stored `count` as a string."""
+
+    __slots__ = ("count", "label", "note")
+
+    TAG = 250
+    VERSION = 2
+    FIELDS = __slots__
+
+    def __init__(self, count: int = 0, label: str = "", note: str = "-"):
+        self.count = count
+        self.label = label
+        self.note = note
+
+    @classmethod
+    def upgrade(cls, version, values):
+        if version == 1 and values:
+            return [int(values[0]), *values[1:]]
+        return values
+
+
+VALUES = [
+    None,
+    True,
+    False,
+    0,
+    1,
+    -1,
+    63,
+    -64,
+    64,
+    2**63,
+    -(2**70),
+    0.0,
+    -2.5,
+    1e300,
+    "",
+    "ABCD1234567",
+    "Тошкент, 🚛",
+    b"",
+    b"\x00\xff" * 100,
+    [],
+    [1, "two", [3.0, None]],
+    {},
+    {"a": 1, "nested": {"list": [True, False], "bytes": b"x"}},
+    "x" * 10_000,
+]
+
+DRAFTS = [
+    RouteDraft(),
+    RouteDraft("ru", "01A123BC", 7, "T07", "2025-01-02", "9", "ABCD1234567", "40", "laden"),
+    RegistrationDraft("ru", "+998901234567", "Ali", "Valiyev", "01A123BC"),
+    TrackingDraft(True, 41.311081, 69.240562, 1735800000.5, True),
+    TrackingDraft(latitude=41.3),
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_values_round_trip(value):
+    decoded = loads(dumps(value))
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_tuples_decode_as_lists():
+    assert loads(dumps((1, (2, 3)))) == [1, [2, 3]]
+
+
+@pytest.mark.parametrize("draft", DRAFTS, ids=repr)
+def test_drafts_round_trip(draft):
+    decoded = loads(dumps({type(draft).STATE_KEY: draft, "other": 1}))
+    assert decoded == {type(draft).STATE_KEY: draft, "other": 1}
+    assert type(decoded[type(draft).STATE_KEY]) is type(draft)
+
+
+def test_trailing_defaults_are_omitted():
+    assert dumps(RouteDraft()) == bytes((codec.DRAFT, RouteDraft.TAG, RouteDraft.VERSION, 0))
+    assert loads(dumps(RouteDraft())) == RouteDraft()
+
+    # Only the fields up to the last one that differs from its default are written
+    partial = RouteDraft("ru", "01A123BC")
+    assert dumps(partial)[3] == 2
+    assert loads(dumps(partial)) == partial
+
+    # A default value in the middle is still written, to keep the positions
+    gap = RouteDraft("uz", "", 5)
+    assert dumps(gap)[3] == 3
+    assert loads(dumps(gap)) == gap
+
+
+def test_older_versions_are_upgraded():
+    old = bytes((codec.DRAFT, VersionedDraft.TAG, 1, 2)) + dumps("12") + dumps("label")
+    assert loads(old) == VersionedDraft(12, "label", "-")
+
+
+def test_newer_versions_are_rejected():
+    encoded = bytearray(dumps(VersionedDraft(1, "a", "b")))
+    encoded[2] = VersionedDraft.VERSION + 1
+    with pytest.raises(CodecError, match="newer"):
+        loads(bytes(encoded))
+
+
+def test_unknown_draft_tags_are_rejected():
+    encoded = bytearray(dumps(RouteDraft("ru")))
+    encoded[1] = 249
+    with pytest.raises(CodecError, match="Unknown draft type"):
+        loads(bytes(encoded))
+
+
+def test_unknown_value_tags_are_rejected():
+    with pytest.raises(CodecError, match="Unknown tag"):
+        loads(bytes((200,)))
+
+
+def test_taken_and_invalid_tags_cant_be_registered():
+    class Duplicate(Draft):
+        __slots__ = ()
+        TAG = RouteDraft.TAG
+
+    class Zero(Draft):
+        __slots__ = ()
+
+    with pytest.raises(ValueError, match="taken"):
+        register(Duplicate)
+    with pytest.raises(ValueError, match="between"):
+        register(Zero)
+
+
+def test_unregistered_and_unsupported_values_are_rejected():
+    class Unregistered(Draft):
+        __slots__ = ()
+        TAG = 248
+
+    for value in (Unregistered(), {1: "int key"}, {"set": {1}}, object()):
+        with pytest.raises(CodecError):
+            dumps(value)
+
+
+@pytest.mark.parametrize(
+    "value", [VALUES[-2], [1, "two", [3.0, None]], *DRAFTS], ids=repr
+)
+def test_truncated_input_is_rejected(value):
+    encoded = dumps(value)
+    for size in range(len(encoded)):
+        with pytest.raises(CodecError):
+            loads(encoded[:size])
+
+
+def test_trailing_bytes_are_rejected():
+    with pytest.raises(CodecError, match="Trailing"):
+        loads(dumps("value") + b"\x00")
+
+
+def test_corrupted_input_raises_only_codec_errors():
+    rng = random.Random(0)
+    encoded = dumps({"route": DRAFTS[1], "tracking": DRAFTS[3], "values": VALUES[:-1]})
+    for _ in range(2000):
+        corrupted = bytearray(encoded)
+        for _ in range(rng.randint(1, 4)):
+            corrupted[rng.randrange(len(corrupted))] = rng.randrange(256)
+        try:
+            loads(bytes(corrupted))
+        except CodecError:
+            pass
@@ -0,0 +1,16 @@
+import pytest
+from environs import Env
+
+from tgbot.config import LoggingConfig
+
+
+def test_log_levels_are_validated(monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    assert LoggingConfig.from_env(Env()).level == "DEBUG"
+
+    monkeypatch.setenv("LOG_LEVEL", "VERBOSE")
+    with pytest.raises(ValueError, match="LOG_LEVEL must be one of .*INFO"):
+        LoggingConfig.from_env(Env())
+
+    monkeypatch.delenv("LOG_LEVEL")
+    assert LoggingConfig.from_env(Env()).level == "INFO"
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from aiogram import BaseMiddleware, Dispatcher, Router
+from aiogram.types import Chat, Message, User
+
+from tgbot.config import Config, Miscellaneous, TgBot
+from tgbot.handlers import routers_list
+from tgbot.handlers.route import RouteCreationStates
+from tgbot.handlers.support import SupportStates
+from tgbot.handlers.terminals import TerminalStates
+from tgbot.handlers.user import RegistrationStates
+from tgbot.keyboards.reply import reply_button_labels
+from tgbot.middlewares.dispatch_index import DispatchIndexMiddleware
+from tgbot.services.dispatch_index import DispatchIndex
+from tgbot.services.i18n import catalog
+
+STATES = [None] + [
+    state
+    for group in (RouteCreationStates, SupportStates, TerminalStates, RegistrationStates)
+    for state in group.__all_states_names__
+]
+
+
+class HandlerRecorder(BaseMiddleware):
+    """Records the handler the walk picked, instead of running it."""
+
+    def __init__(self):
+        self.picked = None
+
+    async def __call__(self, handler, event, data):
+        self.picked = data["handler"].callback
+        return "recorded"
+
+
+def message(text):
+    user = User(id=1, is_bot=False, first_name="Driver")
+    chat = Chat(id=1, type="private")
+    return Message(
+        message_id=1, date=datetime.now(timezone.utc), chat=chat, from_user=user, text=text
+    )
+
+
+@pytest.fixture(scope="module")
+def dispatcher():
+    config = Config(tg_bot=TgBot(token="42:TEST", admin_ids=[], use_redis=False), misc=Miscellaneous())
+    dp = Dispatcher()
+    dp.include_routers(*routers_list)
+    catalog.compile()
+    index = DispatchIndex(reply_button_labels())
+    asyncio.run(index.compile(dp, config=config))
+    recorder = HandlerRecorder()
+    dp.message.middleware(recorder)
+    yield dp, index, recorder, config
+    dp.message.middleware.unregister(recorder)
+
+
+def test_index_picks_the_handler_of_the_router_walk(dispatcher):
+    dp, index, recorder, config = dispatcher
+    middleware = DispatchIndexMiddleware(index)
+    assert len(index) > 0
+
+    async def unindexed(event, data):
+        raise AssertionError(f"{event.text!r} should have been dispatched by the index")
+
+    async def compare():
+        compared = 0
+        for label in sorted(index.labels):
+            for state in STATES:
+                if index.lookup(label, state) is None:
+                    continue
+                event = message(label)
+                data = {
+                    "bot": None,
+                    "raw_state": state,
+                    "event_from_user": event.from_user,
+                    "event_chat": event.chat,
+                    "config": config,
+                }
+
+                recorder.picked = None
+                await dp.propagate_event("message", event, **dict(data))
+                walked = recorder.picked
+                assert walked is not None, (label, state)
+
+                recorder.picked = None
+                await middleware(unindexed, event, dict(data))
+                assert recorder.picked is walked, (label, state)
+                compared += 1
+        return compared
+
+    assert asyncio.run(compare()) >= len(index)
+
+
+def test_compile_refuses_routers_with_outer_middlewares():
+    dp = Dispatcher()
+    router = Router(name="with_outer")
+
+    @router.message()
+    async def anything(message):
+        pass
+
+    router.message.outer_middleware(HandlerRecorder())
+    dp.include_router(router)
+
+    with pytest.raises(RuntimeError, match="with_outer"):
+        asyncio.run(DispatchIndex(["label"]).compile(dp))
@@ -0,0 +1,26 @@
+import asyncio
+
+from tgbot.services.lanes import HIGH_LANE, LOW_LANE, UpdateLanes
+
+
+def test_shedding_drops_the_oldest_waiting_update():
+    lanes = UpdateLanes(concurrency=1, low_latency_budget=0.0, low_max_pending=2)
+
+    async def scenario():
+        assert await lanes.acquire(HIGH_LANE)
+        waiting = [asyncio.create_task(lanes.acquire(LOW_LANE, key)) for key in ("a", "b")]
+        await asyncio.sleep(0.01)
+        newest = asyncio.create_task(lanes.acquire(LOW_LANE, "c"))
+        await asyncio.sleep(0)
+
+        assert await asyncio.wait_for(waiting[0], 1) is False
+        assert lanes.shed == 1
+        assert lanes.depth[LOW_LANE] == 2
+
+        lanes.release()
+        assert await waiting[1] is True
+        lanes.release()
+        assert await newest is True
+        lanes.release()
+
+    asyncio.run(scenario())
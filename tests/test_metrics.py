@@ -0,0 +1,34 @@
+import os
+import time
+
+from tgbot.services import metrics
+
+requests_total = metrics.counter("test_snapshot_requests_total", "Requests seen by a test")
+
+
+def test_containers_with_the_same_pid_write_separate_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.os, "getpid", lambda: 1)
+    paths = []
+    for host, count in (("bot-a", 2), ("bot-b", 3)):
+        monkeypatch.setattr(metrics.socket, "gethostname", lambda host=host: host)
+        requests_total.value = count
+        paths.append(metrics.write_snapshot(str(tmp_path)))
+
+    assert [os.path.basename(path) for path in paths] == ["bot-a-1.json", "bot-b-1.json"]
+    merged = metrics.merge(metrics.read_snapshots(str(tmp_path)))
+    assert merged["test_snapshot_requests_total"]["samples"] == {(): 5}
+
+
+def test_stale_snapshots_are_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.socket, "gethostname", lambda: "bot/a b")
+    live = metrics.write_snapshot(str(tmp_path))
+    assert os.path.basename(live) == f"bot_a_b-{os.getpid()}.json"
+
+    old = time.time() - 600
+    for name in ("old-1.json", "old-2.json.tmp"):
+        path = tmp_path / name
+        path.write_text("{}")
+        os.utime(path, (old, old))
+
+    assert len(metrics.read_snapshots(str(tmp_path), stale_after=60)) == 1
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(live)]
@@ -0,0 +1,27 @@
+import asyncio
+
+from aiogram.methods import GetMe, SendMessage
+
+from tgbot.services import metrics, outbox
+from tgbot.services.outbox import Outbox
+
+
+def test_request_time_is_exported_per_method():
+    sent = outbox.request_seconds.labels("sendMessage")
+    before = sum(sent.counts)
+
+    async def make_request(bot, method):
+        await asyncio.sleep(0.01)
+        return method.__api_method__
+
+    async def scenario():
+        box = Outbox(rate=1000, per_chat_rate=1000)
+        assert await box(make_request, None, SendMessage(chat_id=1, text="Hi")) == "sendMessage"
+        assert await box(make_request, None, GetMe()) == "getMe"
+
+    asyncio.run(scenario())
+
+    assert sum(sent.counts) == before + 1
+    assert sent.sum >= 0.01
+    samples = metrics.snapshot()["bot_telegram_request_seconds"]["samples"]
+    assert {tuple(labels) for labels, _ in samples} >= {("sendMessage",), ("getMe",)}
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from tgbot.services import profiling
+
+
+def test_profiles_run_in_the_background_one_at_a_time():
+    async def scenario():
+        sent = []
+
+        async def job():
+            sent.append(await profiling.sample_stacks(0.05))
+
+        task = profiling.start(job())
+        # The caller returns before the profile is taken
+        assert not sent
+
+        second = job()
+        with pytest.raises(profiling.ProfilerBusy):
+            profiling.start(second)
+        assert second.cr_frame is None
+
+        await task
+        assert len(sent) == 1
+        assert not profiling._tasks
+        profiling.start(job())
+        await asyncio.sleep(0)
+        assert await profiling.cancel() == 1
+        assert not profiling._tasks
+        assert not profiling._running.locked()
+
+    asyncio.run(scenario())
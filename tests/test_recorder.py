@@ -0,0 +1,151 @@
+import asyncio
+from datetime import datetime, timezone
+
+from tgbot.services.recorder import Scrubber, UpdateRecorder, read_recording, run_path
+
+
+def update(update_id: int):
+    return {"update_id": update_id, "message": {"chat": {"id": 1}, "text": "/start"}}
+
+
+def record(path: str, batches):
+    recorder = UpdateRecorder(path)
+
+    async def scenario():
+        for batch in batches:
+            for update_id in batch:
+                recorder.record(update(update_id), recorder.started, 0.001)
+            await recorder.flush()
+
+    asyncio.run(scenario())
+
+
+def test_flushes_are_read_in_order(tmp_path):
+    path = str(tmp_path / "updates.jsonl.gz")
+    record(path, [range(3), range(3, 5)])
+
+    assert [entry["update"] for entry in read_recording(path)] == [update(i) for i in range(5)]
+
+
+def test_truncated_recording_ends_at_the_last_complete_line(tmp_path):
+    path = tmp_path / "updates.jsonl.gz"
+    record(str(path), [range(50), range(50, 100)])
+    whole = path.read_bytes()
+
+    # Killed while writing the second flush
+    path.write_bytes(whole[:-20])
+    ids = [entry["update"]["update_id"] for entry in read_recording(str(path))]
+    assert ids == list(range(len(ids)))
+    assert 50 <= len(ids) < 100
+
+    # Cut inside the header of the second gzip member
+    first = tmp_path / "first.jsonl.gz"
+    record(str(first), [range(50)])
+    path.write_bytes(whole[: len(first.read_bytes()) + 5])
+    assert [entry["update"]["update_id"] for entry in read_recording(str(path))] == list(range(50))
+
+
+def test_run_path_adds_the_start_time():
+    started = datetime(2025, 1, 2, 9, 0, tzinfo=timezone.utc)
+    assert run_path("recordings/updates.jsonl.gz", started) == (
+        "recordings/updates-20250102T090000Z.jsonl.gz"
+    )
+    assert run_path("updates", started) == "updates-20250102T090000Z"
+
+
+DRIVER = {"id": 700000001, "is_bot": False, "first_name": "Alisher", "username": "ali_98"}
+CHAT = {"id": 700000001, "type": "private", "first_name": "Alisher"}
+
+
+def test_contacts_venues_and_entities_are_scrubbed():
+    scrubber = Scrubber(frozenset({"🚛 Yo'nalish"}), salt=b"salt")
+    contact = scrubber.scrub(
+        {
+            "message_id": 1,
+            "from": DRIVER,
+            "chat": CHAT,
+            "contact": {
+                "phone_number": "+998901234567",
+                "first_name": "Alisher",
+                "last_name": "Valiyev",
+                "user_id": 700000001,
+                "vcard": "BEGIN:VCARD\nTEL:+998901234567\nEND:VCARD",
+            },
+        }
+    )
+    assert contact["contact"] == {
+        "phone_number": "+998000000000",
+        "first_name": "Xxxxxxx",
+        "last_name": "Xxxxxxx",
+        "user_id": contact["from"]["id"],
+        "vcard": "XXXXX:XXXXX\nXXX:+000000000000\nXXX:XXXXX",
+    }
+    assert contact["from"]["id"] == contact["chat"]["id"] != DRIVER["id"]
+    assert contact["from"]["username"] == "xxx_00"
+
+    venue = scrubber.scrub(
+        {
+            "venue": {
+                "location": {"latitude": 41.311081, "longitude": 69.240562},
+                "title": "Home",
+                "address": "Amir Temur 15, Tashkent",
+            }
+        }
+    )["venue"]
+    assert venue == {
+        "location": {"latitude": 41.31, "longitude": 69.24},
+        "title": "Xxxx",
+        "address": "Xxxx Xxxxx 00, Xxxxxxxx",
+    }
+
+    entities = scrubber.scrub(
+        {
+            "text": "Call Ali at example.com",
+            "entities": [
+                {"type": "text_mention", "offset": 5, "length": 3, "user": DRIVER},
+                {"type": "text_link", "offset": 12, "length": 11, "url": "https://ali.uz/me"},
+            ],
+        }
+    )
+    assert entities["text"] == "Xxxx Xxx xx xxxxxxx.xxx"
+    mention, link = entities["entities"]
+    assert mention["user"]["id"] == contact["from"]["id"]
+    assert mention["user"]["first_name"] == "Xxxxxxx"
+    assert (mention["offset"], mention["length"]) == (5, 3)
+    assert link["url"] == "xxxxx://xxx.xx/xx"
+
+    # Reply button labels and commands are kept, so the replay takes the same paths
+    assert scrubber.scrub({"text": "🚛 Yo'nalish"}) == {"text": "🚛 Yo'nalish"}
+    assert scrubber.scrub({"text": "/start"}) == {"text": "/start"}
+
+
+def test_callback_queries_and_their_messages_are_scrubbed():
+    scrubber = Scrubber(salt=b"salt")
+    callback = scrubber.scrub(
+        {
+            "id": "4382",
+            "from": DRIVER,
+            "chat_instance": "-6120",
+            "data": "hour:9",
+            "message": {
+                "message_id": 7,
+                "from": {"id": 42, "is_bot": True, "first_name": "Bot"},
+                "chat": CHAT,
+                "text": "Truck: 01A123BC\nTerminal: T03",
+                "reply_markup": {
+                    "inline_keyboard": [[{"text": "09:00", "callback_data": "hour:9"}]]
+                },
+            },
+        }
+    )
+    assert callback["data"] == "hour:9"
+    assert callback["from"]["id"] == callback["message"]["chat"]["id"] != DRIVER["id"]
+    assert callback["message"]["chat"]["first_name"] == "Xxxxxxx"
+    assert callback["message"]["text"] == "Xxxxx: 00X000XX\nXxxxxxxx: X00"
+    button = callback["message"]["reply_markup"]["inline_keyboard"][0][0]
+    assert button == {"text": "00:00", "callback_data": "hour:9"}
+
+    # The same user gets the same pseudonym within a recording, another one in the next
+    assert Scrubber(salt=b"salt").pseudonym(DRIVER["id"]) == callback["from"]["id"]
+    assert Scrubber(salt=b"other").pseudonym(DRIVER["id"]) != callback["from"]["id"]
+    assert Scrubber(salt=b"salt").pseudonym(-100123) < 0
@@ -0,0 +1,197 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from fakeredis.aioredis import FakeRedis
+
+from tgbot.services.route_draft import RouteDraft
+from tgbot.storage import codec
+from tgbot.storage.drafts import RegistrationDraft, TrackingDraft
+from tgbot.storage.redis import PipelinedRedisStorage
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+ROUTE_STATE = "RouteCreationStates:waiting_for_eta_date"
+
+
+def run(scenario):
+    async def with_storage():
+        storage = PipelinedRedisStorage(FakeRedis())
+        try:
+            await scenario(storage)
+        finally:
+            await storage.close()
+
+    asyncio.run(with_storage())
+
+
+async def update_data(storage, **changes):
+    data = await storage.get_data(KEY)
+    data.update(changes)
+    await storage.set_data(KEY, data)
+
+
+def test_overlapping_batches_keep_each_others_drafts():
+    async def scenario(storage):
+        await storage.set_data(KEY, {"route": RouteDraft("ru", "01A123BC")})
+        backend_call = asyncio.Event()
+        location_saved = asyncio.Event()
+
+        async def route_step():
+            async with storage.batch():
+                await storage.get_state(KEY)
+                draft = (await storage.get_data(KEY))["route"]
+                backend_call.set()
+                # Waiting on the backend while a live location edit comes in
+                await location_saved.wait()
+                draft.terminal_id = 3
+                draft.terminal_name = "T03"
+                await update_data(storage, route=draft)
+                await storage.set_state(KEY, ROUTE_STATE)
+
+        async def location_edit():
+            await backend_call.wait()
+            async with storage.batch():
+                await update_data(storage, tracking=TrackingDraft(True, 41.3, 69.2, 1.0))
+            location_saved.set()
+
+        await asyncio.gather(route_step(), location_edit())
+
+        data = await storage.get_data(KEY)
+        assert data["route"].terminal_id == 3
+        assert data["tracking"] == TrackingDraft(True, 41.3, 69.2, 1.0)
+        assert await storage.get_state(KEY) == ROUTE_STATE
+
+    run(scenario)
+
+
+def test_overlapping_batches_keep_the_state_set_by_the_other():
+    async def scenario(storage):
+        first_read = asyncio.Event()
+        state_set = asyncio.Event()
+
+        async def reads_then_writes_data():
+            async with storage.batch():
+                await storage.get_state(KEY)
+                first_read.set()
+                await state_set.wait()
+                await update_data(storage, route=RouteDraft("uz"))
+
+        async def sets_state():
+            await first_read.wait()
+            async with storage.batch():
+                await storage.set_state(KEY, ROUTE_STATE)
+            state_set.set()
+
+        await asyncio.gather(reads_then_writes_data(), sets_state())
+
+        assert await storage.get_state(KEY) == ROUTE_STATE
+        assert await storage.get_data(KEY) == {"route": RouteDraft("uz")}
+
+    run(scenario)
+
+
+def test_batch_reads_once_and_writes_only_changed_fields():
+    async def scenario(storage):
+        redis = storage.redis
+        await storage.set_data(KEY, {"route": RouteDraft("ru"), "other": 1})
+        redis_key = storage._key(KEY)
+        before = await redis.hgetall(redis_key)
+
+        async with storage.batch():
+            await storage.get_state(KEY)
+            await update_data(storage, other=2)
+            assert (await storage.get_data(KEY))["other"] == 2
+            # Nothing is written until the batch ends
+            assert await redis.hgetall(redis_key) == before
+
+        stored = await redis.hgetall(redis_key)
+        assert stored[b"d:other"] == codec.dumps(2)
+        assert stored[b"d:route"] == before[b"d:route"]
+
+    run(scenario)
+
+
+def test_removed_keys_and_cleared_users_are_deleted():
+    async def scenario(storage):
+        redis = storage.redis
+        redis_key = storage._key(KEY)
+        await storage.set_state(KEY, ROUTE_STATE)
+        await storage.set_data(KEY, {"route": RouteDraft(), "other": 1})
+        assert 0 < await redis.ttl(redis_key) <= storage.ttl(ROUTE_STATE)
+
+        await storage.set_data(KEY, {"other": 1})
+        assert set(await redis.hgetall(redis_key)) == {b"s", b"d:other"}
+
+        async with storage.batch():
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+        assert not await redis.exists(redis_key)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+    run(scenario)
+
+
+def test_users_stored_by_aiogram_are_moved_to_a_hash():
+    async def scenario(storage):
+        redis = storage.redis
+        # As the bot stored them before, with aiogram's RedisStorage
+        aiogram = RedisStorage(
+            redis, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        )
+        await aiogram.set_state(KEY, ROUTE_STATE)
+        await aiogram.set_data(
+            KEY,
+            {
+                "language": "ru",
+                "truck_number": "01A123BC",
+                "terminals": {"T03": 3},
+                "selected_terminal_id": 3,
+                "selected_terminal_name": "T03",
+                "eta_date": "2025-01-02",
+                "eta_hour": "9",
+                "live_location_active": True,
+                "latitude": 41.3,
+                "longitude": 69.2,
+                "reminder_active": True,
+                "current_terminal_id": 3,
+            },
+        )
+        other = StorageKey(bot_id=42, chat_id=2, user_id=2)
+        await aiogram.set_state(other, "RegistrationStates:waiting_for_last_name")
+        await aiogram.set_data(other, {"language": "uz", "phone": "+998901234567"})
+
+        async with storage.batch():
+            assert await storage.get_state(KEY) == ROUTE_STATE
+            assert await storage.get_data(KEY) == {
+                "route": RouteDraft("ru", "01A123BC", 3, "T03", "2025-01-02", "9"),
+                "tracking": TrackingDraft(True, 41.3, 69.2, 0.0, True),
+                "current_terminal_id": 3,
+            }
+
+        assert await aiogram.get_state(KEY) is None
+        assert await aiogram.get_data(KEY) == {}
+        stored = await redis.hgetall(storage._key(KEY))
+        assert stored[b"s"] == ROUTE_STATE.encode()
+        assert set(stored) == {b"s", b"d:route", b"d:tracking", b"d:current_terminal_id"}
+        assert 0 < await redis.ttl(storage._key(KEY)) <= storage.ttl(ROUTE_STATE)
+
+        assert await storage.get_data(other) == {
+            "registration": RegistrationDraft("uz", "+998901234567")
+        }
+        assert await storage.get_state(other) == "RegistrationStates:waiting_for_last_name"
+        assert set(await redis.keys("*")) == {
+            storage._key(KEY).encode(),
+            storage._key(other).encode(),
+        }
+
+    run(scenario)
+
+
+def test_users_without_any_entry_read_as_empty():
+    async def scenario(storage):
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        assert await storage.redis.keys("*") == []
+
+    run(scenario)
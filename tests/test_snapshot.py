@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from tgbot.storage import codec
+from tgbot.storage.drafts import TrackingDraft
+from tgbot.storage.memory import BoundedMemoryStorage
+from tgbot.storage.snapshot import Snapshot, encode_record, key_hash, write_snapshot
+
+
+def key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+
+
+def records(users, state="RouteCreationStates:waiting_for_terminal"):
+    now = time.time()
+    for user_id in users:
+        data = codec.dumps({"user": user_id})
+        yield key_hash(key(user_id)), encode_record(key(user_id), state, data, now)
+
+
+def test_written_records_are_read_lazily(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+    assert write_snapshot(path, records(range(1, 1001))) == 1000
+
+    snapshot = Snapshot(path)
+    try:
+        assert snapshot.count == 1000
+        for user_id in (1, 500, 1000):
+            state, data, used_at = snapshot.get(key(user_id))
+            assert state == "RouteCreationStates:waiting_for_terminal"
+            assert codec.loads(data) == {"user": user_id}
+            assert used_at <= time.time()
+        hashes = [hashed for hashed, _ in snapshot.raw_records()]
+        assert hashes == sorted(hashes)
+    finally:
+        snapshot.close()
+
+
+def test_missing_keys_are_none(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+    write_snapshot(path, records([1, 2, 3]))
+
+    snapshot = Snapshot(path)
+    try:
+        assert snapshot.get(key(4)) is None
+        # Same user in another chat is another key
+        assert snapshot.get(StorageKey(bot_id=42, chat_id=-100, user_id=1)) is None
+    finally:
+        snapshot.close()
+
+
+def test_colliding_hashes_are_told_apart_by_the_key(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+    now = time.time()
+    write_snapshot(
+        path,
+        [
+            (7, encode_record(key(1), "first", b"", now)),
+            (7, encode_record(key(2), "second", b"", now)),
+            (3, encode_record(key(3), "third", b"", now)),
+        ],
+    )
+
+    snapshot = Snapshot(path)
+    try:
+        assert snapshot.get(key(1), hashed=7)[0] == "first"
+        assert snapshot.get(key(2), hashed=7)[0] == "second"
+        assert snapshot.get(key(3), hashed=7) is None
+    finally:
+        snapshot.close()
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+    assert write_snapshot(path, []) == 0
+
+    snapshot = Snapshot(path)
+    try:
+        assert snapshot.count == 0
+        assert snapshot.get(key(1)) is None
+        assert list(snapshot.raw_records()) == []
+    finally:
+        snapshot.close()
+
+
+def test_mapped_file_can_be_replaced(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+    write_snapshot(path, records([1, 2], state="old"))
+
+    old = Snapshot(path)
+    try:
+        # The new snapshot is written from the mapped old one, as the storage does it
+        kept = [(hashed, bytes(record)) for hashed, record in old.raw_records()]
+        write_snapshot(path, [*kept[:1], *records([3], state="new")])
+
+        # The old mapping still sees the replaced file
+        assert old.get(key(1))[0] == "old"
+        assert old.get(key(2))[0] == "old"
+        assert old.get(key(3)) is None
+
+        new = Snapshot(path)
+        try:
+            assert new.count == 2
+            assert new.get(key(3))[0] == "new"
+            assert (new.get(key(1)) is None) != (new.get(key(2)) is None)
+        finally:
+            new.close()
+    finally:
+        old.close()
+    assert not (tmp_path / "fsm.bin.tmp").exists()
+
+
+def test_invalid_files_are_rejected(tmp_path):
+    path = tmp_path / "fsm.bin"
+    write_snapshot(str(path), records([1, 2, 3]))
+    valid = path.read_bytes()
+
+    path.write_bytes(b"NOTASNAP" + valid[8:])
+    with pytest.raises(codec.CodecError, match="not an FSM snapshot"):
+        Snapshot(str(path))
+
+    for size in (len(valid) - 1, 10):
+        path.write_bytes(valid[:size])
+        with pytest.raises(codec.CodecError, match="truncated"):
+            Snapshot(str(path))
+
+
+def test_storage_restores_users_from_its_snapshot(tmp_path):
+    path = str(tmp_path / "fsm.bin")
+
+    async def scenario():
+        storage = BoundedMemoryStorage()
+        await storage.set_state(key(1), "TerminalStates:viewing_terminals")
+        await storage.set_data(key(1), {"tracking": TrackingDraft(True, 41.3, 69.2)})
+        await storage.set_data(key(2), {"other": 2})
+        assert await storage.snapshot(path) == 2
+
+        # A second snapshot keeps the users nobody read from the first one
+        restarted = BoundedMemoryStorage()
+        assert restarted.restore(path) == 2
+        await restarted.set_data(key(3), {"new": 3})
+        assert await restarted.snapshot(path) == 3
+        await restarted.close()
+
+        restored = BoundedMemoryStorage()
+        assert restored.restore(path) == 3
+        assert await restored.get_state(key(1)) == "TerminalStates:viewing_terminals"
+        assert await restored.get_data(key(1)) == {"tracking": TrackingDraft(True, 41.3, 69.2)}
+        assert await restored.get_data(key(2)) == {"other": 2}
+        assert await restored.get_data(key(3)) == {"new": 3}
+        assert await restored.get_data(key(4)) == {}
+
+        # Cleared users don't come back from the snapshot
+        await restored.set_data(key(2), {})
+        assert await restored.get_data(key(2)) == {}
+        assert await restored.snapshot(path) == 2
+        await restored.close()
+
+        again = BoundedMemoryStorage()
+        assert again.restore(path) == 2
+        assert await again.get_data(key(2)) == {}
+        assert await again.get_data(key(3)) == {"new": 3}
+        await again.close()
+
+    asyncio.run(scenario())
+
+
+def test_missing_or_empty_files_start_empty(tmp_path):
+    storage = BoundedMemoryStorage()
+    assert storage.restore(str(tmp_path / "missing.bin")) == 0
+
+    (tmp_path / "empty.bin").write_bytes(b"")
+    assert storage.restore(str(tmp_path / "empty.bin")) == 0
+
+    (tmp_path / "cut.bin").write_bytes(b"T2TFSM")
+    assert storage.restore(str(tmp_path / "cut.bin")) == 0
@@ -0,0 +1,89 @@
+import asyncio
+
+from tgbot.services.terminal_catalog import TerminalCatalog
+
+
+class ScopedApi:
+    """Every driver sees the terminals listed for them."""
+
+    def __init__(self, terminals):
+        self.terminals = terminals
+        self.calls = 0
+
+    async def get_terminals(self, telegram_id):
+        self.calls += 1
+        return [{"id": number, "name": f"T{number:02d}"} for number in self.terminals[telegram_id]]
+
+    async def get_terminal(self, terminal_id, telegram_id):
+        self.calls += 1
+        if terminal_id not in self.terminals[telegram_id]:
+            return None
+        return {"id": terminal_id, "name": f"T{terminal_id:02d}", "seen_by": len(self.terminals)}
+
+
+def test_lists_are_kept_per_driver():
+    api = ScopedApi({1: [1, 2], 2: [3]})
+    catalog = TerminalCatalog(api)
+
+    async def scenario():
+        assert [t["id"] for t in await catalog.terminals(1)] == [1, 2]
+        assert [t["id"] for t in await catalog.terminals(2)] == [3]
+        assert [t["id"] for t in await catalog.terminals(1)] == [1, 2]
+        assert catalog.terminal_id("T01", telegram_id=1) == 1
+        assert catalog.terminal_id("T01", telegram_id=2) is None
+        assert catalog.terminal_id("T01", telegram_id=3) is None
+        assert await catalog.terminal(3, telegram_id=1) is None
+        assert (await catalog.terminal(3, telegram_id=2))["id"] == 3
+
+    asyncio.run(scenario())
+    assert api.calls == 4
+
+
+def test_drivers_with_equal_lists_share_renders():
+    api = ScopedApi({1: [1, 2], 2: [1, 2], 3: [1]})
+    catalog = TerminalCatalog(api)
+    built = []
+
+    def build(telegram_id):
+        def render():
+            built.append(telegram_id)
+            return telegram_id
+
+        return catalog.render("list", "ru", render, telegram_id=telegram_id)
+
+    async def scenario():
+        for telegram_id in (1, 2, 3):
+            await catalog.terminals(telegram_id)
+
+    asyncio.run(scenario())
+    assert build(1) == 1
+    assert build(2) == 1
+    assert build(3) == 3
+    assert built == [1, 3]
+
+
+def test_invalidate_refetches():
+    api = ScopedApi({1: [1]})
+    catalog = TerminalCatalog(api)
+
+    async def scenario():
+        await catalog.terminals(1)
+        await catalog.terminals(1)
+        catalog.invalidate()
+        await catalog.terminals(1)
+
+    asyncio.run(scenario())
+    assert api.calls == 2
+
+
+def test_stale_entries_are_swept():
+    api = ScopedApi({1: [1], 2: [2]})
+    catalog = TerminalCatalog(api, ttl=0)
+
+    async def scenario():
+        await catalog.terminals(1)
+        await catalog.terminals(2)
+
+    asyncio.run(scenario())
+    assert set(catalog._lists) == {2}
+    assert len(catalog._data) == 1
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import logging
+from dataclasses import dataclass, field
 from typing import Optional
 
 from environs import Env
@@ -101,11 +102,15 @@ class RedisConfig:
         The port where Redis server is listening.
     redis_host : Optional(str)
         The host where Redis server is located.
+    fsm_ttl : float
+        How many seconds the FSM state and data of a user outside of any flow are kept
+        since they were last written. Flows have their own, shorter TTLs.
     """
 
     redis_pass: Optional[str]
     redis_port: Optional[int]
     redis_host: Optional[str]
+    fsm_ttl: float = 7 * 24 * 3600
 
     def dsn(self) -> str:
         """
@@ -124,12 +129,469 @@ class RedisConfig:
         redis_pass = env.str("REDIS_PASSWORD")
         redis_port = env.int("REDIS_PORT")
         redis_host = env.str("REDIS_HOST")
+        fsm_ttl = env.float("REDIS_FSM_TTL", 7 * 24 * 3600)
 
         return RedisConfig(
-            redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host
+            redis_pass=redis_pass,
+            redis_port=redis_port,
+            redis_host=redis_host,
+            fsm_ttl=fsm_ttl,
         )
 
 
+@dataclass
+class LanesConfig:
+    """
+    Priority lanes configuration class.
+
+    Attributes
+    ----------
+    concurrency : int
+        How many updates may be processed at the same time.
+    low_latency_budget : float
+        Queue time (seconds) of the low lane after which live-location edits get merged or shed.
+    low_max_pending : int
+        How many low-lane updates may wait once the latency budget is exceeded.
+    """
+
+    concurrency: int = 64
+    low_latency_budget: float = 1.0
+    low_max_pending: int = 500
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the LanesConfig object from environment variables.
+        """
+        concurrency = env.int("LANES_CONCURRENCY", 64)
+        low_latency_budget = env.float("LANES_LOW_LATENCY_BUDGET", 1.0)
+        low_max_pending = env.int("LANES_LOW_MAX_PENDING", 500)
+        return LanesConfig(
+            concurrency=concurrency,
+            low_latency_budget=low_latency_budget,
+            low_max_pending=low_max_pending,
+        )
+
+
+@dataclass
+class CatchUpConfig:
+    """
+    Startup catch-up configuration class.
+
+    Attributes
+    ----------
+    enabled : bool
+        Process the updates received while the bot was down instead of dropping them.
+        Off by default.
+    max_callback_age : float
+        Callback queries older than this many seconds are skipped during catch-up.
+    parallelism : int
+        How many chats are drained at the same time.
+    """
+
+    enabled: bool = False
+    max_callback_age: float = 300.0
+    parallelism: int = 64
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the CatchUpConfig object from environment variables.
+        """
+        enabled = env.bool("CATCH_UP_ON_START", False)
+        max_callback_age = env.float("CATCH_UP_MAX_CALLBACK_AGE", 300.0)
+        parallelism = env.int("CATCH_UP_PARALLELISM", 64)
+        return CatchUpConfig(
+            enabled=enabled, max_callback_age=max_callback_age, parallelism=parallelism
+        )
+
+
+@dataclass
+class ShutdownConfig:
+    """
+    Graceful shutdown configuration class.
+
+    Attributes
+    ----------
+    drain_timeout : float
+        How many seconds to wait for in-flight updates before cancelling them.
+    flush_timeout : float
+        How many seconds every flush hook may take.
+    timers_path : str
+        File where pending auto-cancel timers are saved on shutdown and restored on start.
+    """
+
+    drain_timeout: float = 8.0
+    flush_timeout: float = 5.0
+    timers_path: str = "auto_cancel_timers.json"
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the ShutdownConfig object from environment variables.
+        """
+        drain_timeout = env.float("SHUTDOWN_DRAIN_TIMEOUT", 8.0)
+        flush_timeout = env.float("SHUTDOWN_FLUSH_TIMEOUT", 5.0)
+        timers_path = env.str("SHUTDOWN_TIMERS_PATH", "auto_cancel_timers.json")
+        return ShutdownConfig(
+            drain_timeout=drain_timeout,
+            flush_timeout=flush_timeout,
+            timers_path=timers_path,
+        )
+
+
+@dataclass
+class BroadcastConfig:
+    """
+    Broadcast configuration class.
+
+    Attributes
+    ----------
+    jobs_dir : str
+        Directory where broadcast jobs and their progress are saved, so they can be resumed.
+    rate : float
+        Messages per second for all broadcasts together.
+    per_chat_rate : float
+        Messages per second to one chat.
+    workers : int
+        How many messages of a broadcast are sent at the same time.
+    """
+
+    jobs_dir: str = "broadcasts"
+    rate: float = 30.0
+    per_chat_rate: float = 1.0
+    workers: int = 16
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the BroadcastConfig object from environment variables.
+        """
+        jobs_dir = env.str("BROADCAST_JOBS_DIR", "broadcasts")
+        rate = env.float("BROADCAST_RATE", 30.0)
+        per_chat_rate = env.float("BROADCAST_PER_CHAT_RATE", 1.0)
+        workers = env.int("BROADCAST_WORKERS", 16)
+        return BroadcastConfig(
+            jobs_dir=jobs_dir, rate=rate, per_chat_rate=per_chat_rate, workers=workers
+        )
+
+
+@dataclass
+class OutboxConfig:
+    """
+    Outbound Bot API calls configuration class.
+
+    Attributes
+    ----------
+    rate : float
+        Messages and edits per second for the whole bot.
+    per_chat_rate : float
+        Messages and edits per second to one private chat.
+    group_rate : float
+        Messages and edits per second to one group.
+    per_chat_burst : float
+        How many messages a chat may get at once before its rate applies.
+    max_retry_after : float
+        Longer flood waits are not waited out, the error goes to the handler.
+    """
+
+    rate: float = 30.0
+    per_chat_rate: float = 1.0
+    group_rate: float = 20 / 60
+    per_chat_burst: float = 3.0
+    max_retry_after: float = 60.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the OutboxConfig object from environment variables.
+        """
+        rate = env.float("OUTBOX_RATE", 30.0)
+        per_chat_rate = env.float("OUTBOX_PER_CHAT_RATE", 1.0)
+        group_rate = env.float("OUTBOX_GROUP_RATE", 20 / 60)
+        per_chat_burst = env.float("OUTBOX_PER_CHAT_BURST", 3.0)
+        max_retry_after = env.float("OUTBOX_MAX_RETRY_AFTER", 60.0)
+        return OutboxConfig(
+            rate=rate,
+            per_chat_rate=per_chat_rate,
+            group_rate=group_rate,
+            per_chat_burst=per_chat_burst,
+            max_retry_after=max_retry_after,
+        )
+
+
+@dataclass
+class TerminalsConfig:
+    """
+    Terminal catalog configuration class.
+
+    Attributes
+    ----------
+    cache_ttl : float
+        How many seconds the terminals fetched from the API are shared before being refetched.
+    """
+
+    cache_ttl: float = 300.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the TerminalsConfig object from environment variables.
+        """
+        cache_ttl = env.float("TERMINALS_CACHE_TTL", 300.0)
+        return TerminalsConfig(cache_ttl=cache_ttl)
+
+
+@dataclass
+class MemoryStorageConfig:
+    """
+    In-memory FSM storage configuration class, used when Redis is off.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Approximate memory the FSM state and data of all users may take; the least recently
+        active users are dropped beyond it.
+    idle_ttl : float
+        How many seconds a user's FSM state and data are kept since they were last used.
+    snapshot_path : str
+        File the FSM state and data are saved to on shutdown and periodically, and restored
+        from on startup. Empty to keep them in memory only.
+    snapshot_interval : float
+        How many seconds pass between periodic snapshots.
+    """
+
+    max_bytes: int = 64 * 1024 * 1024
+    idle_ttl: float = 7 * 24 * 3600
+    snapshot_path: str = "fsm_snapshot.bin"
+    snapshot_interval: float = 300.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the MemoryStorageConfig object from environment variables.
+        """
+        max_bytes = env.int("FSM_MEMORY_MAX_BYTES", 64 * 1024 * 1024)
+        idle_ttl = env.float("FSM_MEMORY_IDLE_TTL", 7 * 24 * 3600)
+        snapshot_path = env.str("FSM_SNAPSHOT_PATH", "fsm_snapshot.bin")
+        snapshot_interval = env.float("FSM_SNAPSHOT_INTERVAL", 300.0)
+        return MemoryStorageConfig(
+            max_bytes=max_bytes,
+            idle_ttl=idle_ttl,
+            snapshot_path=snapshot_path,
+            snapshot_interval=snapshot_interval,
+        )
+
+
+@dataclass
+class MetricsConfig:
+    """
+    Metrics configuration class.
+
+    Attributes
+    ----------
+    directory : str
+        Directory every bot process writes its metrics snapshot to, and the API reads
+        them from to serve /metrics.
+    interval : float
+        How many seconds pass between the snapshots of a bot process.
+    """
+
+    directory: str = "metrics"
+    interval: float = 10.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the MetricsConfig object from environment variables.
+        """
+        directory = env.str("METRICS_DIR", "metrics")
+        interval = env.float("METRICS_INTERVAL", 10.0)
+        return MetricsConfig(directory=directory, interval=interval)
+
+
+@dataclass
+class TracingConfig:
+    """
+    Update tracing configuration class.
+
+    Attributes
+    ----------
+    sample_rate : float
+        Share of updates whose traces are exported, from 0 to 1.
+    slow_threshold : float
+        Updates that take at least this many seconds are always exported.
+    path : str
+        File the exported traces are appended to, as Zipkin JSON. Empty to not write them.
+    zipkin_url : str
+        Zipkin-compatible collector the exported traces are posted to, e.g.
+        http://zipkin:9411/api/v2/spans. Empty to not post them.
+    """
+
+    sample_rate: float = 0.0
+    slow_threshold: float = 2.0
+    path: str = "traces.jsonl"
+    zipkin_url: str = ""
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the TracingConfig object from environment variables.
+        """
+        sample_rate = env.float("TRACING_SAMPLE_RATE", 0.0)
+        slow_threshold = env.float("TRACING_SLOW_THRESHOLD", 2.0)
+        path = env.str("TRACING_PATH", "traces.jsonl")
+        zipkin_url = env.str("TRACING_ZIPKIN_URL", "")
+        return TracingConfig(
+            sample_rate=sample_rate,
+            slow_threshold=slow_threshold,
+            path=path,
+            zipkin_url=zipkin_url,
+        )
+
+
+@dataclass
+class LoopMonitorConfig:
+    """
+    Event loop monitor configuration class.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether the event loop lag is measured and blocking callbacks are reported.
+    interval : float
+        How many seconds pass between the ticks the lag is measured on.
+    slow_threshold : float
+        How many seconds the loop may be blocked before the stack blocking it is logged.
+    """
+
+    enabled: bool = True
+    interval: float = 0.1
+    slow_threshold: float = 0.25
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the LoopMonitorConfig object from environment variables.
+        """
+        enabled = env.bool("LOOP_MONITOR_ENABLED", True)
+        interval = env.float("LOOP_MONITOR_INTERVAL", 0.1)
+        slow_threshold = env.float("LOOP_MONITOR_SLOW_THRESHOLD", 0.25)
+        return LoopMonitorConfig(
+            enabled=enabled, interval=interval, slow_threshold=slow_threshold
+        )
+
+
+@dataclass
+class CallLedgerConfig:
+    """
+    Backend call accounting configuration class.
+
+    Attributes
+    ----------
+    path : str
+        JSONL file the backend calls of every update are appended to, for the offline
+        report of `python -m tgbot.services.call_ledger`. Empty to only count them in metrics.
+    """
+
+    path: str = "api_calls.jsonl"
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the CallLedgerConfig object from environment variables.
+        """
+        path = env.str("CALL_LEDGER_PATH", "api_calls.jsonl")
+        return CallLedgerConfig(path=path)
+
+
+@dataclass
+class LoggingConfig:
+    """
+    Logging configuration class.
+
+    Attributes
+    ----------
+    level : str
+        Level of the root logger, e.g. INFO or DEBUG, in upper case.
+    json : bool
+        Whether records are written as JSON lines instead of colorized text.
+    tracking_rate : float
+        How many [TRACKING] records below WARNING are written per second at most.
+        0 to write them all.
+    """
+
+    level: str = "INFO"
+    json: bool = False
+    tracking_rate: float = 1.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the LoggingConfig object from environment variables.
+        """
+        level = env.str("LOG_LEVEL", "INFO").upper()
+        # betterlogging registers its TRACE level the other way round, under an int
+        levels = [name for name in logging.getLevelNamesMapping() if isinstance(name, str)]
+        if level not in levels:
+            raise ValueError(f"LOG_LEVEL must be one of {', '.join(sorted(levels))}, not {level}")
+        json = env.bool("LOG_JSON", False)
+        tracking_rate = env.float("LOG_TRACKING_RATE", 1.0)
+        return LoggingConfig(level=level, json=json, tracking_rate=tracking_rate)
+
+
+@dataclass
+class ApiConfig:
+    """
+    Backend API configuration class.
+
+    Attributes
+    ----------
+    base_url : str
+        Base URL of the backend API, e.g. http://127.0.0.1:8081 for the stand-in of
+        `python -m infrastructure.standin.server`.
+    """
+
+    base_url: str = "https://khamraev.uz"
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the ApiConfig object from environment variables.
+        """
+        base_url = env.str("API_BASE_URL", "https://khamraev.uz")
+        return ApiConfig(base_url=base_url)
+
+
+@dataclass
+class RecorderConfig:
+    """
+    Update recording configuration class.
+
+    Attributes
+    ----------
+    path : str
+        Gzip JSONL file incoming updates are recorded to, for `benchmarks/replay.py`.
+        Every start writes a file of its own, with the start time added to this name.
+        Empty to not record them.
+    scrub : bool
+        Whether ids, names, phone numbers, free text and coordinates are scrubbed from
+        the recorded updates.
+    """
+
+    path: str = ""
+    scrub: bool = True
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the RecorderConfig object from environment variables.
+        """
+        path = env.str("RECORDER_PATH", "")
+        scrub = env.bool("RECORDER_SCRUB", True)
+        return RecorderConfig(path=path, scrub=scrub)
+
+
 @dataclass
 class Miscellaneous:
     """
@@ -164,12 +626,54 @@ class Config:
         Holds the settings specific to the database (default is None).
     redis : Optional[RedisConfig]
         Holds the settings specific to Redis (default is None).
+    lanes : LanesConfig
+        Holds the settings of the update priority lanes.
+    catch_up : CatchUpConfig
+        Holds the settings of processing the backlog on startup.
+    shutdown : ShutdownConfig
+        Holds the settings of the graceful shutdown.
+    broadcast : BroadcastConfig
+        Holds the settings of sending broadcasts.
+    outbox : OutboxConfig
+        Holds the rate limits of outbound Bot API calls.
+    terminals : TerminalsConfig
+        Holds the settings of the terminal catalog.
+    memory_storage : MemoryStorageConfig
+        Holds the limits of the in-memory FSM storage.
+    metrics : MetricsConfig
+        Holds the settings of publishing metrics.
+    tracing : TracingConfig
+        Holds the settings of tracing updates.
+    loop_monitor : LoopMonitorConfig
+        Holds the settings of the event loop monitor.
+    call_ledger : CallLedgerConfig
+        Holds the settings of accounting for the backend calls of every update.
+    logging : LoggingConfig
+        Holds the settings of logging.
+    api : ApiConfig
+        Holds the settings of the backend API.
+    recorder : RecorderConfig
+        Holds the settings of recording incoming updates.
     """
 
     tg_bot: TgBot
     misc: Miscellaneous
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
+    lanes: LanesConfig = field(default_factory=LanesConfig)
+    catch_up: CatchUpConfig = field(default_factory=CatchUpConfig)
+    shutdown: ShutdownConfig = field(default_factory=ShutdownConfig)
+    broadcast: BroadcastConfig = field(default_factory=BroadcastConfig)
+    outbox: OutboxConfig = field(default_factory=OutboxConfig)
+    terminals: TerminalsConfig = field(default_factory=TerminalsConfig)
+    memory_storage: MemoryStorageConfig = field(default_factory=MemoryStorageConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    loop_monitor: LoopMonitorConfig = field(default_factory=LoopMonitorConfig)
+    call_ledger: CallLedgerConfig = field(default_factory=CallLedgerConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+    api: ApiConfig = field(default_factory=ApiConfig)
+    recorder: RecorderConfig = field(default_factory=RecorderConfig)
 
 
 def load_config(path: str = None) -> Config:
@@ -185,9 +689,24 @@ def load_config(path: str = None) -> Config:
     env = Env()
     env.read_env(path)
 
+    tg_bot = TgBot.from_env(env)
     return Config(
-        tg_bot=TgBot.from_env(env),
+        tg_bot=tg_bot,
         # db=DbConfig.from_env(env),
-        # redis=RedisConfig.from_env(env),
+        redis=RedisConfig.from_env(env) if tg_bot.use_redis else None,
         misc=Miscellaneous(),
+        lanes=LanesConfig.from_env(env),
+        catch_up=CatchUpConfig.from_env(env),
+        shutdown=ShutdownConfig.from_env(env),
+        broadcast=BroadcastConfig.from_env(env),
+        outbox=OutboxConfig.from_env(env),
+        terminals=TerminalsConfig.from_env(env),
+        memory_storage=MemoryStorageConfig.from_env(env),
+        metrics=MetricsConfig.from_env(env),
+        tracing=TracingConfig.from_env(env),
+        loop_monitor=LoopMonitorConfig.from_env(env),
+        call_ledger=CallLedgerConfig.from_env(env),
+        logging=LoggingConfig.from_env(env),
+        api=ApiConfig.from_env(env),
+        recorder=RecorderConfig.from_env(env),
     )
@@ -1,5 +1,6 @@
 """Import all routers and add them to routers_list."""
 
+from .admin import admin_router
 from .cancel import cancel_router
 from .location import location_router
 from .profile import profile_router
@@ -9,7 +10,7 @@ from .terminals import terminals_router
 from .user import registration_router
 
 routers_list = [
-    # admin_router,
+    admin_router,
     cancel_router,
     location_router,
     terminals_router,
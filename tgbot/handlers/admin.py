@@ -1,13 +1,138 @@
-from aiogram import Router
-from aiogram.filters import CommandStart
-from aiogram.types import Message
+import re
+import time
+from functools import partial
+from typing import List, Optional
+
+from aiogram import Bot, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
 
 from tgbot.filters.admin import AdminFilter
+from tgbot.services import profiling
+from tgbot.services.broadcaster import Broadcaster, BroadcastReport
+from tgbot.services.terminal_catalog import TerminalCatalog
 
 admin_router = Router()
 admin_router.message.filter(AdminFilter())
 
+PROFILE_SECONDS = 10
+MEMORY_SECONDS = 30
+
+
+def _seconds(command: CommandObject, default: int) -> int:
+    try:
+        seconds = int(command.args) if command.args else default
+    except ValueError:
+        seconds = default
+    return max(1, min(seconds, profiling.MAX_SECONDS))
+
 
-@admin_router.message(CommandStart())
+@admin_router.message(Command("admin"))
 async def admin_start(message: Message):
-    await message.reply("Привет, администратор!")
+    await message.reply(
+        "Привет, администратор!\n\n"
+        "/profile N — профиль CPU за N секунд (folded stacks для flamegraph)\n"
+        "/memory N — рост памяти за N секунд (tracemalloc)\n"
+        "/refresh_terminals — сбросить кэш терминалов\n"
+        "/broadcast ID ID … — ответом на сообщение: разослать его текст "
+        "(ID можно приложить файлом, по одному в строке)\n"
+        "/broadcast_stop — остановить рассылки\n"
+        "/broadcast_resume — продолжить остановленные рассылки"
+    )
+
+
+@admin_router.message(Command("refresh_terminals"))
+async def refresh_terminals(message: Message, terminal_catalog: TerminalCatalog):
+    terminal_catalog.invalidate()
+    await message.reply("Кэш терминалов сброшен, данные будут загружены заново.")
+
+
+@admin_router.message(Command("profile"))
+async def profile_cpu(message: Message, command: CommandObject):
+    seconds = _seconds(command, PROFILE_SECONDS)
+    try:
+        profiling.start(send_cpu_profile(message, seconds))
+    except profiling.ProfilerBusy:
+        await message.reply("Профилирование уже идёт, попробуйте позже.")
+        return
+    await message.reply(f"Снимаю профиль CPU, {seconds} с…")
+
+
+async def send_cpu_profile(message: Message, seconds: int):
+    stacks = await profiling.sample_stacks(seconds)
+    await message.answer_document(
+        BufferedInputFile(stacks.encode(), filename=f"profile-{int(time.time())}.folded"),
+        caption=f"CPU, {seconds} с. Открыть: speedscope.app или flamegraph.pl",
+    )
+
+
+@admin_router.message(Command("memory"))
+async def profile_memory(message: Message, command: CommandObject):
+    seconds = _seconds(command, MEMORY_SECONDS)
+    try:
+        profiling.start(send_memory_profile(message, seconds))
+    except profiling.ProfilerBusy:
+        await message.reply("Профилирование уже идёт, попробуйте позже.")
+        return
+    await message.reply(f"Сравниваю снимки памяти с интервалом {seconds} с…")
+
+
+async def send_memory_profile(message: Message, seconds: int):
+    report = await profiling.allocation_diff(seconds)
+    await message.answer_document(
+        BufferedInputFile(report.encode(), filename=f"memory-{int(time.time())}.txt"),
+        caption=f"Рост памяти за {seconds} с",
+    )
+
+
+def _recipients(text: Optional[str]) -> List[int]:
+    return [int(user_id) for user_id in re.findall(r"-?\d+", text or "")]
+
+
+async def _report_broadcast(message: Message, report: BroadcastReport):
+    await message.answer(
+        f"Рассылка {report.job_id} {'остановлена' if report.interrupted else 'завершена'}: "
+        f"отправлено {report.sent} из {report.total} ({report.throughput:.1f} в секунду), "
+        f"пропущено {report.skipped}, неизвестно {report.unknown}, "
+        f"flood wait: {report.flood_waits}, ошибки: {report.failed or 'нет'}"
+    )
+
+
+@admin_router.message(Command("broadcast"))
+async def broadcast_start(
+    message: Message, command: CommandObject, bot: Bot, broadcaster: Broadcaster
+):
+    source = message.reply_to_message
+    users = _recipients(command.args)
+    if message.document:
+        ids = await bot.download(message.document)
+        users += _recipients(ids.read().decode(errors="ignore"))
+    if source is None or not source.text or not users:
+        await message.reply(
+            "Ответьте командой /broadcast ID ID … на сообщение, текст которого нужно "
+            "разослать. Получателей можно приложить файлом, по одному ID в строке."
+        )
+        return
+
+    job = broadcaster.submit(users, source.text)
+    broadcaster.start([job], notify=partial(_report_broadcast, message))
+    await message.reply(f"Рассылка {job.job_id} запущена: {len(set(job.users))} получателей.")
+
+
+@admin_router.message(Command("broadcast_stop"))
+async def broadcast_stop(message: Message, broadcaster: Broadcaster):
+    stopped = await broadcaster.stop()
+    if not stopped:
+        await message.reply("Сейчас нет рассылок.")
+        return
+    await message.reply("Рассылки остановлены. Продолжить: /broadcast_resume")
+
+
+@admin_router.message(Command("broadcast_resume"))
+async def broadcast_resume(message: Message, broadcaster: Broadcaster):
+    jobs = broadcaster.pending_jobs()
+    if not jobs:
+        await message.reply("Незавершённых рассылок нет.")
+        return
+    broadcaster.start(jobs, notify=partial(_report_broadcast, message))
+    await message.reply(f"Продолжаю рассылки: {', '.join(job.job_id for job in jobs)}")
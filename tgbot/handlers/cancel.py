@@ -3,19 +3,24 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
+from tgbot.services.i18n import catalog
+
 cancel_router = Router()
 
 
-CANCEL_TRANSLATIONS = {
-    "uz": {
-        "no_active_actions": "❌ Hozir sizda faol harakatlar yo'q.",
-        "process_canceled": "✅ Jarayon bekor qilindi. Istalgan vaqtda qayta boshlashingiz mumkin!",
-    },
-    "ru": {
-        "no_active_actions": "❌ У вас сейчас нет активных действий.",
-        "process_canceled": "✅ Процесс отменен. Вы можете начать снова в любое время!",
+CANCEL_TRANSLATIONS = catalog.register(
+    "cancel",
+    {
+        "uz": {
+            "no_active_actions": "❌ Hozir sizda faol harakatlar yo'q.",
+            "process_canceled": "✅ Jarayon bekor qilindi. Istalgan vaqtda qayta boshlashingiz mumkin!",
+        },
+        "ru": {
+            "no_active_actions": "❌ У вас сейчас нет активных действий.",
+            "process_canceled": "✅ Процесс отменен. Вы можете начать снова в любое время!",
+        },
     },
-}
+)
 
 
 @cancel_router.message(F.data == "cancel")
@@ -1,52 +1,50 @@
 import asyncio
 import logging
-from datetime import datetime, timezone
+import time
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
 from infrastructure.some_api.api import MyApi
+from tgbot.storage.drafts import TrackingDraft
 
 logger = logging.getLogger(__name__)
 location_router = Router()
 
 
-async def process_location(message: Message, state: FSMContext, is_edit: bool = False):
+async def process_location(
+    message: Message, state: FSMContext, api_client: MyApi, is_edit: bool = False
+):
     location = message.location
     latitude = location.latitude
     longitude = location.longitude
     horizontal_accuracy = getattr(location, "horizontal_accuracy", None)
     live_period = getattr(location, "live_period", None)
 
-    current_data = await state.get_data()
-    live_active = current_data.get("live_location_active", False)
+    tracking = await TrackingDraft.load(state)
 
     if not live_period:
-        if live_active:
-            await state.update_data(live_location_active=False)
-            logger.info(
-                f"[TRACKING] Live location stopped by user {message.from_user.id}"
-            )
+        if tracking.live_active:
+            tracking.live_active = False
+            await tracking.save(state)
+            logger.info("[TRACKING] Live location stopped by user %s", message.from_user.id)
             return
         else:
             await message.answer(
                 "❗️ Bu oddiy pin. 📍 Iltimos, 'Jonli joylashuv ulashish' ni tanlang.",
                 parse_mode="HTML",
             )
-            logger.warning(
-                f"[TRACKING] Static location received from {message.from_user.id}"
-            )
+            logger.warning("[TRACKING] Static location received from %s", message.from_user.id)
             return
 
     # Update FSM data
-    await state.update_data(
-        latitude=latitude,
-        longitude=longitude,
-        live_location_active=True,
-        live_location_last_updated=datetime.now(timezone.utc),
-        reminder_active=False,  # Disable old reminder (important!)
-    )
+    tracking.latitude = latitude
+    tracking.longitude = longitude
+    tracking.live_active = True
+    tracking.updated_at = time.time()
+    tracking.reminder_active = False  # Disable old reminder (important!)
+    await tracking.save(state)
 
     payload = {
         "telegram_id": message.from_user.id,
@@ -57,23 +55,22 @@ async def process_location(message: Message, state: FSMContext, is_edit: bool =
         payload["horizontal_accuracy"] = horizontal_accuracy
 
     try:
-        api_client = MyApi()
-        try:
-            await api_client.post_location(payload)
-
-            log_prefix = "[TRACKING][EDIT]" if is_edit else "[TRACKING]"
-            logger.info(
-                f"{log_prefix} Live location updated: lat={latitude}, lon={longitude}, accuracy={horizontal_accuracy}"
-            )
+        await api_client.post_location(payload)
+
+        logger.info(
+            "[TRACKING]%s Live location updated: lat=%s, lon=%s, accuracy=%s",
+            "[EDIT]" if is_edit else "",
+            latitude,
+            longitude,
+            horizontal_accuracy,
+        )
 
-            # Mark reminder as active after new task starts
-            await state.update_data(reminder_active=True)
-        finally:
-            # Ensure the API client is properly closed
-            await api_client.close()
+        # Mark reminder as active after new task starts
+        tracking.reminder_active = True
+        await tracking.save(state)
 
     except Exception as e:
-        logger.error(f"[TRACKING] Error posting location: {str(e)}")
+        logger.error("[TRACKING] Error posting location: %s", e)
         await message.reply(
             f"❗️ Error sending location to server: {str(e)}",
             parse_mode="HTML",
@@ -81,10 +78,10 @@ async def process_location(message: Message, state: FSMContext, is_edit: bool =
 
 
 @location_router.message(F.location)
-async def track_location(message: Message, state: FSMContext):
-    await process_location(message, state, is_edit=False)
+async def track_location(message: Message, state: FSMContext, api_client: MyApi):
+    await process_location(message, state, api_client, is_edit=False)
 
 
 @location_router.edited_message(F.location)
-async def track_location_update(message: Message, state: FSMContext):
-    await process_location(message, state, is_edit=True)
+async def track_location_update(message: Message, state: FSMContext, api_client: MyApi):
+    await process_location(message, state, api_client, is_edit=True)
@@ -1,29 +1,20 @@
-from aiogram import Router
+from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from infrastructure.some_api.api import MyApi
-from tgbot.keyboards.reply import REPLY_TRANSLATIONS, main_menu_keyboard
+from tgbot.keyboards.reply import button_labels, main_menu_keyboard
 
 profile_router = Router()
 
 
-@profile_router.message(
-    lambda msg: msg.text
-    in [
-        f"👤 {REPLY_TRANSLATIONS['uz']['my_profile']}",
-        f"👤 {REPLY_TRANSLATIONS['ru']['my_profile']}",
-    ]
-)
-async def show_my_profile(message: Message, state: FSMContext, api_client, language):
+@profile_router.message(F.text.in_(button_labels("my_profile")))
+async def show_my_profile(message: Message, state: FSMContext, profile, language):
     """
     Handler to show user's profile info when 'my_profile' button is pressed.
     """
 
-    # Use the shared API client from middleware instead of creating a new one
-    api = api_client or MyApi()
-    try:
-        profile = await api.get_user_profile(message.from_user.id)
+    # The profile is fetched once per update by the context middleware
+    if profile is not None:
         # Use 'language' directly
         if language == "uz":
             profile_msg = (
@@ -44,7 +35,7 @@ async def show_my_profile(message: Message, state: FSMContext, api_client, langu
         await message.answer(
             profile_msg, parse_mode="HTML", reply_markup=main_menu_keyboard(language)
         )
-    except Exception:
+    else:
         await message.answer(
             "Profil ma'lumotlarini olishda xatolik yuz berdi. Iltimos, qayta urinib ko'ring."
             if language == "uz"
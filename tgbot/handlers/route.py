@@ -1,19 +1,35 @@
-import asyncio
+from datetime import datetime
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+)
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram3_calendar import SimpleCalendar, simple_cal_callback
 
 from infrastructure.some_api.api import MyApi
 from tgbot.handlers.cancel import CANCEL_TRANSLATIONS
-from tgbot.services.auto_cancel import auto_cancel_after_timeout
+from tgbot.keyboards.calendar import (
+    DateCallbackFactory,
+    DateWindowKeyboard,
+    HourCallbackFactory,
+    HourSlotsKeyboard,
+)
+from tgbot.keyboards.reply import button_labels
+from tgbot.services.auto_cancel import scheduler as auto_cancel
+from tgbot.services.i18n import cached_per_language, catalog
 from tgbot.services.location_validation import validate_driver_location
+from tgbot.services.route_draft import RouteDraft
+from tgbot.services.terminal_catalog import TerminalCatalog
 
 route_router = Router()
 
+ETA_BOOKING_DAYS = 14
+
 
 class RouteCreationStates(StatesGroup):
     waiting_for_terminal = State()
@@ -24,234 +40,250 @@ class RouteCreationStates(StatesGroup):
     waiting_for_container_type = State()
 
 
-ROUTE_CREATION_TRANSLATIONS = {
-    "uz": {
-        "select_terminal": "🏢 Terminalni tanlang (1/6):",
-        "select_eta_date": "📅 Yetib kelish sanasini tanlang (2/6):",
-        "select_eta_hour": "🕒 Yetib kelish soatini tanlang (3/6):",
-        "enter_container_name": "📦 Konteyner nomini kiriting (4/6):\nMisol: ABCD1234567",
-        "select_container_size": "📏 Konteyner o'lchamini tanlang (5/6):",
-        "select_container_type": "🔍 Konteyner turini tanlang (6/6):",
-        "summary": "📋 Sizning marshrutingiz:",
-        "truck": "🚛 Yuk mashinasi:",
-        "terminal": "🏢 Terminal:",
-        "eta": "📅 Yetib kelish vaqti:",
-        "container": "📦 Konteyner:",
-        "size": "📏 O'lcham:",
-        "type": "🔍 Tip:",
-        "creating_route": "✅ Ma'lumotlar tasdiqlandi. Yo'nalish yaratilmoqda...",
-        "live_location": "✅ Yo'nalish yaratildi!\n\n🚛 Iltimos, 📎 tugmasini bosib, Joylashuv → Jonli joylashuv ulashing.",
-        "cancel": "❌ Bekor qilish",
-        "loaded": "Yuklangan 📦",
-        "empty": "Bo'sh 📭",
+ROUTE_CREATION_TRANSLATIONS = catalog.register(
+    "route",
+    {
+        "uz": {
+            "select_terminal": "🏢 Terminalni tanlang (1/6):",
+            "select_eta_date": "📅 Yetib kelish sanasini tanlang (2/6):",
+            "select_eta_hour": "🕒 Yetib kelish soatini tanlang (3/6):",
+            "enter_container_name": "📦 Konteyner nomini kiriting (4/6):\nMisol: ABCD1234567",
+            "select_container_size": "📏 Konteyner o'lchamini tanlang (5/6):",
+            "select_container_type": "🔍 Konteyner turini tanlang (6/6):",
+            "summary": "📋 Sizning marshrutingiz:",
+            "truck": "🚛 Yuk mashinasi:",
+            "terminal": "🏢 Terminal:",
+            "eta": "📅 Yetib kelish vaqti:",
+            "container": "📦 Konteyner:",
+            "size": "📏 O'lcham:",
+            "type": "🔍 Tip:",
+            "creating_route": "✅ Ma'lumotlar tasdiqlandi. Yo'nalish yaratilmoqda...",
+            "live_location": "✅ Yo'nalish yaratildi!\n\n🚛 Iltimos, 📎 tugmasini bosib, Joylashuv → Jonli joylashuv ulashing.",
+            "cancel": "❌ Bekor qilish",
+            "date_unavailable": "⚠️ Bu sanani tanlab bo'lmaydi, boshqa sanani tanlang.",
+            "hour_unavailable": "⚠️ Bu soat o'tib ketdi, boshqa soatni tanlang.",
+            "loaded": "Yuklangan 📦",
+            "empty": "Bo'sh 📭",
+        },
+        "ru": {
+            "select_terminal": "🏢 Выберите терминал (1/6):",
+            "select_eta_date": "📅 Выберите дату прибытия (2/6):",
+            "select_eta_hour": "🕒 Выберите час прибытия (3/6):",
+            "enter_container_name": "📦 Введите название контейнера (4/6):\nПример: ABCD1234567",
+            "select_container_size": "📏 Выберите размер контейнера (5/6):",
+            "select_container_type": "🔍 Выберите тип контейнера (6/6):",
+            "summary": "📋 Ваш маршрут:",
+            "truck": "🚛 Машина:",
+            "terminal": "🏢 Терминал:",
+            "eta": "📅 Время прибытия:",
+            "container": "📦 Контейнер:",
+            "size": "📏 Размер:",
+            "type": "🔍 Тип:",
+            "creating_route": "✅ Данные подтверждены. Создание маршрута...",
+            "live_location": "✅ Маршрут успешно создан!\n\n🚛 Пожалуйста, нажмите 📎 → Местоположение → Поделиться живым местоположением.",
+            "cancel": "❌ Отмена",
+            "date_unavailable": "⚠️ Эту дату выбрать нельзя, выберите другую.",
+            "hour_unavailable": "⚠️ Этот час уже прошёл, выберите другой.",
+            "loaded": "Загруженный 📦",
+            "empty": "Пустой 📭",
+        },
     },
-    "ru": {
-        "select_terminal": "🏢 Выберите терминал (1/6):",
-        "select_eta_date": "📅 Выберите дату прибытия (2/6):",
-        "select_eta_hour": "🕒 Выберите час прибытия (3/6):",
-        "enter_container_name": "📦 Введите название контейнера (4/6):\nПример: ABCD1234567",
-        "select_container_size": "📏 Выберите размер контейнера (5/6):",
-        "select_container_type": "🔍 Выберите тип контейнера (6/6):",
-        "summary": "📋 Ваш маршрут:",
-        "truck": "🚛 Машина:",
-        "terminal": "🏢 Терминал:",
-        "eta": "📅 Время прибытия:",
-        "container": "📦 Контейнер:",
-        "size": "📏 Размер:",
-        "type": "🔍 Тип:",
-        "creating_route": "✅ Данные подтверждены. Создание маршрута...",
-        "live_location": "✅ Маршрут успешно создан!\n\n🚛 Пожалуйста, нажмите 📎 → Местоположение → Поделиться живым местоположением.",
-        "cancel": "❌ Отмена",
-        "loaded": "Загруженный 📦",
-        "empty": "Пустой 📭",
-    },
-}
+)
 
 
-async def build_summary(state: FSMContext, language: str) -> str:
-    data = await state.get_data()
-    lines = [ROUTE_CREATION_TRANSLATIONS[language]["summary"]]
+@cached_per_language
+def cancel_route_button(language: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton(
+        text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"], callback_data="cancel_route"
+    )
+
+
+def route_terminals_keyboard(terminals: list, language: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for terminal in terminals:
+        builder.button(text=terminal["name"], callback_data=terminal["name"])
+    builder.adjust(1)
+    builder.row(cancel_route_button(language))
+    return builder.as_markup()
+
+
+def cancel_route_footer(language: str) -> list[InlineKeyboardButton]:
+    return [cancel_route_button(language)]
+
+
+# ETA can be booked from today for the next two weeks, 7:00-19:00 Tashkent time
+eta_calendar = DateWindowKeyboard(days=ETA_BOOKING_DAYS, footer=cancel_route_footer)
+eta_hours = HourSlotsKeyboard(first=7, last=19, footer=cancel_route_footer)
+
+
+@cached_per_language
+def container_size_keyboard(language: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for size in ["20", "40", "45"]:
+        builder.button(text=f"{size} ft", callback_data=f"size_{size}")
+    builder.adjust(3)
+    builder.row(cancel_route_button(language))
+    return builder.as_markup()
 
-    if truck := data.get("truck_number"):
-        lines.append(f"{ROUTE_CREATION_TRANSLATIONS[language]['truck']} {truck}")
-    if terminal := data.get("selected_terminal_name"):
-        lines.append(f"{ROUTE_CREATION_TRANSLATIONS[language]['terminal']} {terminal}")
-    if eta_date := data.get("eta_date"):
-        if eta_hour := data.get("eta_hour"):
-            lines.append(
-                f"{ROUTE_CREATION_TRANSLATIONS[language]['eta']} {eta_date} {eta_hour}:00"
-            )
-    if container := data.get("container_name"):
-        lines.append(
-            f"{ROUTE_CREATION_TRANSLATIONS[language]['container']} {container}"
-        )
-    if size := data.get("container_size"):
-        lines.append(f"{ROUTE_CREATION_TRANSLATIONS[language]['size']} {size} ft")
-    if cont_type := data.get("container_type"):
-        lines.append(f"{ROUTE_CREATION_TRANSLATIONS[language]['type']} {cont_type}")
 
-    return "\n".join(lines)
+@cached_per_language
+def container_type_keyboard(language: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(
+        text=ROUTE_CREATION_TRANSLATIONS[language]["loaded"], callback_data="laden"
+    )
+    builder.button(
+        text=ROUTE_CREATION_TRANSLATIONS[language]["empty"], callback_data="empty"
+    )
+    builder.adjust(2)
+    builder.row(cancel_route_button(language))
+    return builder.as_markup()
 
 
-@route_router.message(F.text.in_(["➕ Yo'nalish qo'shish", "➕ Добавить маршрут"]))
+@route_router.message(F.text.in_(button_labels("add_route")))
 async def start_route_creation(
     message: Message,
     state: FSMContext,
     truck_number: str,
     language: str,
     api_client: MyApi,
+    terminal_catalog: TerminalCatalog,
 ):
     await state.clear()
-    api = api_client or MyApi()
 
     if not truck_number:
         await message.answer("❌ No truck number found. Update your profile first.")
         return
 
     # ✅ Validate Live Location BEFORE starting Route FSM
-    is_valid = await validate_driver_location(message, message.from_user.id, api)
+    is_valid = await validate_driver_location(message, message.from_user.id, api_client)
 
     if not is_valid:
         return  # ❌ Stop if location not valid
 
     language = language or "uz"
-    await state.update_data(truck_number=truck_number, language=language)
-
-    terminals = await api.get_terminals(telegram_id=message.from_user.id)
+    terminals = await terminal_catalog.terminals(telegram_id=message.from_user.id)
     if not terminals:
         await message.answer("❌ No terminals found.")
         return
 
-    terminals_dict = {t["name"]: t["id"] for t in terminals}
-    await state.update_data(terminals=terminals_dict)
-
-    builder = InlineKeyboardBuilder()
-    for name in terminals_dict.keys():
-        builder.button(text=name, callback_data=name)
-    builder.adjust(1)
-    builder.row(
-        InlineKeyboardBuilder()
-        .button(
-            text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"],
-            callback_data="cancel_route",
-        )
-        .as_markup()
-        .inline_keyboard[0][0]
-    )
+    draft = RouteDraft(language=language, truck_number=truck_number)
+    await draft.save(state)
 
-    summary = await build_summary(state, language)
     await message.answer(
-        f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_terminal']}",
-        reply_markup=builder.as_markup(),
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_terminal']}",
+        reply_markup=terminal_catalog.render(
+            "route",
+            language,
+            lambda: route_terminals_keyboard(terminals, language),
+            telegram_id=message.from_user.id,
+        ),
     )
     await state.set_state(RouteCreationStates.waiting_for_terminal)
-    asyncio.create_task(auto_cancel_after_timeout(message, state))
+    auto_cancel.schedule(message, state)
 
 
 @route_router.callback_query(RouteCreationStates.waiting_for_terminal)
-async def terminal_selected(callback: CallbackQuery, state: FSMContext):
+async def terminal_selected(
+    callback: CallbackQuery,
+    state: FSMContext,
+    terminal_catalog: TerminalCatalog,
+):
     await callback.answer()
 
-    data = await state.get_data()
-    terminals = data.get("terminals", {})
-    language = data.get("language", "uz")
+    draft = await RouteDraft.load(state)
+    language = draft.language
 
     if callback.data == "cancel_route":
         await state.clear()
         await callback.message.answer(CANCEL_TRANSLATIONS[language]["process_canceled"])
         return
 
+    # Loads the list if the bot restarted since the keyboard was sent
+    await terminal_catalog.terminals(telegram_id=callback.from_user.id)
     terminal_name = callback.data
-    if terminal_name not in terminals:
+    terminal_id = terminal_catalog.terminal_id(terminal_name, telegram_id=callback.from_user.id)
+    if terminal_id is None:
         await callback.message.answer("⚠️ Please select from buttons.")
         return
 
-    await state.update_data(
-        selected_terminal_id=terminals[terminal_name],
-        selected_terminal_name=terminal_name,
-    )
-
-    summary = await build_summary(state, language)
-    calendar = SimpleCalendar()
-
-    calendar_markup = await calendar.start_calendar()
-    builder = InlineKeyboardBuilder()
-    for row in calendar_markup.inline_keyboard:
-        builder.row(*row)
-    builder.row(
-        InlineKeyboardBuilder()
-        .button(
-            text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"],
-            callback_data="cancel_route",
-        )
-        .as_markup()
-        .inline_keyboard[0][0]
-    )
+    draft.terminal_id = terminal_id
+    draft.terminal_name = terminal_name
+    await draft.save(state)
 
     await callback.message.edit_text(
-        f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_eta_date']}",
-        reply_markup=builder.as_markup(),
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_eta_date']}",
+        reply_markup=eta_calendar.markup(language),
     )
     await state.set_state(RouteCreationStates.waiting_for_eta_date)
-    asyncio.create_task(auto_cancel_after_timeout(callback.message, state))
+    auto_cancel.schedule(callback.message, state)
 
 
 @route_router.callback_query(
-    RouteCreationStates.waiting_for_eta_date, simple_cal_callback.filter()
+    RouteCreationStates.waiting_for_eta_date, DateCallbackFactory.filter()
 )
 async def eta_date_selected(
-    callback: CallbackQuery, callback_data: dict, state: FSMContext
+    callback: CallbackQuery, callback_data: DateCallbackFactory, state: FSMContext
 ):
-    selected, date = await SimpleCalendar().process_selection(callback, callback_data)
-    if selected:
-        await state.update_data(eta_date=date.strftime("%Y-%m-%d"))
-        await state.set_state(RouteCreationStates.waiting_for_eta_hour)
-
-        data = await state.get_data()
-        language = data.get("language", "uz")
-
-        summary = await build_summary(state, language)
-        builder = InlineKeyboardBuilder()
-        for hour in range(7, 20):
-            builder.button(text=f"{hour}:00", callback_data=f"hour_{hour}")
-        builder.adjust(4)
-        builder.row(
-            InlineKeyboardBuilder()
-            .button(
-                text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"],
-                callback_data="cancel_route",
-            )
-            .as_markup()
-            .inline_keyboard[0][0]
+    draft = await RouteDraft.load(state)
+    language = draft.language
+
+    date = eta_calendar.parse(callback_data)
+    if date is None or not eta_hours.has_slots(date):
+        # The calendar was sent on an earlier day, or today's hours are over
+        await callback.answer(
+            ROUTE_CREATION_TRANSLATIONS[language]["date_unavailable"], show_alert=True
         )
+        return
 
-        await callback.message.edit_text(
-            f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_eta_hour']}",
-            reply_markup=builder.as_markup(),
-        )
-        asyncio.create_task(auto_cancel_after_timeout(callback.message, state))
+    await callback.answer()
+    draft.eta_date = date.strftime("%Y-%m-%d")
+    await draft.save(state)
+    await state.set_state(RouteCreationStates.waiting_for_eta_hour)
+
+    await callback.message.edit_text(
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_eta_hour']}",
+        reply_markup=eta_hours.markup(language, date),
+    )
+    auto_cancel.schedule(callback.message, state)
 
 
 @route_router.callback_query(
-    RouteCreationStates.waiting_for_eta_hour, F.data.startswith("hour_")
+    RouteCreationStates.waiting_for_eta_hour, HourCallbackFactory.filter()
 )
-async def eta_hour_selected(callback: CallbackQuery, state: FSMContext):
-    await callback.answer()
+async def eta_hour_selected(
+    callback: CallbackQuery, callback_data: HourCallbackFactory, state: FSMContext
+):
+    draft = await RouteDraft.load(state)
+    language = draft.language
 
     if callback.data == "cancel_route":
-        data = await state.get_data()
-        language = data.get("language", "uz")
+        await callback.answer()
         await state.clear()
         await callback.message.answer(CANCEL_TRANSLATIONS[language]["process_canceled"])
         return
 
-    hour = callback.data.split("_")[1]
-    await state.update_data(eta_hour=hour)
-
-    data = await state.get_data()
-    language = data.get("language", "uz")
+    date = datetime.strptime(draft.eta_date, "%Y-%m-%d").date()
+    if not eta_hours.is_bookable(date, callback_data.hour):
+        # The hours were sent earlier, and this one has started since
+        await callback.answer(
+            ROUTE_CREATION_TRANSLATIONS[language]["hour_unavailable"], show_alert=True
+        )
+        if eta_hours.has_slots(date):
+            await callback.message.edit_reply_markup(
+                reply_markup=eta_hours.markup(language, date)
+            )
+        else:
+            await state.set_state(RouteCreationStates.waiting_for_eta_date)
+            await callback.message.edit_text(
+                f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_eta_date']}",
+                reply_markup=eta_calendar.markup(language),
+            )
+        return
 
-    summary = await build_summary(state, language)
+    await callback.answer()
+    draft.eta_hour = str(callback_data.hour)
+    await draft.save(state)
     await state.set_state(RouteCreationStates.waiting_for_container_name)
 
     cancel_instruction = (
@@ -259,46 +291,30 @@ async def eta_hour_selected(callback: CallbackQuery, state: FSMContext):
     )
 
     await callback.message.edit_text(
-        f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['enter_container_name']}{cancel_instruction}"
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['enter_container_name']}{cancel_instruction}"
     )
-    asyncio.create_task(auto_cancel_after_timeout(callback.message, state))
+    auto_cancel.schedule(callback.message, state)
 
 
 @route_router.message(RouteCreationStates.waiting_for_container_name)
 async def container_name_received(message: Message, state: FSMContext):
+    draft = await RouteDraft.load(state)
+    language = draft.language
+
     if message.text.lower() in ["/cancel", "cancel"]:
-        data = await state.get_data()
-        language = data.get("language", "uz")
         await state.clear()
         await message.answer(CANCEL_TRANSLATIONS[language]["process_canceled"])
         return
 
-    await state.update_data(container_name=message.text.strip())
-    data = await state.get_data()
-    language = data.get("language", "uz")
-
-    summary = await build_summary(state, language)
-
-    builder = InlineKeyboardBuilder()
-    for size in ["20", "40", "45"]:
-        builder.button(text=f"{size} ft", callback_data=f"size_{size}")
-    builder.adjust(3)
-    builder.row(
-        InlineKeyboardBuilder()
-        .button(
-            text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"],
-            callback_data="cancel_route",
-        )
-        .as_markup()
-        .inline_keyboard[0][0]
-    )
+    draft.container_name = message.text.strip()
+    await draft.save(state)
 
     await message.answer(
-        f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_container_size']}",
-        reply_markup=builder.as_markup(),
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_container_size']}",
+        reply_markup=container_size_keyboard(language),
     )
     await state.set_state(RouteCreationStates.waiting_for_container_size)
-    asyncio.create_task(auto_cancel_after_timeout(message, state))
+    auto_cancel.schedule(message, state)
 
 
 @route_router.callback_query(
@@ -307,45 +323,23 @@ async def container_name_received(message: Message, state: FSMContext):
 async def container_size_selected(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
+    draft = await RouteDraft.load(state)
+    language = draft.language
+
     if callback.data == "cancel_route":
-        data = await state.get_data()
-        language = data.get("language", "uz")
         await state.clear()
         await callback.message.answer(CANCEL_TRANSLATIONS[language]["process_canceled"])
         return
 
-    size = callback.data.split("_")[1]
-    await state.update_data(container_size=size)
-
-    data = await state.get_data()
-    language = data.get("language", "uz")
-
-    summary = await build_summary(state, language)
-
-    builder = InlineKeyboardBuilder()
-    builder.button(
-        text=ROUTE_CREATION_TRANSLATIONS[language]["loaded"], callback_data="laden"
-    )
-    builder.button(
-        text=ROUTE_CREATION_TRANSLATIONS[language]["empty"], callback_data="empty"
-    )
-    builder.adjust(2)
-    builder.row(
-        InlineKeyboardBuilder()
-        .button(
-            text=ROUTE_CREATION_TRANSLATIONS[language]["cancel"],
-            callback_data="cancel_route",
-        )
-        .as_markup()
-        .inline_keyboard[0][0]
-    )
+    draft.container_size = callback.data.split("_")[1]
+    await draft.save(state)
 
     await callback.message.edit_text(
-        f"{summary}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_container_type']}",
-        reply_markup=builder.as_markup(),
+        f"{draft.summary()}\n\n{ROUTE_CREATION_TRANSLATIONS[language]['select_container_type']}",
+        reply_markup=container_type_keyboard(language),
     )
     await state.set_state(RouteCreationStates.waiting_for_container_type)
-    asyncio.create_task(auto_cancel_after_timeout(callback.message, state))
+    auto_cancel.schedule(callback.message, state)
 
 
 @route_router.callback_query(RouteCreationStates.waiting_for_container_type)
@@ -354,13 +348,9 @@ async def container_type_selected(
 ):
     await callback.answer()
 
-    container_type = callback.data
-    await state.update_data(container_type=container_type)
-
-    data = await state.get_data()
-    language = data.get("language", "uz")
-
-    eta = f"{data['eta_date']} {data['eta_hour']}:00"
+    draft = await RouteDraft.load(state)
+    draft.container_type = callback.data
+    await draft.save(state)
 
     api = api_client or MyApi()
 
@@ -377,19 +367,17 @@ async def container_type_selected(
     try:
         # ✅ 2. Now safe to create Route
         await api.create_route(
-            truck_number=data["truck_number"],
-            terminal_id=data["selected_terminal_id"],
-            container_name=data["container_name"],
-            container_size=data["container_size"],
-            container_type=data["container_type"],
-            eta=eta,
+            truck_number=draft.truck_number,
+            terminal_id=draft.terminal_id,
+            container_name=draft.container_name,
+            container_size=draft.container_size,
+            container_type=draft.container_type,
+            eta=draft.eta,
             telegram_id=callback.from_user.id,
         )
 
-        summary = await build_summary(state, language)
-
         await callback.message.edit_text(
-            f"{summary}\n\n✅ Yo'nalish yaratildi!",
+            f"{draft.summary()}\n\n✅ Yo'nalish yaratildi!",
             parse_mode="HTML",
         )
 
@@ -403,8 +391,7 @@ async def container_type_selected(
 async def cancel_route_creation(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
-    data = await state.get_data()
-    language = data.get("language", "uz")
+    language = (await RouteDraft.load(state)).language
 
     await state.clear()
     await callback.message.edit_text(CANCEL_TRANSLATIONS[language]["process_canceled"])
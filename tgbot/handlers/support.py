@@ -10,6 +10,7 @@ from aiogram.types import (
 
 from infrastructure.some_api.api import MyApi
 from tgbot.keyboards.reply import main_menu_keyboard
+from tgbot.services.i18n import cached_per_language, catalog
 
 support_router = Router()
 
@@ -21,38 +22,75 @@ class SupportStates(StatesGroup):
 
 
 # Translations for support messages
-SUPPORT_TRANSLATIONS = {
-    "uz": {
-        "ask_question": "<b>Savolingizni yoki muammoingizni kiriting.</b> Biz imkon qadar tezroq javob berishga harakat qilamiz.",
-        "question_received": "✅ <b>Savolingiz qabul qilindi!</b> Tez orada javob olasiz.",
-        "no_active_requests": "❌ <b>Hozirda faol so'rovlar yo'q.</b>",
-        "support_requests": "📬 <b>Qo'llab-quvvatlash so'rovlari:</b>",
-        "from_user": "👤 <b>Foydalanuvchi:</b> {}",
-        "question": "❓ <b>Savol:</b> {}",
-        "reply_button": "↩️ Javob berish",
-        "enter_reply": "<b>Foydalanuvchiga javobingizni kiriting:</b>",
-        "reply_sent": "✅ <b>Javobingiz foydalanuvchiga yuborildi!</b>",
-        "new_reply": "📨 <b>Qo'llab-quvvatlashdan yangi xabar:</b>\n\n{}",
-        "cancel": "❌ Bekor qilish",
-        "support": "Qo'llab-quvvatlash",
-        "list_requests": "So'rovlar ro'yxati",
+SUPPORT_TRANSLATIONS = catalog.register(
+    "support",
+    {
+        "uz": {
+            "ask_question": "<b>Savolingizni yoki muammoingizni kiriting.</b> Biz imkon qadar tezroq javob berishga harakat qilamiz.",
+            "question_received": "✅ <b>Savolingiz qabul qilindi!</b> Tez orada javob olasiz.",
+            "no_active_requests": "❌ <b>Hozirda faol so'rovlar yo'q.</b>",
+            "support_requests": "📬 <b>Qo'llab-quvvatlash so'rovlari:</b>",
+            "from_user": "👤 <b>Foydalanuvchi:</b> {}",
+            "question": "❓ <b>Savol:</b> {}",
+            "reply_button": "↩️ Javob berish",
+            "enter_reply": "<b>Foydalanuvchiga javobingizni kiriting:</b>",
+            "reply_sent": "✅ <b>Javobingiz foydalanuvchiga yuborildi!</b>",
+            "new_reply": "📨 <b>Qo'llab-quvvatlashdan yangi xabar:</b>\n\n{}",
+            "cancel": "❌ Bekor qilish",
+            "support": "Qo'llab-quvvatlash",
+            "list_requests": "So'rovlar ro'yxati",
+        },
+        "ru": {
+            "ask_question": "<b>Введите ваш вопрос или опишите проблему.</b> Мы постараемся ответить как можно скорее.",
+            "question_received": "✅ <b>Ваш вопрос получен!</b> Вы получите ответ в ближайшее время.",
+            "no_active_requests": "❌ <b>В настоящее время нет активных запросов.</b>",
+            "support_requests": "📬 <b>Запросы в поддержку:</b>",
+            "from_user": "👤 <b>Пользователь:</b> {}",
+            "question": "❓ <b>Вопрос:</b> {}",
+            "reply_button": "↩️ Ответить",
+            "enter_reply": "<b>Введите ваш ответ пользователю:</b>",
+            "reply_sent": "✅ <b>Ваш ответ отправлен пользователю!</b>",
+            "new_reply": "📨 <b>Новое сообщение от поддержки:</b>\n\n{}",
+            "cancel": "❌ Отмена",
+            "support": "Поддержка",
+            "list_requests": "Список запросов",
+        },
     },
-    "ru": {
-        "ask_question": "<b>Введите ваш вопрос или опишите проблему.</b> Мы постараемся ответить как можно скорее.",
-        "question_received": "✅ <b>Ваш вопрос получен!</b> Вы получите ответ в ближайшее время.",
-        "no_active_requests": "❌ <b>В настоящее время нет активных запросов.</b>",
-        "support_requests": "📬 <b>Запросы в поддержку:</b>",
-        "from_user": "👤 <b>Пользователь:</b> {}",
-        "question": "❓ <b>Вопрос:</b> {}",
-        "reply_button": "↩️ Ответить",
-        "enter_reply": "<b>Введите ваш ответ пользователю:</b>",
-        "reply_sent": "✅ <b>Ваш ответ отправлен пользователю!</b>",
-        "new_reply": "📨 <b>Новое сообщение от поддержки:</b>\n\n{}",
-        "cancel": "❌ Отмена",
-        "support": "Поддержка",
-        "list_requests": "Список запросов",
-    },
-}
+)
+
+
+@cached_per_language
+def support_cancel_keyboard(language: str) -> InlineKeyboardMarkup:
+    """
+    Cancel button of a support request.
+    """
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=SUPPORT_TRANSLATIONS[language]["cancel"],
+                    callback_data="support:cancel",
+                )
+            ]
+        ]
+    )
+
+
+@cached_per_language
+def admin_reply_cancel_keyboard(language: str) -> InlineKeyboardMarkup:
+    """
+    Cancel button of an admin's reply to a support request.
+    """
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=SUPPORT_TRANSLATIONS[language]["cancel"],
+                    callback_data="support:cancel_reply",
+                )
+            ]
+        ]
+    )
 
 
 @support_router.message(
@@ -70,22 +108,10 @@ async def start_support_request(message: Message, state: FSMContext, language):
     # Set state to waiting for question
     await state.set_state(SupportStates.waiting_for_question)
 
-    # Create cancel button
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text=SUPPORT_TRANSLATIONS[language]["cancel"],
-                    callback_data="support:cancel",
-                )
-            ]
-        ]
-    )
-
     # Ask for the question
     await message.reply(
         SUPPORT_TRANSLATIONS[language]["ask_question"],
-        reply_markup=keyboard,
+        reply_markup=support_cancel_keyboard(language),
         parse_mode="HTML",
     )
 
@@ -203,22 +229,10 @@ async def admin_reply_to_support(callback: CallbackQuery, state: FSMContext, lan
     await state.update_data(reply_to_user_id=user_id)
     await state.set_state(SupportStates.waiting_for_admin_reply)
 
-    # Create cancel button
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text=SUPPORT_TRANSLATIONS[language]["cancel"],
-                    callback_data="support:cancel_reply",
-                )
-            ]
-        ]
-    )
-
     # Prompt admin for reply
     await callback.message.reply(
         SUPPORT_TRANSLATIONS[language]["enter_reply"],
-        reply_markup=keyboard,
+        reply_markup=admin_reply_cancel_keyboard(language),
         parse_mode="HTML",
     )
 
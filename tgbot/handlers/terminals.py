@@ -11,7 +11,8 @@ from aiogram.types import (
     Message,
 )
 
-from infrastructure.some_api.api import MyApi
+from tgbot.keyboards.reply import button_labels
+from tgbot.services.terminal_catalog import TerminalCatalog
 
 # Router instance
 terminals_router = Router()
@@ -125,15 +126,15 @@ def terminal_location_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-@terminals_router.message(F.text.in_(["🏢 Терминалы", "🏢 Terminallar"]))
-async def terminals_menu(message: Message, state: FSMContext, api_client, language):
+@terminals_router.message(F.text.in_(button_labels("terminal")))
+async def terminals_menu(
+    message: Message, state: FSMContext, terminal_catalog: TerminalCatalog, language
+):
     # Set state to viewing terminals
     await state.set_state(TerminalStates.viewing_terminals)
 
-    # Initialize API and fetch terminals
-    # Use the shared API client from middleware instead of creating a new one
-    api = api_client or MyApi()
-    terminals = await api.get_terminals(telegram_id=message.from_user.id)
+    # The catalog refetches the driver's terminals when they're stale
+    terminals = await terminal_catalog.terminals(telegram_id=message.from_user.id)
 
     if not terminals:
         await message.answer(
@@ -141,12 +142,14 @@ async def terminals_menu(message: Message, state: FSMContext, api_client, langua
         )
         return
 
-    # Store terminals in state to avoid re-fetching
-    await state.update_data(terminals=terminals)
-
     await message.answer(
         "Выберите терминал:" if language == "ru" else "Terminalni tanlang:",
-        reply_markup=terminals_keyboard(terminals, language),
+        reply_markup=terminal_catalog.render(
+            "list",
+            language,
+            lambda: terminals_keyboard(terminals, language),
+            telegram_id=message.from_user.id,
+        ),
     )
 
 
@@ -155,20 +158,16 @@ async def terminal_selected(
     call: CallbackQuery,
     callback_data: TerminalCallbackFactory,
     state: FSMContext,
-    api_client,
+    terminal_catalog: TerminalCatalog,
     language,
 ):
     """
     Handler for terminal selection - shows terminal details.
     """
-    # Get terminal details directly from API
     terminal_id = int(callback_data.terminal_id)
-    # Use the shared API client from middleware instead of creating a new one
-    api = api_client or MyApi()
 
     try:
-        # Fetch specific terminal details using the new API endpoint
-        terminal = await api.get_terminal(
+        terminal = await terminal_catalog.terminal(
             terminal_id=terminal_id, telegram_id=call.from_user.id
         )
 
@@ -183,12 +182,18 @@ async def terminal_selected(
         await state.set_state(TerminalStates.viewing_terminal_details)
         await state.update_data(current_terminal_id=terminal_id)
 
-        # Show terminal details
-        await call.message.edit_text(
-            terminal_details_message(terminal, language),
-            parse_mode="HTML",
-            reply_markup=terminal_details_keyboard(terminal, language),
+        # Show terminal details, rendered once per terminal version and language
+        text, keyboard = terminal_catalog.render(
+            "details",
+            language,
+            lambda: (
+                terminal_details_message(terminal, language),
+                terminal_details_keyboard(terminal, language),
+            ),
+            telegram_id=call.from_user.id,
+            terminal_id=terminal_id,
         )
+        await call.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
         await call.answer()
 
     except Exception as e:
@@ -206,20 +211,16 @@ async def terminal_location(
     call: CallbackQuery,
     callback_data: LocationCallbackFactory,
     state: FSMContext,
-    api_client,
+    terminal_catalog: TerminalCatalog,
     language,
 ):
     """
     Handler for location button - sends terminal location.
     """
-    # Get terminal details directly from API
     terminal_id = int(callback_data.terminal_id)
-    # Use the shared API client from middleware instead of creating a new one
-    api = api_client or MyApi()
 
     try:
-        # Fetch specific terminal details using the new API endpoint
-        terminal = await api.get_terminal(
+        terminal = await terminal_catalog.terminal(
             terminal_id=terminal_id, telegram_id=call.from_user.id
         )
 
@@ -254,7 +255,7 @@ async def terminal_location(
 
 @terminals_router.callback_query(BackToTerminalsCallbackFactory.filter())
 async def back_to_terminals(
-    call: CallbackQuery, state: FSMContext, api_client, language
+    call: CallbackQuery, state: FSMContext, terminal_catalog: TerminalCatalog, language
 ):
     """
     Handler for back button - returns to terminal list.
@@ -262,15 +263,17 @@ async def back_to_terminals(
     # Set state back to viewing terminals list
     await state.set_state(TerminalStates.viewing_terminals)
 
-    # Fetch fresh terminal list
-    # Use the shared API client from middleware instead of creating a new one
-    api = api_client or MyApi()
     try:
-        terminals = await api.get_terminals(telegram_id=call.from_user.id)
+        terminals = await terminal_catalog.terminals(telegram_id=call.from_user.id)
 
         await call.message.edit_text(
             "Выберите терминал:" if language == "ru" else "Terminalni tanlang:",
-            reply_markup=terminals_keyboard(terminals, language),
+            reply_markup=terminal_catalog.render(
+                "list",
+                language,
+                lambda: terminals_keyboard(terminals, language),
+                telegram_id=call.from_user.id,
+            ),
         )
         await call.answer()
 
@@ -5,6 +5,7 @@ from aiogram.types import CallbackQuery, KeyboardButton, Message, ReplyKeyboardM
 
 from infrastructure.some_api.api import MyApi
 from tgbot.keyboards.reply import main_menu_keyboard
+from tgbot.storage.drafts import RegistrationDraft
 
 registration_router = Router()
 
@@ -63,7 +64,7 @@ async def cmd_start(
         )
     else:  # 🚫 Not registered yet
         # Skip language selection and set "uz" as default
-        await state.update_data(language="uz")
+        await RegistrationDraft(language="uz").save(state)
         await state.set_state(RegistrationStates.waiting_for_phone)
         await message.answer(
             "🛻 <b>Truck2Terminalga xush kelibsiz!</b>\n\n📱 Telefon raqamingizni ulashing:",
@@ -76,15 +77,16 @@ async def cmd_start(
 @registration_router.message(RegistrationStates.waiting_for_phone)
 async def process_phone(message: Message, state: FSMContext):
     if not message.contact:
-        user_data = await state.get_data()
-        language = user_data.get("language", "uz")
+        draft = await RegistrationDraft.load(state)
         await message.answer(
             "⚠️ Tugmadan foydalanib telefon raqamingizni ulashing!",
-            reply_markup=get_phone_keyboard(language),
+            reply_markup=get_phone_keyboard(draft.language),
         )
         return
 
-    await state.update_data(phone=message.contact.phone_number)
+    draft = await RegistrationDraft.load(state)
+    draft.phone = message.contact.phone_number
+    await draft.save(state)
     await state.set_state(RegistrationStates.waiting_for_first_name)
     await message.answer(
         "✅ Telefon raqami qabul qilindi! (1/4)\n\n👤 Ismingizni yozing:",
@@ -99,7 +101,9 @@ async def process_first_name(message: Message, state: FSMContext):
         await message.answer("⚠️ Iltimos, ismingizni yozing!")
         return
 
-    await state.update_data(first_name=message.text.strip())
+    draft = await RegistrationDraft.load(state)
+    draft.first_name = message.text.strip()
+    await draft.save(state)
     await state.set_state(RegistrationStates.waiting_for_last_name)
     await message.answer(
         "✅ Ism qabul qilindi! (2/4)\n\n👥 Endi familiyangizni yozing:",
@@ -114,7 +118,9 @@ async def process_last_name(message: Message, state: FSMContext):
         await message.answer("⚠️ Iltimos, familiyangizni yozing!")
         return
 
-    await state.update_data(last_name=message.text.strip())
+    draft = await RegistrationDraft.load(state)
+    draft.last_name = message.text.strip()
+    await draft.save(state)
     await state.set_state(RegistrationStates.waiting_for_truck_number)
     await message.answer(
         "✅ Familiya qabul qilindi! (3/4)\n\n🚛 Yuk mashinangiz raqamini yuboring.\n\n<b>Namuna:</b> 01W540MC/106413BA",
@@ -133,16 +139,17 @@ async def process_truck_number(
         )
         return
 
-    await state.update_data(truck_number=message.text.strip())
-    data = await state.get_data()
+    draft = await RegistrationDraft.load(state)
+    draft.truck_number = message.text.strip()
+    await draft.save(state)
 
     registration_data = {
         "telegram_id": message.from_user.id,
-        "phone_number": data.get("phone"),
-        "first_name": data.get("first_name"),
-        "last_name": data.get("last_name"),
-        "truck_number": data.get("truck_number"),
-        "language": data.get("language"),
+        "phone_number": draft.phone,
+        "first_name": draft.first_name,
+        "last_name": draft.last_name,
+        "truck_number": draft.truck_number,
+        "language": draft.language,
         "role": "driver",
     }
 
@@ -152,8 +159,8 @@ async def process_truck_number(
             await api.telegram_auth(**registration_data)
 
             await message.answer(
-                f"✅ Ro'yxatdan o'tish yakunlandi! (4/4)\n\n👋 Xush kelibsiz, {data.get('first_name')}!\n\n📋 Quyidagi menyudan foydalaning:",
-                reply_markup=main_menu_keyboard(data.get("language")),
+                f"✅ Ro'yxatdan o'tish yakunlandi! (4/4)\n\n👋 Xush kelibsiz, {draft.first_name}!\n\n📋 Quyidagi menyudan foydalaning:",
+                reply_markup=main_menu_keyboard(draft.language),
                 parse_mode="HTML",
             )
             await state.clear()
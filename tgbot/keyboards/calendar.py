@@ -0,0 +1,173 @@
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from tgbot.services.i18n import catalog
+
+CALENDAR_TRANSLATIONS = catalog.register(
+    "calendar",
+    {
+        "uz": {
+            "weekdays": "Du Se Ch Pa Ju Sh Ya",
+            "today": "Bugun",
+            "tomorrow": "Ertaga",
+        },
+        "ru": {
+            "weekdays": "Пн Вт Ср Чт Пт Сб Вс",
+            "today": "Сегодня",
+            "tomorrow": "Завтра",
+        },
+    },
+)
+
+# Terminals and drivers are in Tashkent, whatever the zone of the server running the bot
+BOOKING_TIMEZONE = ZoneInfo("Asia/Tashkent")
+
+# Extra rows under the calendar, e.g. a cancel button, built for the given language
+Footer = Callable[[str], List[InlineKeyboardButton]]
+
+
+# Compact callback data: "d:739180" and "h:9"
+class DateCallbackFactory(CallbackData, prefix="d"):
+    day: int  # date.toordinal()
+
+
+class HourCallbackFactory(CallbackData, prefix="h"):
+    hour: int
+
+
+class DateWindowKeyboard:
+    """
+    Calendar showing only the days that can be booked: today and the next `days - 1` days.
+
+    "Today" is the date in `tz`. Rendered markups are cached per (today, language) and
+    dropped when the date changes, so a tap costs a dict lookup. Markups are shared
+    between replies - don't modify them.
+    """
+
+    def __init__(
+        self,
+        days: int = 14,
+        columns: int = 3,
+        footer: Optional[Footer] = None,
+        tz: tzinfo = BOOKING_TIMEZONE,
+    ):
+        self.days = days
+        self.columns = columns
+        self.footer = footer
+        self.tz = tz
+        self._today: Optional[date] = None
+        self._cache: Dict[str, InlineKeyboardMarkup] = {}
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    def window(self, today: Optional[date] = None) -> Tuple[date, date]:
+        """First and last day that can be selected."""
+        today = today or self.today()
+        return today, today + timedelta(days=self.days - 1)
+
+    def markup(self, language: str, today: Optional[date] = None) -> InlineKeyboardMarkup:
+        today = today or self.today()
+        if today != self._today:
+            self._today = today
+            self._cache.clear()
+
+        language = catalog.resolve(language)
+        markup = self._cache.get(language)
+        if markup is None:
+            markup = self._cache[language] = self._render(language, today)
+        return markup
+
+    def _render(self, language: str, today: date) -> InlineKeyboardMarkup:
+        texts = CALENDAR_TRANSLATIONS[language]
+        weekdays = texts["weekdays"].split()
+        builder = InlineKeyboardBuilder()
+        for offset in range(self.days):
+            day = today + timedelta(days=offset)
+            if offset == 0:
+                label = texts["today"]
+            elif offset == 1:
+                label = texts["tomorrow"]
+            else:
+                label = weekdays[day.weekday()]
+            builder.button(
+                text=f"{label} {day:%d.%m}",
+                callback_data=DateCallbackFactory(day=day.toordinal()),
+            )
+        builder.adjust(self.columns)
+        if self.footer:
+            builder.row(*self.footer(language))
+        return builder.as_markup()
+
+    def parse(self, callback_data: DateCallbackFactory, today: Optional[date] = None) -> Optional[date]:
+        """
+        Return the selected date, or None if it's no longer in the window
+        (the keyboard was sent on an earlier day).
+        """
+        first, last = self.window(today)
+        if not first.toordinal() <= callback_data.day <= last.toordinal():
+            return None
+        return date.fromordinal(callback_data.day)
+
+
+class HourSlotsKeyboard:
+    """
+    Grid of the hours that can be booked, from `first` to `last` inclusive.
+
+    Hours are in `tz`; for today only the hours that haven't started yet are shown.
+    Markups are cached per (language, first shown hour) and shared between replies -
+    don't modify them.
+    """
+
+    def __init__(
+        self,
+        first: int = 7,
+        last: int = 19,
+        columns: int = 4,
+        footer: Optional[Footer] = None,
+        tz: tzinfo = BOOKING_TIMEZONE,
+    ):
+        self.first = first
+        self.last = last
+        self.columns = columns
+        self.footer = footer
+        self.tz = tz
+        self._cache: Dict[Tuple[str, int], InlineKeyboardMarkup] = {}
+
+    def first_hour(self, day: date, now: Optional[datetime] = None) -> int:
+        """First hour that can still be booked on the given day."""
+        now = now.astimezone(self.tz) if now else datetime.now(self.tz)
+        if day == now.date():
+            return max(self.first, now.hour + 1)
+        return self.first
+
+    def has_slots(self, day: date, now: Optional[datetime] = None) -> bool:
+        return self.first_hour(day, now) <= self.last
+
+    def is_bookable(self, day: date, hour: int, now: Optional[datetime] = None) -> bool:
+        """
+        Whether the hour can still be booked on the given day. Taps on a keyboard sent
+        earlier can name an hour that has started since.
+        """
+        return self.first_hour(day, now) <= hour <= self.last
+
+    def markup(self, language: str, day: date, now: Optional[datetime] = None) -> InlineKeyboardMarkup:
+        key = (catalog.resolve(language), self.first_hour(day, now))
+        markup = self._cache.get(key)
+        if markup is None:
+            markup = self._cache[key] = self._render(*key)
+        return markup
+
+    def _render(self, language: str, first: int) -> InlineKeyboardMarkup:
+        builder = InlineKeyboardBuilder()
+        for hour in range(first, self.last + 1):
+            builder.button(text=f"{hour}:00", callback_data=HourCallbackFactory(hour=hour))
+        builder.adjust(self.columns)
+        if self.footer:
+            builder.row(*self.footer(language))
+        return builder.as_markup()
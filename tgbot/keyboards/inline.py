@@ -1,26 +1,32 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from tgbot.services.i18n import cached_per_language, catalog
+
 # Translations for inline keyboard buttons
-INLINE_TRANSLATIONS = {
-    "uz": {
-        "my_profile": "Mening profilim",
-        "help": "Yordam",
-        "settings": "Sozlamalar",
-        "support": "Qo'llab-quvvatlash",
-        "send_route_details": "Yo'nalish tafsilotlarini yuborish",
-        "share_location": "Joylashuvni ulashish",
-    },
-    "ru": {
-        "my_profile": "Мой профиль",
-        "help": "Помощь",
-        "settings": "Настройки",
-        "support": "Поддержка",
-        "send_route_details": "Отправить детали маршрута",
-        "share_location": "Поделиться местоположением",
+INLINE_TRANSLATIONS = catalog.register(
+    "inline",
+    {
+        "uz": {
+            "my_profile": "Mening profilim",
+            "help": "Yordam",
+            "settings": "Sozlamalar",
+            "support": "Qo'llab-quvvatlash",
+            "send_route_details": "Yo'nalish tafsilotlarini yuborish",
+            "share_location": "Joylashuvni ulashish",
+        },
+        "ru": {
+            "my_profile": "Мой профиль",
+            "help": "Помощь",
+            "settings": "Настройки",
+            "support": "Поддержка",
+            "send_route_details": "Отправить детали маршрута",
+            "share_location": "Поделиться местоположением",
+        },
     },
-}
+)
 
 
+@cached_per_language
 def main_menu_keyboard(language_code: str = "ru") -> InlineKeyboardMarkup:
     """
     Creates a simple menu keyboard with common options.
@@ -58,6 +64,7 @@ def main_menu_keyboard(language_code: str = "ru") -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cached_per_language
 def send_route_details_keyboard(language_code: str = "ru") -> InlineKeyboardMarkup:
     """
     Creates a keyboard for sending route details.
@@ -81,6 +88,7 @@ def send_route_details_keyboard(language_code: str = "ru") -> InlineKeyboardMark
     return keyboard
 
 
+@cached_per_language
 def location_tracking_keyboard(language_code: str = "ru") -> InlineKeyboardMarkup:
     """
     Creates a keyboard for location tracking.
@@ -1,49 +1,89 @@
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
 
+from tgbot.services.i18n import cached_per_language, catalog
+
 # Translations for reply keyboard buttons
-REPLY_TRANSLATIONS = {
-    "uz": {
-        "add_route": "Yo'nalish qo'shish",
-        "my_profile": "Mening profilim",
-        "help": "Yordam",
-        "settings": "Sozlamalar",
-        "support": "Qo'llab-quvvatlash",
-        "terminal": "Terminallar",
-        "language": "Til",
-        "back": "Orqaga",
-    },
-    "ru": {
-        "add_route": "Добавить маршрут",
-        "my_profile": "Мой профиль",
-        "terminal": "Терминалы",
-        "help": "Помощь",
-        "settings": "Настройки",
-        "support": "Поддержка",
-        "language": "Язык",
-        "back": "Назад",
+REPLY_TRANSLATIONS = catalog.register(
+    "reply",
+    {
+        "uz": {
+            "add_route": "Yo'nalish qo'shish",
+            "my_profile": "Mening profilim",
+            "help": "Yordam",
+            "settings": "Sozlamalar",
+            "support": "Qo'llab-quvvatlash",
+            "terminal": "Terminallar",
+            "language": "Til",
+            "back": "Orqaga",
+        },
+        "ru": {
+            "add_route": "Добавить маршрут",
+            "my_profile": "Мой профиль",
+            "terminal": "Терминалы",
+            "help": "Помощь",
+            "settings": "Настройки",
+            "support": "Поддержка",
+            "language": "Язык",
+            "back": "Назад",
+        },
     },
-}
+)
 
+# Main menu buttons in display order, with the emoji prefixed to their label
+MAIN_MENU_BUTTONS = (
+    ("add_route", "➕"),
+    ("my_profile", "👤"),
+    ("terminal", "🏢"),
+    ("support", "❓"),
+)
 
-def main_menu_keyboard(lang="uz"):
+
+def button_label(lang, key):
     """
-    Generate main menu keyboard with multilanguage support
+    Return the text of a reply keyboard button exactly as the user sends it back.
 
     Args:
         lang (str): Language code ('uz' or 'ru')
+        key (str): Key of the button in REPLY_TRANSLATIONS
 
     Returns:
-        ReplyKeyboardMarkup: Keyboard with translated buttons
+        str: Button text, prefixed with its emoji for main menu buttons
     """
-    if lang not in REPLY_TRANSLATIONS:
-        lang = "uz"  # Default to Uzbek if language not supported
+    text = REPLY_TRANSLATIONS[lang][key]
+    emoji = dict(MAIN_MENU_BUTTONS).get(key)
+    return f"{emoji} {text}" if emoji else text
 
-    translations = REPLY_TRANSLATIONS[lang]
 
+def button_labels(key):
+    """
+    Return the texts of a reply keyboard button in every language.
+    """
+    return frozenset(button_label(lang, key) for lang in REPLY_TRANSLATIONS)
+
+
+def reply_button_labels():
+    """
+    Return the texts of every translated reply keyboard button in every language.
+    """
+    return frozenset(
+        button_label(lang, key)
+        for lang, translations in REPLY_TRANSLATIONS.items()
+        for key in translations
+    )
+
+
+@cached_per_language
+def main_menu_keyboard(lang="uz"):
+    """
+    Generate main menu keyboard with multilanguage support
+
+    Args:
+        lang (str): Language code ('uz' or 'ru'), Uzbek is used if language not supported
+
+    Returns:
+        ReplyKeyboardMarkup: Keyboard with translated buttons, shared between calls
+    """
     keyboard = [
-        [KeyboardButton(text=f"➕ {translations['add_route']}")],
-        [KeyboardButton(text=f"👤 {translations['my_profile']}")],
-        [KeyboardButton(text=f"🏢 {translations['terminal']}")],
-        [KeyboardButton(text=f"❓ {translations['support']}")],
+        [KeyboardButton(text=button_label(lang, key))] for key, _ in MAIN_MENU_BUTTONS
     ]
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from tgbot.services import call_ledger
+
+
+class CallLedgerMiddleware(BaseMiddleware):
+    """Update middleware that accounts for the backend calls made for every update."""
+
+    def __init__(self, ledger: call_ledger.CallLedger) -> None:
+        self.ledger = ledger
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        with self.ledger.track(event.update_id):
+            return await handler(event, data)
+
+
+class LedgerHandlerMiddleware(BaseMiddleware):
+    """Inner middleware that attributes the backend calls of the update to the matched handler."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        callback = data["handler"].callback
+        call_ledger.set_handler(
+            f"{callback.__module__.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', '?')}"
+        )
+        return await handler(event, data)
@@ -0,0 +1,115 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from tgbot.services.metrics import counter
+
+profile_fetches = counter(
+    "bot_profile_fetches_total", "Updates for which the user profile was fetched"
+)
+profile_fetches_avoided = counter(
+    "bot_profile_fetches_avoided_total",
+    "Updates handled without fetching the user profile",
+)
+
+
+class UserContext:
+    """
+    Per-update user data that is fetched from the API only when first asked for.
+    """
+
+    def __init__(self, api_client, user_id: Optional[int]):
+        self.api_client = api_client
+        self.user_id = user_id
+        self.fetched = False
+        self._profile: Optional[Dict[str, Any]] = None
+
+    async def profile(self) -> Optional[Dict[str, Any]]:
+        """User profile, or None if there is no user or it couldn't be fetched."""
+        if self.fetched:
+            return self._profile
+        self.fetched = True
+
+        if self.api_client and self.user_id:
+            try:
+                profile = await self.api_client.get_user_profile(self.user_id)
+            except Exception:
+                profile = None
+            if isinstance(profile, dict):
+                self._profile = profile
+        return self._profile
+
+    async def language(self) -> str:
+        profile = await self.profile()
+        if profile is None:
+            return "uz"
+        return profile.get("preferred_language", "uz")
+
+    async def truck_number(self) -> str:
+        profile = await self.profile()
+        if profile is None:
+            return ""
+        return profile.get("truck_number", "")
+
+
+# Handler parameters resolved from the UserContext
+LAZY_FIELDS = {
+    "profile": UserContext.profile,
+    "language": UserContext.language,
+    "truck_number": UserContext.truck_number,
+}
+
+
+class ContextMiddleware(BaseMiddleware):
+    """
+    Single outer middleware that passes the config, the API client, the shared
+    terminal catalog and the lazily resolved user context to handlers.
+    """
+
+    def __init__(self, config, api_client=None, terminal_catalog=None) -> None:
+        self.config = config
+        self.api_client = api_client
+        self.terminal_catalog = terminal_catalog
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        user_context = UserContext(self.api_client, user.id if user else None)
+
+        data["config"] = self.config
+        data["api_client"] = self.api_client
+        data["terminal_catalog"] = self.terminal_catalog
+        data["user_context"] = user_context
+        try:
+            return await handler(event, data)
+        finally:
+            if user_context.fetched:
+                profile_fetches.inc()
+            else:
+                profile_fetches_avoided.inc()
+
+
+class LazyDataMiddleware(BaseMiddleware):
+    """
+    Inner middleware that resolves `profile`, `language` and `truck_number`
+    only for handlers that declare them as parameters.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user_context: Optional[UserContext] = data.get("user_context")
+        handler_object = data.get("handler")
+        if user_context is not None and handler_object is not None:
+            for name, provider in LAZY_FIELDS.items():
+                if name in handler_object.params or handler_object.varkw:
+                    data[name] = await provider(user_context)
+        return await handler(event, data)
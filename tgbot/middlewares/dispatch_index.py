@@ -0,0 +1,40 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import REJECTED, UNHANDLED
+from aiogram.types import Message
+
+from tgbot.services.dispatch_index import DispatchIndex
+
+
+class DispatchIndexMiddleware(BaseMiddleware):
+    """
+    Message middleware that sends reply keyboard button taps straight to the router of
+    their handler and lets every other message go through the regular router walk.
+    """
+
+    def __init__(self, index: DispatchIndex) -> None:
+        self.index = index
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        entry = self.index.lookup(event.text, data.get("raw_state"))
+        if entry is None:
+            return await handler(event, data)
+
+        # The walk from the handler's router on, as Router._propagate_event does it: the
+        # routers before it were resolved when the index was compiled
+        for observer in (entry.observer, *entry.fallthrough):
+            kwargs = {**data, "event_router": observer.router}
+            passed, extra = await observer.check_root_filters(event, **kwargs)
+            if not passed:
+                continue
+            kwargs.update(extra)
+            result = await observer.trigger(event, **kwargs)
+            if result is not UNHANDLED and result is not REJECTED:
+                return result
+        return UNHANDLED
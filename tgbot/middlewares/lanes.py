@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Update
+
+from tgbot.services.lanes import UpdateLanes, classify_update
+
+
+class LaneMiddleware(BaseMiddleware):
+    """Update middleware that routes every update through the priority lanes."""
+
+    def __init__(self, lanes: UpdateLanes) -> None:
+        self.lanes = lanes
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        lane, key = classify_update(event)
+        if not await self.lanes.acquire(lane, key):
+            # Merged into a newer live-location edit or shed under overload
+            return UNHANDLED
+
+        try:
+            return await handler(event, data)
+        finally:
+            self.lanes.release()
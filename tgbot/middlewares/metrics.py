@@ -0,0 +1,61 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from tgbot.services.metrics import Counter, Histogram, counter, histogram
+
+updates_total = counter(
+    "bot_handled_updates_total", "Updates handled, per router and handler", ("router", "handler")
+)
+handler_errors_total = counter(
+    "bot_handler_errors_total", "Handlers that raised, per router and handler", ("router", "handler")
+)
+handler_seconds = histogram(
+    "bot_handler_seconds", "Time spent in handlers, per router and handler", ("router", "handler")
+)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware that counts and times every handler call. The router label is the
+    handlers module, e.g. "route" for tgbot.handlers.route.
+    """
+
+    def __init__(self) -> None:
+        # id of the handler object -> its metrics; handler objects live as long as the routers
+        self._metrics: Dict[int, Tuple[Counter, Counter, Histogram]] = {}
+
+    def _for(self, handler: HandlerObject) -> Tuple[Counter, Counter, Histogram]:
+        metrics = self._metrics.get(id(handler))
+        if metrics is None:
+            callback = handler.callback
+            labels = (
+                callback.__module__.rsplit(".", 1)[-1],
+                getattr(callback, "__name__", type(callback).__name__),
+            )
+            metrics = self._metrics[id(handler)] = (
+                updates_total.labels(*labels),
+                handler_errors_total.labels(*labels),
+                handler_seconds.labels(*labels),
+            )
+        return metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handled, errors, seconds = self._for(data["handler"])
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            handled.inc()
+            seconds.observe(time.perf_counter() - started)
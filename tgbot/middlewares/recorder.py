@@ -0,0 +1,30 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from tgbot.services.recorder import UpdateRecorder
+
+
+class RecordingMiddleware(BaseMiddleware):
+    """Update middleware, registered first, that records every update and its duration."""
+
+    def __init__(self, recorder: UpdateRecorder) -> None:
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        arrived = time.monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            self.recorder.record(
+                event.model_dump(mode="json", by_alias=True, exclude_none=True),
+                arrived,
+                time.monotonic() - arrived,
+            )
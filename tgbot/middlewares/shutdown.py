@@ -0,0 +1,31 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from tgbot.services.shutdown import ShutdownCoordinator
+
+
+class ShutdownMiddleware(BaseMiddleware):
+    """Update middleware that tracks in-flight updates for the graceful shutdown."""
+
+    def __init__(self, coordinator: ShutdownCoordinator) -> None:
+        self.coordinator = coordinator
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        task = asyncio.current_task()
+        try:
+            update_type = event.event_type
+        except Exception:
+            update_type = "unknown"
+        self.coordinator.track(task, update_type)
+        try:
+            return await handler(event, data)
+        finally:
+            self.coordinator.untrack(task)
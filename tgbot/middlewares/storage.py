@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from tgbot.storage.redis import PipelinedRedisStorage
+
+
+class StorageBatchMiddleware(BaseMiddleware):
+    """
+    Update middleware that reads each FSM record once per update and writes the changes
+    in one pipeline when the update is done.
+    """
+
+    def __init__(self, storage: PipelinedRedisStorage) -> None:
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.storage.batch():
+            return await handler(event, data)
@@ -0,0 +1,80 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from tgbot.services import tracing
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Update middleware that starts the trace of every update, registered first."""
+
+    def __init__(self, tracer: tracing.Tracer) -> None:
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        with self.tracer.trace(f"update {event.event_type}") as root:
+            if root is not None:
+                root.tag("update.id", event.update_id)
+                user = data.get("event_from_user")
+                if user is not None:
+                    root.tag("telegram.user_id", user.id)
+            return await handler(event, data)
+
+
+class TracedMiddleware(BaseMiddleware):
+    """Runs a middleware in a span named after its class."""
+
+    def __init__(self, middleware: Callable[..., Awaitable[Any]]) -> None:
+        self.middleware = middleware
+        self.name = f"middleware {type(middleware).__name__}"
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with tracing.span(self.name):
+            return await self.middleware(handler, event, data)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Inner middleware, registered last, that runs the matched handler in its own span."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        callback = data["handler"].callback
+        name = f"{callback.__module__.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', '?')}"
+        with tracing.span(f"handler {name}"):
+            return await handler(event, data)
+
+
+def trace_middlewares(dp: Dispatcher) -> None:
+    """
+    Run every middleware registered so far in its own span and every handler in another.
+    Call it once, after all the other middlewares are registered.
+    """
+    for router in dp.chain_tail:
+        for observer in router.observers.values():
+            for manager in (observer.outer_middleware, observer.middleware):
+                middlewares = list(manager)
+                for middleware in middlewares:
+                    manager.unregister(middleware)
+                for middleware in middlewares:
+                    if not isinstance(middleware, (TracingMiddleware, TracedMiddleware)):
+                        middleware = TracedMiddleware(middleware)
+                    manager.register(middleware)
+
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(HandlerTracingMiddleware())
@@ -0,0 +1,53 @@
+"""
+Accounting of backend requests, hooked into `MyApi`.
+
+A request is recorded once in the call ledger of the update being processed; every
+attempt gets a trace span and is timed, and failed attempts and retries are counted.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from infrastructure.some_api.hooks import RequestHooks
+from tgbot.services import call_ledger, tracing
+from tgbot.services.metrics import counter, histogram
+
+request_seconds = histogram(
+    "bot_api_request_seconds",
+    "Backend API request time, per method and endpoint",
+    ("method", "endpoint"),
+)
+request_errors_total = counter(
+    "bot_api_request_errors_total",
+    "Failed backend API requests, per method, endpoint and status or error",
+    ("method", "endpoint", "reason"),
+)
+request_retries_total = counter(
+    "bot_api_request_retries_total",
+    "Backend API requests retried after a failed attempt, per method and endpoint",
+    ("method", "endpoint"),
+)
+
+
+class ApiRequestHooks(RequestHooks):
+    """Records backend requests in the call ledger, traces and metrics."""
+
+    def request(self, method: str, endpoint: str) -> None:
+        call_ledger.record(method, endpoint)
+
+    @contextmanager
+    def attempt(self, method: str, endpoint: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"api {method} {endpoint}", kind="CLIENT"):
+                yield
+        except Exception as e:
+            reason = getattr(e, "status", None) or type(e).__name__
+            request_errors_total.labels(method, endpoint, reason).inc()
+            raise
+        finally:
+            request_seconds.labels(method, endpoint).observe(time.perf_counter() - started)
+
+    def retry(self, method: str, endpoint: str) -> None:
+        request_retries_total.labels(method, endpoint).inc()
@@ -1,17 +1,30 @@
 import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Tuple
 
+from aiogram import Bot
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
 from aiogram.types import Message
 
+AUTO_CANCEL_TEXT = "⌛️ 5 daqiqa davomida hech qanday faoliyat kuzatilmadi.\n✅ Jarayon avtomatik ravishda bekor qilindi.\n\n/start"
+
+logger = logging.getLogger(__name__)
+
 
 async def auto_cancel_after_timeout(
-    message: Message, state: FSMContext, timeout_seconds: int = 300
+    bot: Bot, chat_id: int, state: FSMContext, timeout_seconds: float = 300
 ):
     """
     Automatically cancels the current FSM state after a timeout if the user is inactive.
 
     Args:
-        message: aiogram Message object
+        bot: Bot instance
+        chat_id: Chat to notify about the cancellation
         state: FSMContext for current user
         timeout_seconds: How many seconds to wait before auto-cancel (default: 5 minutes)
     """
@@ -20,9 +33,114 @@ async def auto_cancel_after_timeout(
     current_state = await state.get_state()
     if current_state:  # if driver still stuck in a state
         await state.clear()
-        await message.answer(
-            "⌛️ 5 daqiqa davomida hech qanday faoliyat kuzatilmadi.\n✅ Jarayon avtomatik ravishda bekor qilindi.\n\n/start"
-        )
+        await bot.send_message(chat_id, AUTO_CANCEL_TEXT)
+
+
+class AutoCancelScheduler:
+    """
+    Keeps one auto-cancel timer per FSM context.
+
+    Scheduling again for the same user replaces the pending timer, so the timeout
+    counts from the user's last step. Pending timers can be saved on shutdown and
+    restored on the next start.
+    """
+
+    def __init__(self):
+        self._timers: Dict[StorageKey, Tuple[int, float, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def schedule(self, message: Message, state: FSMContext, timeout_seconds: float = 300):
+        """
+        Start (or restart) the auto-cancel timer for the user of the given FSM context.
+        """
+        self._start(message.bot, message.chat.id, state, time.time() + timeout_seconds)
+
+    def _start(self, bot: Bot, chat_id: int, state: FSMContext, deadline: float) -> None:
+        self.cancel(state.key)
+
+        timeout = max(0.0, deadline - time.time())
+        task = asyncio.create_task(auto_cancel_after_timeout(bot, chat_id, state, timeout))
+        self._timers[state.key] = (chat_id, deadline, task)
+        task.add_done_callback(lambda _: self._forget(state.key, task))
+
+    def _forget(self, key: StorageKey, task: asyncio.Task) -> None:
+        timer = self._timers.get(key)
+        if timer is not None and timer[2] is task:
+            del self._timers[key]
+
+    def cancel(self, key: StorageKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer[2].cancel()
+
+    def cancel_all(self) -> None:
+        for key in list(self._timers):
+            self.cancel(key)
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """Pending timers as JSON-serializable entries."""
+        return [
+            {"key": asdict(key), "chat_id": chat_id, "deadline": deadline}
+            for key, (chat_id, deadline, _) in self._timers.items()
+        ]
+
+    def restore(self, bot: Bot, storage: BaseStorage, entries: List[Dict[str, Any]]) -> int:
+        """
+        Restart timers from dumped entries; the ones already due fire right away.
+
+        Returns:
+            Number of restored timers
+        """
+        for entry in entries:
+            key = StorageKey(**entry["key"])
+            state = FSMContext(storage=storage, key=key)
+            self._start(bot, entry["chat_id"], state, entry["deadline"])
+        return len(entries)
+
+    def save(self, path: str) -> int:
+        """
+        Write pending timers to a file.
+
+        Returns:
+            Number of saved timers
+        """
+        entries = self.dump()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    async def persist(self, path: str) -> int:
+        """
+        Save pending timers and stop them, to be run when the bot shuts down.
+
+        Returns:
+            Number of saved timers
+        """
+        saved = self.save(path)
+        self.cancel_all()
+        return saved
+
+    def load(self, bot: Bot, storage: BaseStorage, path: str) -> int:
+        """
+        Restore timers saved by `save` and remove the file.
 
+        Returns:
+            Number of restored timers
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            logger.exception("Could not read auto-cancel timers from %s", path)
+            return 0
+        os.remove(path)
+        return self.restore(bot, storage, entries)
 
 
+scheduler = AutoCancelScheduler()
@@ -1,54 +1,376 @@
 import asyncio
+import contextvars
+import json
 import logging
-from typing import Union
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
 
 from aiogram import Bot
 from aiogram import exceptions
 from aiogram.types import InlineKeyboardMarkup
 
+from tgbot.services.rate_limit import KeyedTokenBuckets, TokenBucket
 
-async def send_message(
-    bot: Bot,
-    user_id: Union[int, str],
-    text: str,
-    disable_notification: bool = False,
-    reply_markup: InlineKeyboardMarkup = None,
-) -> bool:
+# Statuses written to the progress log of a job
+STARTED = "started"
+SENT = "sent"
+RETRY = "retry"
+FAILED = "failed"
+
+
+@dataclass
+class BroadcastJob:
     """
-    Safe messages sender
+    A message to be sent to a list of users.
 
-    :param bot: Bot instance.
-    :param user_id: user id. If str - must contain only digits.
-    :param text: text of the message.
-    :param disable_notification: disable notification or not.
-    :param reply_markup: reply markup.
-    :return: success.
+    Attributes:
+        users: Recipients, in sending order. If str - must contain only digits
+        text: Text of the message
+        disable_notification: Disable notification or not
+        reply_markup: Reply markup as a dict (see `InlineKeyboardMarkup.model_dump`)
+        job_id: Unique id of the job, also the name of its files
+        created: Unix time the job was created
+    """
+
+    users: List[Union[int, str]]
+    text: str
+    disable_notification: bool = False
+    reply_markup: Optional[dict] = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created: float = field(default_factory=time.time)
+
+
+@dataclass
+class BroadcastReport:
+    """
+    Outcome of running a broadcast job.
+
+    Attributes:
+        job_id: Id of the job
+        total: Unique recipients of the job
+        sent: Messages delivered in this run
+        skipped: Recipients already handled before the job was resumed
+        unknown: Recipients whose send was interrupted by a crash; they are not retried,
+            so nobody gets the message twice
+        failed: Failed recipients by error type
+        flood_waits: How many times Telegram asked the whole pool to slow down
+        interrupted: The job was stopped before all recipients were handled
+        duration: Seconds the run took
+    """
+
+    job_id: str
+    total: int = 0
+    sent: int = 0
+    skipped: int = 0
+    unknown: int = 0
+    failed: Dict[str, int] = field(default_factory=dict)
+    flood_waits: int = 0
+    interrupted: bool = False
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Delivered messages per second."""
+        return self.sent / self.duration if self.duration else 0.0
+
+
+class _ProgressLog:
+    """Append-only log of per-recipient statuses, one `user_id<TAB>status` line each."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def read(self) -> Dict[str, str]:
+        statuses = {}
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                for line in file:
+                    user_id, _, status = line.rstrip("\n").partition("\t")
+                    if status:
+                        statuses[user_id] = status
+        return statuses
+
+    def write(self, user_id: Union[int, str], status: str) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", buffering=1)
+        self._file.write(f"{user_id}\t{status}\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Broadcaster:
+    """
+    Sends broadcast jobs with a pool of workers.
+
+    All workers share a global token bucket (Telegram allows about 30 messages per second)
+    and per-chat limits. With a `shared_bucket` - the global bucket of the outbox - a send
+    also takes one of its tokens, but only a spare one, when no other call is waiting for
+    it: Telegram's limit holds for the bot as a whole, and interactive replies go first.
+    The bot given to the broadcaster should therefore not go through the outbox itself.
+
+    A flood wait from Telegram pauses the whole pool, and the recipient is retried later.
+    When `jobs_dir` is set, jobs and the status of every recipient are written to disk,
+    so a job interrupted by a restart or `stop` can be resumed without sending anyone the
+    message twice.
     """
-    try:
-        await bot.send_message(
-            user_id,
-            text,
+
+    def __init__(
+        self,
+        bot: Bot,
+        jobs_dir: Optional[str] = None,
+        rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        workers: int = 16,
+        max_attempts: int = 5,
+        shared_bucket: Optional[TokenBucket] = None,
+    ):
+        self.bot = bot
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._bucket = TokenBucket(rate)
+        self._per_chat = KeyedTokenBuckets(per_chat_rate)
+        self.shared_bucket = shared_bucket
+        self._worker_tasks: Set[asyncio.Task] = set()
+        self._deliveries: Set[asyncio.Task] = set()
+        self._runs: Set[asyncio.Task] = set()
+        self._running: Set[str] = set()
+        self._stopped = False
+
+        if jobs_dir:
+            os.makedirs(jobs_dir, exist_ok=True)
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}{suffix}")
+
+    def submit(
+        self,
+        users: List[Union[int, str]],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+    ) -> BroadcastJob:
+        """
+        Create a job and save it, so it survives a restart. Start it with `run`.
+        """
+        job = BroadcastJob(
+            users=list(users),
+            text=text,
             disable_notification=disable_notification,
-            reply_markup=reply_markup,
+            reply_markup=reply_markup.model_dump(exclude_none=True) if reply_markup else None,
         )
-    except exceptions.TelegramBadRequest as e:
-        logging.error("Telegram server says - Bad Request: chat not found")
-    except exceptions.TelegramForbiddenError:
-        logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
-    except exceptions.TelegramRetryAfter as e:
-        logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
+        if self.jobs_dir:
+            with open(self._path(job.job_id, ".json"), "w") as file:
+                json.dump(asdict(job), file)
+        return job
+
+    def pending_jobs(self) -> List[BroadcastJob]:
+        """Saved jobs that haven't finished yet and aren't running, oldest first."""
+        if not self.jobs_dir:
+            return []
+
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            job_id, extension = os.path.splitext(name)
+            if extension != ".json" or job_id.endswith(".report") or job_id in self._running:
+                continue
+            if os.path.exists(self._path(job_id, ".report.json")):
+                continue
+            with open(os.path.join(self.jobs_dir, name)) as file:
+                jobs.append(BroadcastJob(**json.load(file)))
+        return sorted(jobs, key=lambda job: job.created)
+
+    async def resume(self) -> List[BroadcastReport]:
+        """Run every saved job that hasn't finished yet."""
+        return await self._run_all(self.pending_jobs())
+
+    async def _run_all(
+        self,
+        jobs: Iterable[BroadcastJob],
+        notify: Optional[Callable[[BroadcastReport], Awaitable[Any]]] = None,
+    ) -> List[BroadcastReport]:
+        reports = []
+        for job in jobs:
+            if self._stopped:
+                break
+            report = await self.run(job)
+            reports.append(report)
+            if notify is not None:
+                try:
+                    await notify(report)
+                except Exception:
+                    logging.exception("Could not report broadcast %s", job.job_id)
+        return reports
+
+    def start(
+        self,
+        jobs: Iterable[BroadcastJob],
+        notify: Optional[Callable[[BroadcastReport], Awaitable[Any]]] = None,
+    ) -> asyncio.Task:
+        """
+        Run the jobs one after another in the background, e.g. for an admin command that
+        shouldn't wait for them, and pass the report of each one to `notify`. `stop`
+        interrupts them.
+        """
+        self._stopped = False
+        # A fresh context, so the jobs are not traced or accounted as part of an update
+        task = asyncio.create_task(
+            self._run_all(list(jobs), notify), context=contextvars.Context()
+        )
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        return task
+
+    async def run(self, job: BroadcastJob) -> BroadcastReport:
+        """
+        Send the job to all of its recipients that haven't been handled yet.
+        """
+        started = time.monotonic()
+        report = BroadcastReport(job_id=job.job_id)
+        self._running.add(job.job_id)
+        progress = _ProgressLog(self._path(job.job_id, ".log")) if self.jobs_dir else None
+        statuses = progress.read() if progress else {}
+        reply_markup = (
+            InlineKeyboardMarkup.model_validate(job.reply_markup) if job.reply_markup else None
         )
-        await asyncio.sleep(e.retry_after)
-        return await send_message(
-            bot, user_id, text, disable_notification, reply_markup
-        )  # Recursive call
-    except exceptions.TelegramAPIError:
-        logging.exception(f"Target [ID:{user_id}]: failed")
-    else:
-        logging.info(f"Target [ID:{user_id}]: success")
-        return True
-    return False
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_id in dict.fromkeys(job.users):
+            report.total += 1
+            status = statuses.get(str(user_id))
+            if status == STARTED:
+                report.unknown += 1
+            elif status in (SENT, FAILED) or (status or "").startswith(f"{FAILED}:"):
+                report.skipped += 1
+            else:
+                queue.put_nowait((user_id, 1))
+
+        workers = [
+            asyncio.create_task(self._worker(job, reply_markup, queue, progress, report))
+            for _ in range(min(self.workers, max(queue.qsize(), 1)))
+        ]
+        self._worker_tasks.update(workers)
+        workers_done = asyncio.gather(*workers, return_exceptions=True)
+        all_handled = asyncio.ensure_future(queue.join())
+        try:
+            await asyncio.wait({all_handled, workers_done}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            all_handled.cancel()
+            for worker in workers:
+                worker.cancel()
+            await workers_done
+            self._worker_tasks.difference_update(workers)
+            self._running.discard(job.job_id)
+            if progress:
+                progress.close()
+
+        report.interrupted = not all_handled.done() or all_handled.cancelled()
+        report.duration = time.monotonic() - started
+        if self.jobs_dir and not report.interrupted:
+            with open(self._path(job.job_id, ".report.json"), "w") as file:
+                json.dump(asdict(report), file)
+
+        logging.info(
+            "Broadcast %s %s: %d/%d sent (%.1f msg/s), %d skipped, %d unknown, %d flood waits, failed: %s",
+            job.job_id,
+            "interrupted" if report.interrupted else "finished",
+            report.sent,
+            report.total,
+            report.throughput,
+            report.skipped,
+            report.unknown,
+            report.flood_waits,
+            report.failed or "none",
+        )
+        return report
+
+    async def _worker(self, job, reply_markup, queue, progress, report) -> None:
+        while True:
+            user_id, attempt = await queue.get()
+            try:
+                await self._per_chat.acquire(user_id)
+                await self._bucket.acquire()
+                await self._spare_token()
+                # Once a send has started it's finished even if the worker is stopped,
+                # so its outcome is always recorded
+                delivery = asyncio.create_task(
+                    self._deliver(job, reply_markup, user_id, attempt, queue, progress, report)
+                )
+                self._deliveries.add(delivery)
+                delivery.add_done_callback(self._deliveries.discard)
+                await asyncio.shield(delivery)
+            finally:
+                queue.task_done()
+
+    async def _spare_token(self) -> None:
+        if self.shared_bucket is None:
+            return
+        while not self.shared_bucket.try_acquire():
+            await asyncio.sleep(max(self.shared_bucket.paused_for, 1 / self.shared_bucket.rate))
+
+    async def _deliver(self, job, reply_markup, user_id, attempt, queue, progress, report) -> None:
+        def record(status: str) -> None:
+            if progress:
+                progress.write(user_id, status)
+
+        def fail(reason: str) -> None:
+            report.failed[reason] = report.failed.get(reason, 0) + 1
+            record(f"{FAILED}:{reason}")
+
+        record(STARTED)
+        try:
+            await self.bot.send_message(
+                user_id,
+                job.text,
+                disable_notification=job.disable_notification,
+                reply_markup=reply_markup,
+            )
+        except exceptions.TelegramRetryAfter as e:
+            report.flood_waits += 1
+            logging.error(
+                f"Target [ID:{user_id}]: Flood limit is exceeded. Pausing all workers for {e.retry_after} seconds."
+            )
+            self._bucket.pause(e.retry_after)
+            if self.shared_bucket is not None:
+                self.shared_bucket.pause(e.retry_after)
+            if attempt < self.max_attempts:
+                record(RETRY)
+                queue.put_nowait((user_id, attempt + 1))
+            else:
+                fail(type(e).__name__)
+        except exceptions.TelegramAPIError as e:
+            logging.error(f"Target [ID:{user_id}]: failed - {type(e).__name__}: {e}")
+            fail(type(e).__name__)
+        else:
+            report.sent += 1
+            record(SENT)
+
+    async def stop(self) -> int:
+        """
+        Stop running jobs once the messages being sent right now are done.
+        Their progress stays saved and they continue on the next `resume`.
+
+        Returns:
+            Number of stopped workers
+        """
+        self._stopped = True
+        workers = list(self._worker_tasks)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if self._deliveries:
+            await asyncio.wait(set(self._deliveries))
+        # The jobs started in the background report and end once their workers are gone
+        runs = [run for run in self._runs if run is not asyncio.current_task()]
+        await asyncio.gather(*runs, return_exceptions=True)
+        return len(workers)
 
 
 async def broadcast(
@@ -59,7 +381,7 @@ async def broadcast(
     reply_markup: InlineKeyboardMarkup = None,
 ) -> int:
     """
-    Simple broadcaster.
+    Simple broadcaster, without saving progress.
     :param bot: Bot instance.
     :param users: List of users.
     :param text: Text of the message.
@@ -67,17 +389,7 @@ async def broadcast(
     :param reply_markup: Reply markup.
     :return: Count of messages.
     """
-    count = 0
-    try:
-        for user_id in users:
-            if await send_message(
-                bot, user_id, text, disable_notification, reply_markup
-            ):
-                count += 1
-            await asyncio.sleep(
-                0.05
-            )  # 20 messages per second (Limit: 30 messages per second)
-    finally:
-        logging.info(f"{count} messages successful sent.")
-
-    return count
+    broadcaster = Broadcaster(bot)
+    job = broadcaster.submit(users, text, disable_notification, reply_markup)
+    report = await broadcaster.run(job)
+    return report.sent
@@ -0,0 +1,228 @@
+"""
+Backend call accounting per update.
+
+Every `MyApi` request made while an update is processed - by middlewares or the handler -
+is recorded in the update's ledger, held in a context variable, through the client's
+ApiRequestHooks. A request counts once, however many attempts its retries take; retries
+are counted by bot_api_request_retries_total. When the update is done, its calls are
+counted per handler and endpoint, a warning is logged if the same endpoint was called
+more than once, and the ledger is appended to a JSONL log.
+
+The log is read back offline to rank handlers by their backend calls per update:
+
+    python -m tgbot.services.call_ledger api_calls.jsonl [--top 20]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from tgbot.services.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+UNHANDLED = "unhandled"
+
+backend_calls_total = counter(
+    "bot_backend_calls_total",
+    "Backend API calls, per handler and endpoint",
+    ("handler", "endpoint"),
+)
+repeated_calls_total = counter(
+    "bot_backend_repeated_calls_total",
+    "Backend API calls repeating an endpoint already called for the same update",
+    ("handler", "endpoint"),
+)
+calls_per_update = histogram(
+    "bot_backend_calls_per_update",
+    "Backend API calls made for one update, per handler",
+    ("handler",),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12),
+)
+
+
+class Ledger:
+    """Backend calls made for one update."""
+
+    __slots__ = ("update_id", "handler", "calls", "closed")
+
+    def __init__(self, update_id: int):
+        self.update_id = update_id
+        self.handler = UNHANDLED
+        # "METHOD /endpoint/" -> times called
+        self.calls: Dict[str, int] = {}
+        self.closed = False
+
+
+_ledger: ContextVar[Optional[Ledger]] = ContextVar("call_ledger", default=None)
+
+
+def record(method: str, endpoint: str) -> None:
+    """Count a backend call for the update being processed. Does nothing outside of one."""
+    ledger = _ledger.get()
+    if ledger is not None and not ledger.closed:
+        call = f"{method} {endpoint}"
+        ledger.calls[call] = ledger.calls.get(call, 0) + 1
+
+
+def set_handler(name: str) -> None:
+    """Attribute the calls of the update being processed to the handler `name`."""
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.handler = name
+
+
+class CallLedger:
+    """
+    Keeps a ledger per update and accounts for it when the update is done.
+    """
+
+    def __init__(self, path: str = "", max_pending: int = 10000):
+        self.path = path
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: List[str] = []
+
+    @contextmanager
+    def track(self, update_id: int) -> Iterator[Optional[Ledger]]:
+        """Record the backend calls made within the block, unless an update is already tracked."""
+        if _ledger.get() is not None:
+            yield None
+            return
+
+        ledger = Ledger(update_id)
+        token = _ledger.set(ledger)
+        try:
+            yield ledger
+        finally:
+            # Calls of tasks the update started are not its own anymore
+            ledger.closed = True
+            _ledger.reset(token)
+            self._account(ledger)
+
+    def _account(self, ledger: Ledger) -> None:
+        calls_per_update.labels(ledger.handler).observe(sum(ledger.calls.values()))
+        repeated = {call: count for call, count in ledger.calls.items() if count > 1}
+        for call, count in ledger.calls.items():
+            backend_calls_total.labels(ledger.handler, call).inc(count)
+        for call, count in repeated.items():
+            repeated_calls_total.labels(ledger.handler, call).inc(count - 1)
+        if repeated:
+            logger.warning(
+                "Handler %s repeated backend calls for update %s: %s",
+                ledger.handler,
+                ledger.update_id,
+                ", ".join(f"{call} x{count}" for call, count in repeated.items()),
+            )
+
+        if not self.path:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        entry = {
+            "ts": round(time.time(), 3),
+            "update_id": ledger.update_id,
+            "handler": ledger.handler,
+            "calls": ledger.calls,
+        }
+        self._pending.append(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def flush(self) -> int:
+        """Append the ledgers accounted so far to the log. Returns how many were written."""
+        lines, self._pending = self._pending, []
+        if not lines:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, lines)
+        except OSError:
+            logger.exception("Could not write %d ledgers to %s", len(lines), self.path)
+        return len(lines)
+
+    async def write_periodically(self, interval: float = 10.0) -> None:
+        """Append the accounted ledgers to the log every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self) -> Dict[str, Any]:
+        """Write what is left, to be run when the bot shuts down."""
+        return {"written": await self.flush(), "dropped": self.dropped}
+
+
+def read_log(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Cut off when the bot was killed mid-write
+                    continue
+
+
+def report(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per handler statistics of the logged ledgers, most backend calls per update first."""
+    handlers: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        handler = entry["handler"]
+        stats = handlers.get(handler)
+        if stats is None:
+            stats = handlers[handler] = {
+                "handler": handler,
+                "updates": 0,
+                "calls": 0,
+                "max": 0,
+                "repeats": 0,
+                "endpoints": {},
+            }
+        calls = entry["calls"]
+        total = sum(calls.values())
+        stats["updates"] += 1
+        stats["calls"] += total
+        stats["max"] = max(stats["max"], total)
+        stats["repeats"] += sum(count - 1 for count in calls.values() if count > 1)
+        for call, count in calls.items():
+            stats["endpoints"][call] = stats["endpoints"].get(call, 0) + count
+
+    rows = []
+    for stats in handlers.values():
+        updates = stats["updates"]
+        stats["per_update"] = stats["calls"] / updates
+        stats["repeats_per_update"] = stats["repeats"] / updates
+        rows.append(stats)
+    rows.sort(key=lambda row: (row["per_update"], row["calls"]), reverse=True)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rank handlers by backend calls per update.")
+    parser.add_argument("paths", nargs="+", help="JSONL logs written by the bot")
+    parser.add_argument("--top", type=int, default=20, help="handlers to show")
+    args = parser.parse_args()
+
+    rows = report(read_log(args.paths))
+    print(
+        f"{'handler':<40} | {'updates':>7} | {'calls/upd':>9} | {'max':>3} | "
+        f"{'repeats/upd':>11} | endpoints"
+    )
+    for row in rows[: args.top]:
+        endpoints = sorted(row["endpoints"].items(), key=lambda item: item[1], reverse=True)
+        top = ", ".join(f"{call} {count / row['updates']:.1f}" for call, count in endpoints[:3])
+        print(
+            f"{row['handler']:<40} | {row['updates']:>7} | {row['per_update']:>9.2f} | "
+            f"{row['max']:>3} | {row['repeats_per_update']:>11.2f} | {top}"
+        )
+
+
+if __name__ == "__main__":
+    main()
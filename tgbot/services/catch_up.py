@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import signal
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CatchUpReport:
+    """
+    Outcome of draining the updates that piled up while the bot was down.
+
+    Attributes:
+        received: Updates fetched from Telegram
+        processed: Updates fed to the dispatcher
+        collapsed: Live-location updates superseded by a later one for the same message
+        skipped: Callback queries older than the configured age
+        failed: Updates whose handling raised an exception
+        interrupted: Stopped by a signal before the backlog was drained
+        duration: Seconds spent on catching up
+    """
+
+    received: int = 0
+    processed: int = 0
+    collapsed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    interrupted: bool = False
+    duration: float = 0.0
+
+
+def _location_key(update: Update) -> Optional[Tuple[int, int]]:
+    message = update.message or update.edited_message
+    if message is None or message.location is None:
+        return None
+    return message.chat.id, message.message_id
+
+
+def collapse_location_updates(updates: List[Update]) -> Tuple[List[Update], int]:
+    """
+    Keep only the latest update of every live location, the earlier ones are superseded.
+
+    Returns:
+        Tuple of (remaining updates in their original order, number of collapsed updates)
+    """
+    latest: Dict[Tuple[int, int], int] = {}
+    for update in updates:
+        key = _location_key(update)
+        if key is not None:
+            latest[key] = update.update_id
+
+    kept = [
+        update
+        for update in updates
+        if _location_key(update) is None or latest[_location_key(update)] == update.update_id
+    ]
+    return kept, len(updates) - len(kept)
+
+
+def _update_time(update: Update) -> Optional[datetime]:
+    if update.edited_message is not None:
+        edit_date = update.edited_message.edit_date
+        if edit_date:
+            # Unlike `date`, aiogram keeps `edit_date` as a unix timestamp
+            return datetime.fromtimestamp(edit_date, tz=timezone.utc)
+        return update.edited_message.date
+    if update.message is not None:
+        return update.message.date
+    return None
+
+
+def drop_stale_callbacks(
+    updates: List[Update], max_age: float, now: Optional[datetime] = None
+) -> Tuple[List[Update], int]:
+    """
+    Drop callback queries older than `max_age` seconds.
+
+    Telegram doesn't tell when a button was pressed, so the time of a callback query is
+    estimated from the closest earlier message in the same batch (update ids grow with
+    time), or the closest later one if there is none. Callbacks without any dated
+    neighbour are kept.
+
+    Returns:
+        Tuple of (remaining updates, number of dropped callback queries)
+    """
+    now = now or datetime.now(timezone.utc)
+    times = [_update_time(update) for update in updates]
+
+    estimated: List[Optional[datetime]] = []
+    previous = None
+    for moment in times:
+        previous = moment or previous
+        estimated.append(previous)
+    following = None
+    for index in range(len(times) - 1, -1, -1):
+        following = times[index] or following
+        if estimated[index] is None:
+            estimated[index] = following
+
+    kept = []
+    for update, moment in zip(updates, estimated):
+        if (
+            update.callback_query is not None
+            and moment is not None
+            and (now - moment).total_seconds() > max_age
+        ):
+            continue
+        kept.append(update)
+    return kept, len(updates) - len(kept)
+
+
+def _chat_key(update: Update) -> int:
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+
+    chat = getattr(event, "chat", None)
+    if chat is None and getattr(event, "message", None) is not None:
+        chat = event.message.chat
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user else update.update_id
+
+
+@contextmanager
+def stop_on_signals(stop: asyncio.Event) -> Iterator[asyncio.Event]:
+    """
+    Set `stop` on SIGTERM or SIGINT within the block, which runs before polling installs
+    its own signal handlers, so a stop request still ends in the graceful shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    installed = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            # Signals handling is not supported on Windows
+            continue
+        installed.append(signum)
+    try:
+        yield stop
+    finally:
+        for signum in installed:
+            loop.remove_signal_handler(signum)
+
+
+async def catch_up(
+    bot: Bot,
+    dp: Dispatcher,
+    max_callback_age: float = 300.0,
+    parallelism: int = 64,
+    progress_interval: float = 5.0,
+    stop: Optional[asyncio.Event] = None,
+    **kwargs: Any,
+) -> CatchUpReport:
+    """
+    Process the updates that arrived while the bot was offline, before polling starts.
+
+    Updates are fetched page by page; a page is only confirmed to Telegram (by asking for
+    the next one) after it was processed, so a crash during catch-up loses nothing.
+    Within a page, superseded live-location updates are collapsed and stale callback
+    queries are skipped. Chats are drained in parallel, updates of one chat in order.
+    Once `stop` is set, the page being processed is finished and confirmed, and the rest
+    is left to the next start.
+
+    Args:
+        bot: Bot instance
+        dp: Dispatcher with all routers and middlewares registered
+        max_callback_age: Callback queries older than this many seconds are skipped
+        parallelism: How many chats are processed at the same time
+        progress_interval: How often progress is logged, in seconds
+        stop: Event that ends the catch-up early, see `stop_on_signals`
+        **kwargs: Contextual data for handlers, same as for polling
+
+    Returns:
+        CatchUpReport with the counters of the run
+    """
+    report = CatchUpReport()
+    started = time.monotonic()
+    last_progress = started
+    semaphore = asyncio.Semaphore(parallelism)
+    allowed_updates = dp.resolve_used_update_types()
+    workflow_data = {"dispatcher": dp, "bots": (bot,), **dp.workflow_data, **kwargs}
+
+    async def feed_chat(chat_updates: List[Update]) -> None:
+        async with semaphore:
+            for update in chat_updates:
+                try:
+                    await dp.feed_update(bot, update, **workflow_data)
+                except Exception:
+                    report.failed += 1
+                    logger.exception("Catch-up failed to process update id=%d", update.update_id)
+                report.processed += 1
+
+    offset = None
+    while True:
+        if stop is not None and stop.is_set():
+            report.interrupted = True
+            if offset is not None:
+                # Confirms the processed pages; what this fetches is delivered again later
+                await bot.get_updates(
+                    offset=offset, limit=1, timeout=0, allowed_updates=allowed_updates
+                )
+            break
+        updates = await bot.get_updates(
+            offset=offset, limit=100, timeout=0, allowed_updates=allowed_updates
+        )
+        if not updates:
+            break
+        offset = updates[-1].update_id + 1
+        report.received += len(updates)
+
+        # Callback times are estimated from neighbouring messages, so drop them before collapsing
+        updates, skipped = drop_stale_callbacks(updates, max_callback_age)
+        updates, collapsed = collapse_location_updates(updates)
+        report.collapsed += collapsed
+        report.skipped += skipped
+
+        chats: Dict[int, List[Update]] = {}
+        for update in updates:
+            chats.setdefault(_chat_key(update), []).append(update)
+        await asyncio.gather(*(feed_chat(chat_updates) for chat_updates in chats.values()))
+
+        now = time.monotonic()
+        if now - last_progress >= progress_interval:
+            last_progress = now
+            logger.info(
+                "Catch-up progress: %d received, %d processed, %d collapsed, %d skipped (%.0f updates/s)",
+                report.received,
+                report.processed,
+                report.collapsed,
+                report.skipped,
+                report.received / (now - started),
+            )
+
+
+    report.duration = time.monotonic() - started
+    logger.info(
+        "Catch-up %s in %.1fs: %d received, %d processed, %d collapsed, %d skipped, %d failed",
+        "interrupted" if report.interrupted else "finished",
+        report.duration,
+        report.received,
+        report.processed,
+        report.collapsed,
+        report.skipped,
+        report.failed,
+    )
+    return report
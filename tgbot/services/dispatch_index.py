@@ -0,0 +1,195 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from inspect import isclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters import StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Chat, Message, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """
+    Handler that the router walk would pick for a button label.
+
+    Attributes:
+        observer: Message observer of the router owning the handler
+        handler: The handler itself
+        diverted_states: Raw FSM states in which an earlier state-bound handler
+            catches the label first, so the regular walk must be used instead
+        fallthrough: Message observers of the routers walked after the handler's
+            router, in walk order, tried when its handlers skip the message
+    """
+
+    observer: TelegramEventObserver
+    handler: HandlerObject
+    diverted_states: FrozenSet[Optional[str]]
+    fallthrough: Tuple[TelegramEventObserver, ...] = ()
+
+
+def _is_state_filter(filter_object: FilterObject) -> bool:
+    callback = filter_object.callback
+    return isinstance(callback, (State, StatesGroup, StateFilter)) or (
+        isclass(callback) and issubclass(callback, StatesGroup)
+    )
+
+
+def _state_names(filter_object: FilterObject) -> Optional[FrozenSet[Optional[str]]]:
+    """
+    Raw states matched by a state filter, or None if it matches any state.
+    """
+    callback = filter_object.callback
+    states = callback.states if isinstance(callback, StateFilter) else (callback,)
+
+    names = set()
+    for state in states:
+        if isinstance(state, State):
+            state = state.state
+        if isinstance(state, StatesGroup) or (isclass(state) and issubclass(state, StatesGroup)):
+            names.update(state.__all_states_names__)
+        elif state == "*":
+            return None
+        else:
+            names.add(state)
+    return frozenset(names)
+
+
+async def _filters_pass(filters: List[FilterObject], event: Message, data: Dict[str, Any]) -> bool:
+    for filter_object in filters:
+        if not await filter_object.call(event, **data):
+            return False
+    return True
+
+
+class DispatchIndex:
+    """
+    Precompiled map from reply keyboard button labels to the handler that handles them.
+
+    Compiling walks the message handlers in the same order as the dispatcher does and
+    evaluates their filters once per label, so a button tap costs a dict lookup
+    instead of running every router's filters.
+
+    Labels are left out of the index (and go through the regular walk) whenever the
+    outcome can't be decided from the label alone, e.g. a filter needs data that is
+    only known for a real update.
+
+    The index skips the routers walked before the handler's one, so it can't be used
+    when any included router has message outer middlewares of its own; `compile`
+    refuses to build it then.
+    """
+
+    def __init__(self, labels: Iterable[str]):
+        self.labels = frozenset(labels)
+        self._entries: Dict[str, IndexEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def compile(self, dispatcher: Router, **data: Any) -> None:
+        """
+        Build the index for the routers included into the dispatcher.
+
+        Args:
+            dispatcher: Root router the updates are fed to
+            **data: Extra data available to the filters, like the config
+
+        Raises:
+            RuntimeError: An included router has message outer middlewares, which
+                the indexed dispatch would skip
+        """
+        with_outer = [
+            router.name
+            for router in dispatcher.chain_tail
+            if router is not dispatcher and len(router.message.outer_middleware)
+        ]
+        if with_outer:
+            raise RuntimeError(
+                "The dispatch index would skip the message outer middlewares of routers "
+                + ", ".join(with_outer)
+            )
+
+        walk = [
+            (router.message, handler)
+            for router in dispatcher.chain_tail
+            for handler in router.message.handlers
+        ]
+
+        entries = {}
+        for label in self.labels:
+            entry = await self._resolve(label, walk, data)
+            if entry is not None:
+                entries[label] = entry
+
+        self._entries = entries
+        logger.info("Dispatch index compiled: %d of %d labels", len(entries), len(self.labels))
+
+    @staticmethod
+    async def _resolve(
+        label: str,
+        walk: List[Tuple[TelegramEventObserver, HandlerObject]],
+        data: Dict[str, Any],
+    ) -> Optional[IndexEntry]:
+        user = User(id=0, is_bot=False, first_name="")
+        chat = Chat(id=0, type="private")
+        event = Message(
+            message_id=0,
+            date=datetime.now(timezone.utc),
+            chat=chat,
+            from_user=user,
+            text=label,
+        )
+        kwargs = {
+            "bot": None,
+            "raw_state": None,
+            "event_from_user": user,
+            "event_chat": chat,
+            **data,
+        }
+
+        diverted = set()
+        for position, (observer, handler) in enumerate(walk):
+            filters = handler.filters or []
+            state_filters = [f for f in filters if _is_state_filter(f)]
+            other_filters = [f for f in filters if not _is_state_filter(f)]
+            try:
+                if not await _filters_pass(other_filters, event, kwargs):
+                    continue
+            except Exception:
+                # The filter depends on more than the text, can't be decided upfront
+                return None
+
+            if observer._handler.filters:
+                # Router-level filters (e.g. admin only) can't be decided upfront
+                return None
+
+            if state_filters:
+                for state_filter in state_filters:
+                    names = _state_names(state_filter)
+                    if names is None:
+                        return None
+                    diverted.update(names)
+                continue
+
+            fallthrough = []
+            for later, _ in walk[position + 1:]:
+                if later is not observer and later not in fallthrough:
+                    fallthrough.append(later)
+            return IndexEntry(observer, handler, frozenset(diverted), tuple(fallthrough))
+
+        return None
+
+    def lookup(self, text: Optional[str], raw_state: Optional[str]) -> Optional[IndexEntry]:
+        """
+        Return the indexed handler for a message text in the given FSM state, if any.
+        """
+        entry = self._entries.get(text)
+        if entry is None or raw_state in entry.diverted_states:
+            return None
+        return entry
@@ -0,0 +1,134 @@
+import inspect
+import logging
+from functools import wraps
+from string import Formatter
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, List, Mapping, Tuple, TypeVar
+
+DEFAULT_LANGUAGE = "uz"
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class Translations(dict):
+    """
+    Texts of one namespace by language code, e.g. `TRANSLATIONS["ru"]["cancel"]`.
+
+    Languages without translations get the texts of the default language.
+    """
+
+    def __init__(self, namespace: str, texts: Dict[str, Dict[str, str]], default_language: str):
+        super().__init__(texts)
+        self.namespace = namespace
+        self.default_language = default_language
+
+    def __missing__(self, language: str) -> Mapping[str, str]:
+        if language == self.default_language:
+            raise KeyError(language)
+        return self[self.default_language]
+
+
+def _placeholders(text: str) -> Tuple[str, ...]:
+    return tuple(field for _, field, _, _ in Formatter().parse(text) if field is not None)
+
+
+class Catalog:
+    """
+    All translations of the bot, registered by namespace when the modules are imported.
+
+    `compile` runs once at startup: it fills keys missing in a language from the default
+    language, reports keys without any fallback and texts whose placeholders differ from
+    the default language, and freezes the texts.
+    """
+
+    def __init__(self, default_language: str = DEFAULT_LANGUAGE):
+        self.default_language = default_language
+        self.languages: FrozenSet[str] = frozenset()
+        self.compiled = False
+        self._namespaces: Dict[str, Translations] = {}
+
+    def register(self, namespace: str, texts: Dict[str, Dict[str, str]]) -> Translations:
+        """
+        Add the translations of a namespace to the catalog.
+
+        Returns:
+            Translations that fall back to the default language
+        """
+        translations = Translations(namespace, texts, self.default_language)
+        self._namespaces[namespace] = translations
+        self.languages = self.languages | set(texts)
+        return translations
+
+    def resolve(self, language: str) -> str:
+        """Return the language if it has translations, the default language otherwise."""
+        return language if language in self.languages else self.default_language
+
+    def text(self, language: str, namespace: str, key: str) -> str:
+        return self._namespaces[namespace][self.resolve(language)][key]
+
+    def compile(self) -> List[str]:
+        """
+        Check and freeze all registered translations.
+
+        Returns:
+            Descriptions of the problems found, empty if there are none
+        """
+        problems = []
+        for namespace, translations in self._namespaces.items():
+            default = dict.get(translations, self.default_language)
+            if default is None:
+                problems.append(f"{namespace}: no texts in the default language {self.default_language}")
+                default = {}
+
+            keys = set().union(*(texts.keys() for texts in translations.values()))
+            for language in sorted(self.languages):
+                texts = dict(dict.get(translations, language, {}))
+                for key in sorted(keys - texts.keys()):
+                    if key in default:
+                        texts[key] = default[key]
+                        problems.append(
+                            f"{namespace}.{key}: missing in {language}, falls back to {self.default_language}"
+                        )
+                    else:
+                        problems.append(f"{namespace}.{key}: missing in {language}, no fallback")
+
+                for key, text in texts.items():
+                    if key in default and _placeholders(text) != _placeholders(default[key]):
+                        problems.append(
+                            f"{namespace}.{key}: placeholders in {language} differ from {self.default_language}"
+                        )
+                dict.__setitem__(translations, language, MappingProxyType(texts))
+
+        self.compiled = True
+        for problem in problems:
+            logger.warning("Translations: %s", problem)
+        return problems
+
+
+catalog = Catalog()
+
+
+def cached_per_language(build: Callable[[str], T]) -> Callable[[str], T]:
+    """
+    Decorator for keyboard builders that only depend on the language.
+
+    The markup is built once per language; unknown languages get the markup of the default
+    language. Returned objects are shared between calls and must not be modified.
+    The uncached builder stays available as `__wrapped__`.
+    """
+    default = next(iter(inspect.signature(build).parameters.values())).default
+    if default is inspect.Parameter.empty:
+        default = None
+    cache: Dict[str, T] = {}
+
+    @wraps(build)
+    def wrapper(language: str = default) -> T:
+        language = catalog.resolve(language)
+        markup = cache.get(language)
+        if markup is None:
+            markup = cache[language] = build(language)
+        return markup
+
+    return wrapper
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from aiogram.types import Update
+
+from tgbot.services.metrics import LatencyRecorder
+
+HIGH_LANE = "high"
+LOW_LANE = "low"
+
+logger = logging.getLogger(__name__)
+
+
+def classify_update(update: Update) -> Tuple[str, Optional[Hashable]]:
+    """
+    Decide which lane an incoming update belongs to.
+
+    Live-location edits go to the low lane and are keyed by (chat id, message id),
+    so a newer edit of the same live location can replace an older one still waiting.
+    Everything else (button taps, text, callbacks) is interactive and goes to the high lane.
+
+    Returns:
+        Tuple of (lane name, coalesce key or None)
+    """
+    edited = update.edited_message
+    if edited is not None and edited.location is not None:
+        return LOW_LANE, (edited.chat.id, edited.message_id)
+    return HIGH_LANE, None
+
+
+class _Waiter:
+    __slots__ = ("future", "enqueued")
+
+    def __init__(self, future: asyncio.Future, enqueued: float):
+        self.future = future
+        self.enqueued = enqueued
+
+
+class UpdateLanes:
+    """
+    Priority scheduler for update processing.
+
+    At most `concurrency` updates are processed at once. When all slots are busy,
+    updates wait in their lane and freed slots always go to the high lane first.
+
+    The low lane is admission-controlled: once its head-of-line queue time exceeds
+    `low_latency_budget`, a new edit of a live location replaces the one still waiting
+    for the same message (merge), and while `low_max_pending` low-lane updates are
+    already waiting, the oldest of them is dropped to make room for the new one (shed):
+    the newest position is the one worth processing.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 64,
+        low_latency_budget: float = 1.0,
+        low_max_pending: int = 500,
+    ):
+        self.concurrency = concurrency
+        self.low_latency_budget = low_latency_budget
+        self.low_max_pending = low_max_pending
+
+        self._free_slots = concurrency
+        self._high: deque = deque()
+        self._low: "OrderedDict[Hashable, _Waiter]" = OrderedDict()
+
+        self.queue_time = {HIGH_LANE: LatencyRecorder(), LOW_LANE: LatencyRecorder()}
+        self.merged = 0
+        self.shed = 0
+
+    @property
+    def depth(self) -> Dict[str, int]:
+        return {HIGH_LANE: len(self._high), LOW_LANE: len(self._low)}
+
+    def _low_lane_latency(self, now: float) -> float:
+        if not self._low:
+            return 0.0
+        oldest = next(iter(self._low.values()))
+        return now - oldest.enqueued
+
+    async def acquire(self, lane: str, key: Optional[Hashable] = None) -> bool:
+        """
+        Wait for a processing slot.
+
+        Returns:
+            True if the update may be processed, False if it was merged or shed
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        if self._free_slots > 0 and not self._high and (lane == HIGH_LANE or not self._low):
+            self._free_slots -= 1
+            self.queue_time[lane].observe(0.0)
+            return True
+
+        waiter = _Waiter(loop.create_future(), now)
+        if lane == HIGH_LANE:
+            self._high.append(waiter)
+        else:
+            over_budget = self._low_lane_latency(now) > self.low_latency_budget
+            if key is None:
+                key = object()
+
+            previous = self._low.get(key)
+            if previous is not None and over_budget:
+                # Keep the queue position of the older edit but process the newer one
+                previous.future.set_result(False)
+                waiter.enqueued = previous.enqueued
+                self._low[key] = waiter
+                self.merged += 1
+            else:
+                if previous is not None:
+                    # Not overloaded: keep both positions, the older one goes first
+                    key = (key, id(waiter))
+                if over_budget and len(self._low) >= self.low_max_pending:
+                    _, oldest = self._low.popitem(last=False)
+                    if not oldest.future.done():
+                        oldest.future.set_result(False)
+                    self.shed += 1
+                self._low[key] = waiter
+
+        try:
+            granted = await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.result():
+                self.release()
+            else:
+                self._forget(waiter)
+            raise
+
+        if granted:
+            self.queue_time[lane].observe(loop.time() - waiter.enqueued)
+        return granted
+
+    def _forget(self, waiter: _Waiter) -> None:
+        try:
+            self._high.remove(waiter)
+            return
+        except ValueError:
+            pass
+        for key, queued in self._low.items():
+            if queued is waiter:
+                del self._low[key]
+                return
+
+    def release(self) -> None:
+        """Free a processing slot and hand it to the next waiting update."""
+        self._free_slots += 1
+        while self._free_slots > 0:
+            if self._high:
+                waiter = self._high.popleft()
+            elif self._low:
+                _, waiter = self._low.popitem(last=False)
+            else:
+                return
+            if waiter.future.done():
+                continue
+            self._free_slots -= 1
+            waiter.future.set_result(True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of per-lane queue time percentiles, depths and admission counters."""
+        return {
+            "queue_time": {
+                lane: recorder.percentiles() for lane, recorder in self.queue_time.items()
+            },
+            "depth": self.depth,
+            "merged": self.merged,
+            "shed": self.shed,
+        }
+
+    async def report_periodically(self, interval: float = 60.0) -> None:
+        """Log lane statistics every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("Update lanes: %s", self.stats())
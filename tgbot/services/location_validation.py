@@ -1,12 +1,15 @@
+import logging
 from datetime import datetime, timezone
 
+logger = logging.getLogger(__name__)
+
 
 async def validate_driver_location(message, telegram_id, api_client):
     """
     Validate if driver's live location is active and fresh.
     """
     latest_location = await api_client.get_latest_location(telegram_id)
-    print("Latest location:", latest_location)
+    logger.debug("Latest location: %s", latest_location)
     if not latest_location:
         await message.answer(
             "❗️ Joylashuv topilmadi. Iltimos, 📎 Clip tugmasi orqali jonli joylashuv yuboring."
@@ -0,0 +1,147 @@
+"""
+Non-blocking logging.
+
+Loggers hand their records to a queue and return; a listener thread formats them and
+writes them out, as JSON lines or colorized text. Records are queued as they are, so the
+message is only %-formatted in the listener, and only if the record is written - log with
+arguments (`logger.info("lat=%s", lat)`), not f-strings, to get that.
+
+High-frequency messages are rate limited before they reach the queue: a `RateLimitFilter`
+lets through a few records per second of the messages starting with a prefix, such as
+"[TRACKING]", and reports how many it dropped with the next one it lets through.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import betterlogging as bl
+
+# Attributes every LogRecord has; anything else was passed with `extra` and is logged too
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "suppressed"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "at": f"{record.filename}:{record.lineno}",
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(bl.ColorizedFormatter):
+    """The colorized text of betterlogging, noting how many records the rate limit dropped."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (+{suppressed} similar suppressed)"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `rate` records per second, with bursts of `burst`, of the
+    messages below `max_level` whose template starts with `prefix`. Others pass untouched.
+    """
+
+    def __init__(
+        self, prefix: str, rate: float, burst: int = 5, max_level: int = logging.WARNING
+    ):
+        super().__init__()
+        self.prefix = prefix
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self.suppressed = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.max_level:
+            return True
+        message = record.msg
+        if not isinstance(message, str) or not message.startswith(self.prefix):
+            return True
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            self.suppressed += 1
+            return False
+        self._tokens -= 1
+        if self.suppressed:
+            record.suppressed = self.suppressed
+            self.suppressed = 0
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records without formatting them first, unlike QueueHandler, which formats
+    in the logging thread so records can be pickled. The listener runs in this process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_queue_logging(
+    level: int = logging.INFO,
+    json_output: bool = False,
+    tracking_rate: Optional[float] = 1.0,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """
+    Route the records of the root logger through a queue to a listener thread writing to
+    `stream` (stderr by default). [TRACKING] messages below WARNING are limited to
+    `tracking_rate` per second, unless it is None.
+
+    Returns the started listener; stop it when the bot exits to write what is left.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    if tracking_rate is not None:
+        queue_handler.addFilter(RateLimitFilter("[TRACKING]", tracking_rate))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,113 @@
+"""
+Event loop lag monitor.
+
+A task sleeps for a fixed tick and measures how late it wakes up: that lateness is the
+time every other coroutine waited behind synchronous work. A watchdog thread checks that
+the ticks keep coming; when the loop has not ticked for `slow_threshold` seconds, it
+captures the stack of the loop's thread while the blocking call is still running and logs
+it, once per stall.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from tgbot.services import metrics
+from tgbot.services.metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+lag_seconds = metrics.histogram(
+    "bot_loop_lag_seconds",
+    "How late the event loop ran a tick scheduled on time",
+    buckets=LAG_BUCKETS,
+)
+lag_percentile = metrics.gauge(
+    "bot_loop_lag_percentile_seconds",
+    "Event loop lag over the recent ticks, per percentile",
+    ("percentile",),
+)
+stalls_total = metrics.counter(
+    "bot_loop_stalls_total", "Times the event loop was blocked longer than the slow threshold"
+)
+
+
+class LoopMonitor:
+    """
+    Measures the event loop lag every `interval` seconds and reports the stack of
+    callbacks that block the loop for `slow_threshold` seconds or more.
+    """
+
+    def __init__(self, interval: float = 0.1, slow_threshold: float = 0.25, window: int = 600):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.lag = LatencyRecorder(window)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        metrics.collector(self._collect)
+
+    def _collect(self) -> None:
+        for point, value in self.lag.percentiles((50, 90, 99)).items():
+            lag_percentile.labels(point).set(value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{point: round(value, 4) for point, value in self.lag.percentiles().items()},
+            "max": round(self.max_lag, 4),
+            "stalls": self.stalls,
+        }
+
+    async def run(self) -> None:
+        """Tick until cancelled, watched by the watchdog thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._heartbeat = now
+                lag = max(now - expected, 0.0)
+                self.lag.observe(lag)
+                lag_seconds.observe(lag)
+                if lag > self.max_lag:
+                    self.max_lag = lag
+        finally:
+            self._stopped.set()
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            # The tick itself may be late by up to one interval without anything being wrong
+            if blocked < self.slow_threshold + self.interval or reported == heartbeat:
+                continue
+            reported = heartbeat
+            self.stalls += 1
+            stalls_total.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "unavailable"
+            logger.warning(
+                "Event loop blocked for %.3fs so far, in:\n%s", blocked - self.interval, stack
+            )
+
+    async def report_periodically(self, interval: float = 60.0) -> None:
+        """Log the lag percentiles every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("Event loop lag: %s", self.stats())
+            self.max_lag = 0.0
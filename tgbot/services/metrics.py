@@ -0,0 +1,314 @@
+"""
+Per-process metrics and their Prometheus text exposition.
+
+Metrics are plain attributes updated from the event loop, so recording one is an
+attribute increment with no locking. Each bot process periodically writes a snapshot of
+its metrics to its own file in a shared directory, named by host and pid, since processes
+in separate containers sharing the directory all tend to be pid 1. The API process
+merges the snapshots of all live processes when `/metrics` is scraped, and deletes the
+ones of processes that stopped writing.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import socket
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Monotonically increasing per-process counter."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.value = 0
+        self._children: Dict[Tuple[str, ...], "Counter"] = {}
+
+    def labels(self, *values: Any) -> "Counter":
+        """The counter for the given label values, in the order of `labelnames`."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = type(self)(self.name)
+        return child
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+    def _value(self) -> Any:
+        return self.value
+
+    def samples(self) -> List[Tuple[List[str], Any]]:
+        if not self.labelnames:
+            return [([], self._value())]
+        return [(list(key), child._value()) for key, child in self._children.items()]
+
+
+class Gauge(Counter):
+    """Per-process value that goes up and down, such as a queue depth."""
+
+    type = "gauge"
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: int = 1) -> None:
+        self.value -= amount
+
+
+class Histogram(Counter):
+    """Per-process distribution of observed values, such as latencies in seconds."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Observations per bucket, the last one is +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def labels(self, *values: Any) -> "Histogram":
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = Histogram(self.name, buckets=self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def _value(self) -> Any:
+        return {"counts": list(self.counts), "sum": self.sum}
+
+
+REGISTRY: Dict[str, Counter] = {}
+# Called before every snapshot, to set gauges that are read from other objects
+COLLECTORS: List[Callable[[], None]] = []
+
+
+def _get_or_create(cls, name: str, documentation: str, **kwargs: Any):
+    if name not in REGISTRY:
+        REGISTRY[name] = cls(name, documentation, **kwargs)
+    return REGISTRY[name]
+
+
+def counter(name: str, documentation: str = "", labelnames: Sequence[str] = ()) -> Counter:
+    """
+    Return the process-wide counter with the given name, creating it on first use.
+    """
+    return _get_or_create(Counter, name, documentation, labelnames=labelnames)
+
+
+def gauge(name: str, documentation: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+    """
+    Return the process-wide gauge with the given name, creating it on first use.
+    """
+    return _get_or_create(Gauge, name, documentation, labelnames=labelnames)
+
+
+def histogram(
+    name: str,
+    documentation: str = "",
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    """
+    Return the process-wide histogram with the given name, creating it on first use.
+    """
+    return _get_or_create(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+
+
+def collector(callback: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback that updates gauges right before each snapshot."""
+    COLLECTORS.append(callback)
+    return callback
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """All metrics of this process as JSON-serializable data."""
+    for callback in COLLECTORS:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Metrics collector %r failed", callback)
+
+    families = {}
+    for name, metric in REGISTRY.items():
+        family = {
+            "type": metric.type,
+            "help": metric.documentation,
+            "labelnames": list(metric.labelnames),
+            "samples": metric.samples(),
+        }
+        if isinstance(metric, Histogram):
+            family["buckets"] = list(metric.buckets)
+        families[name] = family
+    return families
+
+
+def snapshot_name() -> str:
+    """Name of this process's snapshot file, e.g. bot-7f3a9c-1.json."""
+    host = re.sub(r"[^\w.-]", "_", socket.gethostname()) or "host"
+    return f"{host}-{os.getpid()}.json"
+
+
+def write_snapshot(directory: str) -> str:
+    """Write this process's snapshot to `directory`, atomically replacing its last one."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, snapshot_name())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(snapshot(), file)
+    os.replace(temporary, path)
+    return path
+
+
+async def publish_periodically(directory: str, interval: float = 10.0) -> None:
+    """Write a snapshot every `interval` seconds, and a last one when cancelled."""
+    try:
+        while True:
+            try:
+                write_snapshot(directory)
+            except OSError:
+                logger.exception("Could not write the metrics snapshot")
+            await asyncio.sleep(interval)
+    finally:
+        try:
+            write_snapshot(directory)
+        except OSError:
+            logger.exception("Could not write the final metrics snapshot")
+
+
+def read_snapshots(directory: str, stale_after: float = 60.0) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Snapshots of the processes that wrote to `directory` in the last `stale_after` seconds.
+    Older files, left by processes that are gone, are deleted.
+    """
+    snapshots = []
+    now = time.time()
+    for path in glob.glob(os.path.join(directory, "*.json*")):
+        try:
+            if now - os.path.getmtime(path) > stale_after:
+                os.remove(path)
+                continue
+            if not path.endswith(".json"):
+                continue
+            with open(path) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            # Written or removed while we were reading it
+            continue
+    return snapshots
+
+
+def merge(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Sum the samples of several processes, label set by label set."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for families in snapshots:
+        for name, family in families.items():
+            target = merged.setdefault(name, {**family, "samples": {}})
+            for labels, value in family["samples"]:
+                key = tuple(labels)
+                if family["type"] != "histogram":
+                    target["samples"][key] = target["samples"].get(key, 0) + value
+                    continue
+                current = target["samples"].get(key)
+                if current is None or len(current["counts"]) != len(value["counts"]):
+                    target["samples"][key] = {"counts": list(value["counts"]), "sum": value["sum"]}
+                else:
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render(families: Dict[str, Dict[str, Any]]) -> str:
+    """Merged families in the Prometheus text exposition format."""
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        names = family["labelnames"]
+        lines.append(f"# HELP {name} {_escape(family['help'])}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for key, value in sorted(family["samples"].items()):
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {value}")
+                continue
+            cumulative = 0
+            bounds = [str(bound) for bound in family["buckets"]] + ["+Inf"]
+            for bound, count in zip(bounds, value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, key, ('le', bound))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {value['sum']}")
+            lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition(directory: str, stale_after: float = 60.0) -> str:
+    """Metrics of every live bot process publishing to `directory`, ready to be scraped."""
+    return render(merge(read_snapshots(directory, stale_after)))
+
+
+class LatencyRecorder:
+    """
+    Keeps a sliding window of the most recent latency samples (in seconds)
+    and reports percentiles over it.
+    """
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, points: Iterable[int] = (50, 90, 99)) -> Dict[str, float]:
+        """
+        Return the requested percentiles of the current window, e.g. {"p50": 0.012}.
+        """
+        samples = sorted(self._samples)
+        if not samples:
+            return {f"p{point}": 0.0 for point in points}
+
+        last = len(samples) - 1
+        return {
+            f"p{point}": samples[min(last, round(last * point / 100))]
+            for point in points
+        }
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from tgbot.services import tracing
+from tgbot.services.metrics import LatencyRecorder, counter, histogram
+from tgbot.services.rate_limit import KeyedTokenBuckets, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Bot API methods that count towards Telegram's message limits
+LIMITED_PREFIXES = ("send", "copy", "forward", "edit")
+# Edits where only the latest one for a message matters
+MERGEABLE_METHODS = frozenset(
+    {"editMessageText", "editMessageCaption", "editMessageReplyMarkup", "editMessageLiveLocation"}
+)
+
+edits_merged = counter(
+    "bot_outbox_edits_merged_total", "Message edits superseded by a later edit before being sent"
+)
+retry_after_total = counter(
+    "bot_outbox_retry_after_total", "Bot API calls retried after a flood wait"
+)
+request_seconds = histogram(
+    "bot_telegram_request_seconds", "Bot API request time, per method", ("method",)
+)
+
+
+class _PendingEdit:
+    __slots__ = ("method", "dispatched", "task")
+
+    def __init__(self, method: TelegramMethod):
+        self.method = method
+        self.dispatched = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class Outbox(BaseRequestMiddleware):
+    """
+    Schedules outbound Bot API calls of the whole bot, so handlers don't have to care
+    about flood limits.
+
+    Registered as a request middleware of the bot session, it sees every call made by
+    `message.answer`, `edit_text`, `bot.send_message` and so on. Messages and edits wait
+    for a token of the global bucket and of their chat (groups get a lower rate), a flood
+    wait from Telegram pauses all chats and the call is retried, and an edit of a message
+    that is still waiting to be sent is replaced by the newer one - both callers get the
+    result of the edit that was actually sent.
+
+    Broadcasts use a session of their own and take only the spare tokens of
+    `global_bucket`, so they never hold up the handlers' replies.
+    """
+
+    def __init__(
+        self,
+        rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        per_chat_burst: float = 3.0,
+        max_retries: int = 3,
+        max_retry_after: float = 60.0,
+    ):
+        self.global_bucket = TokenBucket(rate)
+        self.private_chats = KeyedTokenBuckets(per_chat_rate, per_chat_burst)
+        self.group_chats = KeyedTokenBuckets(group_rate, per_chat_burst)
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.latency: Dict[str, LatencyRecorder] = {}
+        self.queue_time = LatencyRecorder()
+        self.waiting = 0
+        self._edits: Dict[Tuple[Union[int, str], int], _PendingEdit] = {}
+        self._edit_tasks: Set[asyncio.Task] = set()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with tracing.span(f"bot {method.__api_method__}", kind="CLIENT"):
+            return await self._send(make_request, bot, method)
+
+    async def _send(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not method.__api_method__.startswith(LIMITED_PREFIXES):
+            return await self._request(make_request, bot, method)
+
+        message_id = getattr(method, "message_id", None)
+        if method.__api_method__ not in MERGEABLE_METHODS or message_id is None:
+            return await self._request(make_request, bot, method, chat_id)
+
+        # Only the latest pending operation on a message may be replaced, otherwise
+        # the newer edit would overtake an edit of another kind queued in between
+        key = (chat_id, message_id)
+        edit = self._edits.get(key)
+        if edit is not None and not edit.dispatched and type(edit.method) is type(method):
+            edit.method = method
+            edits_merged.inc()
+        else:
+            edit = _PendingEdit(method)
+            self._edits[key] = edit
+            edit.task = asyncio.create_task(self._deliver_edit(make_request, bot, key, edit))
+            self._edit_tasks.add(edit.task)
+            edit.task.add_done_callback(self._edit_tasks.discard)
+        # The edit is delivered even if the handler that asked for it is cancelled
+        return await asyncio.shield(edit.task)
+
+    async def _deliver_edit(self, make_request, bot, key, edit: _PendingEdit):
+        try:
+            await self._throttle(key[0])
+            edit.dispatched = True
+            return await self._request(make_request, bot, edit.method, key[0], throttled=True)
+        finally:
+            if self._edits.get(key) is edit:
+                del self._edits[key]
+
+    async def _throttle(self, chat_id: Union[int, str]) -> None:
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            chats = self.group_chats if isinstance(chat_id, str) or chat_id < 0 else self.private_chats
+            await chats.acquire(chat_id)
+            await self.global_bucket.acquire()
+        finally:
+            self.waiting -= 1
+            self.queue_time.observe(time.monotonic() - started)
+
+    async def _request(self, make_request, bot, method, chat_id=None, throttled=False):
+        name = method.__api_method__
+        latency = self.latency.get(name)
+        if latency is None:
+            latency = self.latency[name] = LatencyRecorder()
+        exported = request_seconds.labels(name)
+
+        attempt = 0
+        while True:
+            if chat_id is not None and not throttled:
+                await self._throttle(chat_id)
+            throttled = False
+
+            started = time.monotonic()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries or e.retry_after > self.max_retry_after:
+                    raise
+                retry_after_total.inc()
+                logger.warning(
+                    "Flood wait of %ds on %s (chat %s), retry %d/%d",
+                    e.retry_after,
+                    name,
+                    chat_id,
+                    attempt,
+                    self.max_retries,
+                )
+                if chat_id is not None:
+                    # Every limited call waits for the global bucket, so this holds them all
+                    self.global_bucket.pause(e.retry_after)
+                else:
+                    await asyncio.sleep(e.retry_after)
+            finally:
+                elapsed = time.monotonic() - started
+                latency.observe(elapsed)
+                exported.observe(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of per-method latency percentiles, queue time and counters."""
+        return {
+            "latency": {
+                name: {"count": recorder.count, **recorder.percentiles()}
+                for name, recorder in self.latency.items()
+            },
+            "queue_time": self.queue_time.percentiles(),
+            "waiting": self.waiting,
+            "edits_merged": edits_merged.value,
+            "retry_after": retry_after_total.value,
+        }
+
+    async def report_periodically(self, interval: float = 60.0) -> None:
+        """Log outbox statistics every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("Outbox: %s", self.stats())
+
+    async def flush(self) -> Dict[str, Any]:
+        """
+        Wait for the edits that are still queued, to be run when the bot shuts down.
+
+        Returns:
+            Final statistics of the outbox
+        """
+        if self._edit_tasks:
+            await asyncio.wait(set(self._edit_tasks))
+        return self.stats()
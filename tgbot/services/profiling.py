@@ -0,0 +1,147 @@
+"""
+On-demand profiling of the running bot.
+
+`sample_stacks` samples the stack of the event loop thread from another thread and
+returns it in the folded format of flamegraph.pl and speedscope, one "frame;frame;frame
+count" line per distinct stack. `allocation_diff` compares two tracemalloc snapshots taken
+some seconds apart and returns the allocators that grew the most. Only one profile runs
+at a time.
+
+Profiles take long, so handlers run them with `start`, in a task of their own: the
+update is done at once, and doesn't hold a processing slot or delay a graceful stop.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Coroutine, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MAX_SECONDS = 300
+
+_running = asyncio.Lock()
+_tasks: Set[asyncio.Task] = set()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is running."""
+
+
+def _done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Profile failed", exc_info=task.exception())
+
+
+def start(job: Coroutine) -> asyncio.Task:
+    """
+    Run `job`, a coroutine that takes a profile and delivers it, in the background.
+    Raises ProfilerBusy, without running it, if a profile is already running.
+    """
+    if _tasks or _running.locked():
+        job.close()
+        raise ProfilerBusy("A profile is already running")
+    # A fresh context, so the job is not traced or accounted as part of the update
+    task = asyncio.create_task(job, context=contextvars.Context())
+    _tasks.add(task)
+    task.add_done_callback(_done)
+    return task
+
+
+async def cancel() -> int:
+    """Cancel the running profiles, to be run when the bot shuts down. Returns how many."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks)
+    return len(tasks)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    # The package and the file, e.g. handlers/route.py or aiogram/dispatcher.py
+    short = "/".join(code.co_filename.replace("\\", "/").rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+def _fold(frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample(thread_id: int, seconds: float, interval: float) -> Counter:
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[_fold(frame)] += 1
+        del frame
+        time.sleep(interval)
+    return stacks
+
+
+async def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample the event loop thread every `interval` seconds for `seconds` seconds.
+    Returns the folded stacks, most frequent first.
+    """
+    if _running.locked():
+        raise ProfilerBusy("A profile is already running")
+    async with _running:
+        seconds = min(seconds, MAX_SECONDS)
+        stacks = await asyncio.to_thread(_sample, threading.get_ident(), seconds, interval)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def allocation_diff(seconds: float, top: int = 30, frames: int = 10) -> str:
+    """
+    Snapshot the traced allocations, wait `seconds` seconds and snapshot them again.
+    Returns the `top` allocation sites that grew the most, with the stacks of the first ones.
+    """
+    if _running.locked():
+        raise ProfilerBusy("A profile is already running")
+    async with _running:
+        seconds = min(seconds, MAX_SECONDS)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    # tracemalloc's own allocations are not the bot's
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    before, after = before.filter_traces(ignored), after.filter_traces(ignored)
+    lines = [
+        f"Allocations over {seconds:g}s (pid {os.getpid()}), top {top} by growth",
+        "",
+    ]
+    by_line = after.compare_to(before, "lineno")[:top]
+    lines.extend(str(stat) for stat in by_line)
+
+    lines += ["", "Stacks of the top allocators", ""]
+    for stat in after.compare_to(before, "traceback")[:5]:
+        lines.append(
+            f"{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} blocks, "
+            f"{stat.size / 1024:.1f} KiB now"
+        )
+        lines.extend(f"    {line}" for line in stat.traceback.format(most_recent_first=True))
+        lines.append("")
+    return "\n".join(lines) + "\n"
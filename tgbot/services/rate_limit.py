@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket limiting how often something may happen, e.g. sends per second.
+
+    `pause` stops handing out tokens for a while, which is how a flood wait
+    from Telegram is applied to everyone using the bucket at once.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right away and nobody is waiting for one."""
+        now = time.monotonic()
+        if self._lock.locked() or now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it. Waiters are served in order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class KeyedTokenBuckets:
+    """
+    One token bucket per key (e.g. per chat), without a lock or task per key.
+
+    A caller reserves its token right away, possibly taking the bucket below zero,
+    and sleeps until the reservation is covered. Full buckets are forgotten once
+    there are more than `max_keys` of them.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, max_keys: int = 10_000):
+        self.rate = rate
+        self.capacity = capacity or 1.0
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def reserve(self, key: Hashable) -> float:
+        """
+        Take a token for the key.
+
+        Returns:
+            How many seconds to wait before the token may be used
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate) - 1
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    async def acquire(self, key: Hashable) -> None:
+        delay = self.reserve(key)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _prune(self, now: float) -> None:
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.capacity:
+                del self._buckets[key]
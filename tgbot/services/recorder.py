@@ -0,0 +1,188 @@
+"""
+Recording of incoming updates, to replay production load shapes later.
+
+Every update is appended to a gzip-compressed JSONL log with the time it arrived,
+relative to the start of the recording, and how long it took to process. Unless told
+otherwise, updates are scrubbed of personal data first:
+
+- user and chat ids become pseudonyms, stable within the recording, so a user's updates
+  still belong together;
+- names, usernames, phone numbers, addresses, links, file names and free text are
+  masked character by character, letters to x and digits to 0, keeping their shape;
+  reply button labels and commands are kept, so the replay takes the same paths;
+- coordinates are rounded to 2 decimals, about a kilometre.
+
+Every start of the bot records to a file of its own, named after the configured path
+with the start time added, since `t` and the pseudonyms only hold within one run.
+`benchmarks/replay.py` feeds a recording back into the dispatcher.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Objects whose "id" is a user's or a chat's
+_ID_OWNERS = frozenset({"from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat"})
+_NAME_FIELDS = frozenset({"first_name", "last_name", "username", "title"})
+_TEXT_FIELDS = frozenset(
+    {"text", "caption", "vcard", "bio", "email", "query", "address", "url", "file_name"}
+)
+_COORDINATES = frozenset({"latitude", "longitude"})
+
+
+def mask(text: str) -> str:
+    """Letters become x or X, digits 0; everything else is kept."""
+    return "".join(
+        ("X" if char.isupper() else "x") if char.isalpha() else "0" if char.isdigit() else char
+        for char in text
+    )
+
+
+class Scrubber:
+    """Removes personal data from raw updates, see the module docstring."""
+
+    def __init__(self, keep_texts: FrozenSet[str] = frozenset(), salt: Optional[bytes] = None):
+        self.keep_texts = keep_texts
+        # A fresh salt per recording, so pseudonyms can't be matched across recordings
+        self.salt = salt if salt is not None else os.urandom(16)
+
+    def pseudonym(self, value: int) -> int:
+        digest = hashlib.blake2b(str(abs(value)).encode(), key=self.salt, digest_size=8).digest()
+        # Positive ids fit the range of Telegram user ids, chats keep their sign
+        pseudonym = 1_000_000_000 + int.from_bytes(digest, "big") % 1_000_000_000
+        return -pseudonym if value < 0 else pseudonym
+
+    def text(self, value: str) -> str:
+        if value in self.keep_texts or value.startswith("/"):
+            return value
+        return mask(value)
+
+    @staticmethod
+    def phone(value: str) -> str:
+        # The country code is kept, so numbers still look like the real ones
+        prefix = value[: 4 if value.startswith("+") else 3]
+        return prefix + mask(value[len(prefix):])
+
+    def scrub(self, value: Any, key: Optional[str] = None, owner: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            return {name: self.scrub(item, name, key) for name, item in value.items()}
+        if isinstance(value, list):
+            return [self.scrub(item, key, owner) for item in value]
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and (key == "user_id" or (key == "id" and owner in _ID_OWNERS)):
+            return self.pseudonym(value)
+        if isinstance(value, float) and key in _COORDINATES:
+            return round(value, 2)
+        if isinstance(value, str):
+            if key == "phone_number":
+                return self.phone(value)
+            if key in _NAME_FIELDS:
+                return mask(value)
+            if key in _TEXT_FIELDS:
+                return self.text(value)
+        return value
+
+
+def run_path(path: str, started: Optional[datetime] = None) -> str:
+    """
+    Recording file of a run started at `started`, now by default: the start time in UTC
+    is put before the extensions, recordings/updates.jsonl.gz becoming
+    recordings/updates-20250102T090000Z.jsonl.gz.
+    """
+    started = started or datetime.now(timezone.utc)
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    stamped = f"{stem}-{started.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}{dot}{extensions}"
+    return os.path.join(directory, stamped)
+
+
+class UpdateRecorder:
+    """
+    Appends updates to a gzip JSONL log, as {"t", "ms", "update"} lines: seconds since the
+    recording started when the update arrived, milliseconds it took and the raw update.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        scrubber: Optional[Scrubber] = None,
+        max_pending: int = 10000,
+    ):
+        self.path = path
+        self.scrubber = scrubber
+        self.max_pending = max_pending
+        self.recorded = 0
+        self.dropped = 0
+        self.started = time.monotonic()
+        self._pending: List[str] = []
+
+    def record(self, update: Dict[str, Any], arrived: float, duration: float) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        if self.scrubber is not None:
+            update = self.scrubber.scrub(update)
+        entry = {
+            "t": round(arrived - self.started, 4),
+            "ms": round(duration * 1000, 2),
+            "update": update,
+        }
+        self._pending.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+    def _write(self, lines: List[str]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Every flush adds a gzip member; readers decompress them one after another
+        with gzip.open(self.path, "at", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def flush(self) -> int:
+        """Append the updates recorded so far. Returns how many were written."""
+        lines, self._pending = self._pending, []
+        if not lines:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, lines)
+        except OSError:
+            logger.exception("Could not write %d recorded updates to %s", len(lines), self.path)
+        return len(lines)
+
+    async def write_periodically(self, interval: float = 10.0) -> None:
+        """Append the recorded updates every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self) -> Dict[str, Any]:
+        """Write what is left, to be run when the bot shuts down."""
+        await self.flush()
+        return {"recorded": self.recorded, "dropped": self.dropped}
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Entries of a recording in the order they were written. A recording cut off when the
+    bot was killed mid-write ends at its last complete line.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        try:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut off at the end of a gzip member
+                    continue
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            logger.warning("Recording %s is truncated or damaged, read up to the damage", path)
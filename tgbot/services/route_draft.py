@@ -0,0 +1,88 @@
+from typing import Optional
+
+from tgbot.services.i18n import catalog
+from tgbot.storage.codec import register
+from tgbot.storage.drafts import StateDraft
+
+# Summary lines in display order
+SUMMARY_LINES = ("truck", "terminal", "eta", "container", "size", "type")
+
+
+@register
+class RouteDraft(StateDraft):
+    """
+    Route a driver is creating, kept in the FSM data under "route".
+
+    Every step loads the draft once, sets its own field and saves once; the summary is
+    rendered from the fields with the compiled translations.
+
+    Terminals are not copied into the draft: the choice is resolved against the shared
+    TerminalCatalog, and only the chosen id and name are stored.
+    """
+
+    FIELDS = (
+        "language",
+        "truck_number",
+        "terminal_id",
+        "terminal_name",
+        "eta_date",
+        "eta_hour",
+        "container_name",
+        "container_size",
+        "container_type",
+    )
+    __slots__ = FIELDS
+
+    TAG = 1
+    STATE_KEY = "route"
+
+    def __init__(
+        self,
+        language: str = "uz",
+        truck_number: str = "",
+        terminal_id: Optional[int] = None,
+        terminal_name: str = "",
+        eta_date: str = "",
+        eta_hour: str = "",
+        container_name: str = "",
+        container_size: str = "",
+        container_type: str = "",
+    ):
+        self.language = language
+        self.truck_number = truck_number
+        self.terminal_id = terminal_id
+        self.terminal_name = terminal_name
+        self.eta_date = eta_date
+        self.eta_hour = eta_hour
+        self.container_name = container_name
+        self.container_size = container_size
+        self.container_type = container_type
+
+    @property
+    def eta(self) -> str:
+        return f"{self.eta_date} {self.eta_hour}:00"
+
+    def _render(self, line: str) -> Optional[str]:
+        label = catalog.text(self.language, "route", line)
+        if line == "truck" and self.truck_number:
+            return f"{label} {self.truck_number}"
+        if line == "terminal" and self.terminal_name:
+            return f"{label} {self.terminal_name}"
+        if line == "eta" and self.eta_date and self.eta_hour:
+            return f"{label} {self.eta}"
+        if line == "container" and self.container_name:
+            return f"{label} {self.container_name}"
+        if line == "size" and self.container_size:
+            return f"{label} {self.container_size} ft"
+        if line == "type" and self.container_type:
+            return f"{label} {self.container_type}"
+        return None
+
+    def summary(self) -> str:
+        """Summary of the fields set so far, in the draft's language."""
+        lines = [catalog.text(self.language, "route", "summary")]
+        for line in SUMMARY_LINES:
+            rendered = self._render(line)
+            if rendered:
+                lines.append(rendered)
+        return "\n".join(lines)
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiogram import Dispatcher
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShutdownReport:
+    """
+    What happened to the work that was still going on when the bot was stopped.
+
+    Attributes:
+        drained: Updates that finished within the deadline
+        dropped: Updates cancelled at the deadline, by update type
+        flushed: Result of every flush hook, by name
+        failed_flushes: Flush hooks that raised or timed out
+        duration: Seconds spent on shutting down
+    """
+
+    drained: int = 0
+    dropped: Dict[str, int] = field(default_factory=dict)
+    flushed: Dict[str, Any] = field(default_factory=dict)
+    failed_flushes: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+
+class ShutdownCoordinator:
+    """
+    Drains in-flight updates and flushes buffers when polling stops.
+
+    Every update is tracked from the moment it enters the dispatcher (see
+    ShutdownMiddleware). Once polling has stopped taking new updates, the coordinator
+    waits up to `drain_timeout` seconds for the tracked ones, cancels whatever is left,
+    then runs the registered flush hooks with the remaining `flush_timeout`.
+    """
+
+    def __init__(self, drain_timeout: float = 8.0, flush_timeout: float = 5.0):
+        self.drain_timeout = drain_timeout
+        self.flush_timeout = flush_timeout
+        self.report = None
+        self._in_flight: Dict[asyncio.Task, str] = {}
+        self._flushes: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def track(self, task: asyncio.Task, update_type: str) -> None:
+        self._in_flight[task] = update_type
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._in_flight.pop(task, None)
+
+    def register_flush(self, name: str, callback: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Register a coroutine function to run after in-flight updates are drained.
+        Its return value ends up in the shutdown report.
+        """
+        self._flushes.append((name, callback))
+
+    def attach(self, dp: Dispatcher) -> None:
+        """
+        Run the shutdown sequence as the first dispatcher shutdown handler,
+        before the FSM storage and the bot session are closed.
+        """
+        dp.shutdown.register(self.shutdown)
+        dp.shutdown.handlers.insert(0, dp.shutdown.handlers.pop())
+
+    async def _drain(self, report: ShutdownReport) -> None:
+        deadline = time.monotonic() + self.drain_timeout
+        # Let the update tasks created by the last polling round start and get tracked
+        await asyncio.sleep(0)
+
+        while self._in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            pending = set(self._in_flight)
+            done, _ = await asyncio.wait(pending, timeout=remaining)
+            report.drained += len(done)
+
+        dropped = Counter(self._in_flight.values())
+        for task in list(self._in_flight):
+            task.cancel()
+        if self._in_flight:
+            await asyncio.wait(set(self._in_flight), timeout=1)
+        report.dropped = dict(dropped)
+
+    async def _flush(self, report: ShutdownReport) -> None:
+        for name, callback in self._flushes:
+            try:
+                report.flushed[name] = await asyncio.wait_for(callback(), self.flush_timeout)
+            except Exception:
+                logger.exception("Shutdown flush %r failed", name)
+                report.failed_flushes.append(name)
+
+    async def shutdown(self) -> ShutdownReport:
+        """Drain in-flight updates, run the flush hooks and log what was dropped."""
+        started = time.monotonic()
+        report = ShutdownReport()
+        logger.info("Shutting down: %d updates in flight", self.in_flight)
+
+        await self._drain(report)
+        await self._flush(report)
+
+        report.duration = time.monotonic() - started
+        self.report = report
+        log = logger.warning if report.dropped or report.failed_flushes else logger.info
+        log(
+            "Shutdown finished in %.1fs: %d drained, dropped %s, flushed %s, failed flushes %s",
+            report.duration,
+            report.drained,
+            report.dropped or "nothing",
+            report.flushed,
+            report.failed_flushes or "none",
+        )
+        return report
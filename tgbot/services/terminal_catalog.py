@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from tgbot.services.metrics import counter
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+renders_total = counter("bot_terminal_renders_total", "Terminal texts and keyboards rendered")
+render_hits_total = counter(
+    "bot_terminal_render_hits_total", "Terminal texts and keyboards served from the render cache"
+)
+
+
+def fingerprint(data: Any) -> str:
+    """Short hash of JSON data, changes whenever the data does."""
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class TerminalCatalog:
+    """
+    Terminals fetched from the API, cached for `ttl` seconds.
+
+    The API answers with the terminals the given driver may see, so the list and the
+    details are cached per driver and never handed to anybody else. What is shared is
+    the data itself: every list and terminal has a version, the fingerprint of its data,
+    drivers who were sent equal data hold the same copy of it, and rendered texts and
+    keyboards are cached per (terminal, version, language) with `render`. They are built
+    once for all drivers who see the same data, and dropped once nobody does anymore.
+    """
+
+    def __init__(self, api_client, ttl: float = 300.0):
+        self.api_client = api_client
+        self.ttl = ttl
+        # telegram id -> (fetched at, version of the list)
+        self._lists: Dict[int, Tuple[float, str]] = {}
+        # (telegram id, terminal id) -> (fetched at, version of the terminal)
+        self._details: Dict[Tuple[int, int], Tuple[float, str]] = {}
+        # version -> the list or terminal with that fingerprint
+        self._data: Dict[str, Any] = {}
+        # version of a list -> {terminal name: id}, for callbacks that carry the name
+        self._ids: Dict[str, Dict[str, int]] = {}
+        # (terminal id, None for the list; version) -> {(name, language): rendered}
+        self._renders: Dict[Tuple[Optional[int], str], Dict[Tuple[str, str], Any]] = {}
+        self._swept_at = time.monotonic()
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.monotonic() - fetched_at < self.ttl
+
+    def _share(self, data: Any) -> str:
+        version = fingerprint(data)
+        self._data.setdefault(version, data)
+        return version
+
+    def _sweep(self) -> None:
+        """Forget what no driver has fetched for `ttl` seconds, at most once per `ttl`."""
+        if self._fresh(self._swept_at):
+            return
+        self._swept_at = time.monotonic()
+        for entries in (self._lists, self._details):
+            stale = [key for key, (fetched_at, _) in entries.items() if not self._fresh(fetched_at)]
+            for key in stale:
+                del entries[key]
+
+        used = {version for _, version in self._lists.values()}
+        used.update(version for _, version in self._details.values())
+        for version in set(self._data) - used:
+            del self._data[version]
+            self._ids.pop(version, None)
+        for key in [key for key in self._renders if key[1] not in used]:
+            del self._renders[key]
+
+    async def terminals(self, telegram_id: int) -> List[Dict[str, Any]]:
+        """
+        Terminals the given driver may see, fetched with their credentials when stale.
+        """
+        cached = self._lists.get(telegram_id)
+        if cached is not None and self._fresh(cached[0]):
+            return self._data[cached[1]]
+
+        try:
+            terminals = await self.api_client.get_terminals(telegram_id=telegram_id)
+        except Exception:
+            if cached is None:
+                raise
+            logger.exception("Could not refresh terminals, using the cached list")
+            return self._data[cached[1]]
+
+        if not terminals:
+            return terminals
+        self._sweep()
+        version = self._share(terminals)
+        self._ids.setdefault(version, {terminal["name"]: terminal["id"] for terminal in terminals})
+        self._lists[telegram_id] = (time.monotonic(), version)
+        return self._data[version]
+
+    def terminal_id(self, name: str, telegram_id: int) -> Optional[int]:
+        """Id of the terminal with the given name in the list last fetched for the driver."""
+        cached = self._lists.get(telegram_id)
+        if cached is None:
+            return None
+        return self._ids.get(cached[1], {}).get(name)
+
+    async def terminal(self, terminal_id: int, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Details of a terminal, fetched with the given driver's credentials when stale.
+        """
+        key = (telegram_id, terminal_id)
+        cached = self._details.get(key)
+        if cached is not None and self._fresh(cached[0]):
+            return self._data[cached[1]]
+
+        try:
+            terminal = await self.api_client.get_terminal(
+                terminal_id=terminal_id, telegram_id=telegram_id
+            )
+        except Exception:
+            if cached is None:
+                raise
+            logger.exception("Could not refresh terminal %s, using the cached one", terminal_id)
+            return self._data[cached[1]]
+
+        if not terminal:
+            return terminal
+        self._sweep()
+        version = self._share(terminal)
+        self._details[key] = (time.monotonic(), version)
+        return self._data[version]
+
+    def render(
+        self,
+        name: str,
+        language: str,
+        build: Callable[[], T],
+        telegram_id: int,
+        terminal_id: Optional[int] = None,
+    ) -> T:
+        """
+        Return what `build` renders for the list (or for a terminal, if `terminal_id` is
+        given) as last fetched for the driver, building it only once per version and
+        language. The result is shared - don't modify it.
+        """
+        if terminal_id is None:
+            cached = self._lists.get(telegram_id)
+        else:
+            cached = self._details.get((telegram_id, terminal_id))
+        if cached is None:
+            renders_total.inc()
+            return build()
+
+        renders = self._renders.setdefault((terminal_id, cached[1]), {})
+        key = (name, language)
+        if key in renders:
+            render_hits_total.inc()
+            return renders[key]
+
+        renders_total.inc()
+        rendered = renders[key] = build()
+        return rendered
+
+    def invalidate(self) -> None:
+        """Refetch the lists and all terminals on next use."""
+        self._lists.clear()
+        self._details.clear()
+        self._data.clear()
+        self._ids.clear()
+        self._renders.clear()
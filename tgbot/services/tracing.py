@@ -0,0 +1,228 @@
+"""
+Lightweight per-update tracing.
+
+The trace of the update being processed and its innermost open span live in context
+variables, so a span opened anywhere below - a middleware, the handler, an FSM storage
+call, a backend API request - nests under the right parent without being passed around.
+Outside an update, `span` does nothing.
+
+Every update is recorded; when it is done its trace is kept if it was sampled
+(`sample_rate`) or took at least `slow_threshold` seconds, and exported as Zipkin v2 JSON
+to a file (one trace per line) and/or a Zipkin-compatible collector.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "truck2terminal_bot"
+
+
+class Span:
+    __slots__ = ("trace_id", "id", "parent_id", "name", "kind", "timestamp", "duration", "tags")
+
+    def __init__(
+        self, trace_id: str, name: str, parent_id: Optional[str] = None, kind: Optional[str] = None
+    ):
+        self.trace_id = trace_id
+        self.id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.timestamp = time.time()
+        self.duration: Optional[float] = None
+        self.tags: Dict[str, str] = {}
+
+    def tag(self, key: str, value: Any) -> None:
+        self.tags[key] = str(value)
+
+    def finish(self) -> None:
+        self.duration = time.time() - self.timestamp
+
+    def to_zipkin(self, service: str) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "id": self.id,
+            "name": self.name,
+            "timestamp": int(self.timestamp * 1_000_000),
+            "duration": max(int((self.duration or 0.0) * 1_000_000), 1),
+            "localEndpoint": {"serviceName": service},
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        if self.kind:
+            span["kind"] = self.kind
+        if self.tags:
+            span["tags"] = self.tags
+        return span
+
+
+class Trace:
+    __slots__ = ("id", "root", "spans", "finished")
+
+    def __init__(self, root: Span):
+        self.id = root.trace_id
+        self.root = root
+        self.spans: List[Span] = []
+        self.finished = False
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: Optional[str] = None, **tags: Any) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span. Yields None outside of a trace."""
+    trace = _trace.get()
+    if trace is None or trace.finished:
+        yield None
+        return
+
+    parent = _span.get()
+    current = Span(trace.id, name, parent.id if parent else trace.root.id, kind)
+    for key, value in tags.items():
+        current.tag(key, value)
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.tag("error", type(e).__name__)
+        raise
+    finally:
+        current.finish()
+        _span.reset(token)
+        trace.spans.append(current)
+
+
+class FileExporter:
+    """Appends every kept trace to a file, as one JSON array of Zipkin spans per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def export(self, traces: Sequence[List[Dict[str, Any]]]) -> None:
+        lines = [json.dumps(spans, ensure_ascii=False) + "\n" for spans in traces]
+        await asyncio.to_thread(self._write, lines)
+
+    async def close(self) -> None:
+        pass
+
+
+class ZipkinExporter:
+    """Posts kept traces to a Zipkin-compatible collector, e.g. http://zipkin:9411/api/v2/spans."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def export(self, traces: Sequence[List[Dict[str, Any]]]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        spans = [span for trace in traces for span in trace]
+        async with self._session.post(self.url, json=spans) as response:
+            if response.status >= 300:
+                logger.warning("Zipkin collector answered %s", response.status)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class Tracer:
+    """
+    Starts a trace per update and exports the ones worth keeping.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        slow_threshold: float = 2.0,
+        exporters: Sequence[Any] = (),
+        service: str = SERVICE_NAME,
+        max_pending: int = 1000,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.exporters = list(exporters)
+        self.service = service
+        self.max_pending = max_pending
+        self.kept = 0
+        self.dropped = 0
+        self._pending: List[List[Dict[str, Any]]] = []
+
+    @contextmanager
+    def trace(self, name: str, **tags: Any) -> Iterator[Optional[Span]]:
+        """Trace the block as the root of a new trace, unless one is already running."""
+        if not self.exporters or _trace.get() is not None:
+            yield None
+            return
+
+        root = Span(os.urandom(16).hex(), name, kind="SERVER")
+        for key, value in tags.items():
+            root.tag(key, value)
+        trace = Trace(root)
+        trace_token, span_token = _trace.set(trace), _span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.tag("error", type(e).__name__)
+            raise
+        finally:
+            root.finish()
+            # Spans still open in tasks the update started are not recorded anymore
+            trace.finished = True
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+            self._keep(trace)
+
+    def _keep(self, trace: Trace) -> None:
+        sampled = self.sample_rate and random.random() < self.sample_rate
+        if not sampled and trace.root.duration < self.slow_threshold:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.kept += 1
+        spans = [trace.root, *trace.spans]
+        self._pending.append([span.to_zipkin(self.service) for span in spans])
+
+    async def flush(self) -> int:
+        """Export the traces kept so far. Returns how many were exported."""
+        traces, self._pending = self._pending, []
+        if not traces:
+            return 0
+        for exporter in self.exporters:
+            try:
+                await exporter.export(traces)
+            except Exception:
+                logger.exception("Could not export %d traces with %r", len(traces), exporter)
+        return len(traces)
+
+    async def export_periodically(self, interval: float = 5.0) -> None:
+        """Export kept traces every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self) -> Dict[str, Any]:
+        """Export what is left and close the exporters, to be run when the bot shuts down."""
+        await self.flush()
+        for exporter in self.exporters:
+            await exporter.close()
+        return {"kept": self.kept, "dropped": self.dropped}
@@ -0,0 +1,219 @@
+"""
+Compact binary encoding of FSM data.
+
+Values are written as a one byte tag followed by their payload: ints as zigzag varints,
+floats as 8 bytes, strings and bytes with a varint length, lists and dicts with a varint
+count. Drafts - the typed records handlers keep in their FSM data - are written as their
+type tag, version and field values in order, without field names, and trailing fields
+that still have their default value are left out.
+
+A draft type must only ever append fields. When it does, it bumps VERSION and, if old
+values need more than the new defaults, overrides `upgrade`.
+"""
+
+import struct
+from typing import Any, Dict, Sequence, Tuple, Type, TypeVar
+
+NONE, FALSE, TRUE, INT, FLOAT, STR, BYTES, LIST, DICT, DRAFT = range(10)
+
+_float = struct.Struct("<d")
+
+D = TypeVar("D", bound="Draft")
+
+
+class CodecError(ValueError):
+    """Data that can't be encoded, or bytes that aren't a valid encoding."""
+
+
+class Draft:
+    """
+    Base of the typed records kept in FSM data.
+
+    Subclasses declare `__slots__`, a unique `TAG` (1-255), their `VERSION` and the names
+    of their stored `FIELDS`, and take the fields positionally, in that order, with
+    defaults for all of them. Other slots are runtime state and are not stored.
+    """
+
+    __slots__ = ()
+
+    TAG: int = 0
+    VERSION: int = 1
+    FIELDS: Tuple[str, ...] = ()
+    DEFAULTS: Tuple[Any, ...] = ()
+
+    def values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    @classmethod
+    def upgrade(cls, version: int, values: Sequence[Any]) -> Sequence[Any]:
+        """Values of a draft written by `version` converted to the current one."""
+        return values
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.FIELDS, self.values()))
+        return f"{type(self).__name__}({fields})"
+
+
+_drafts: Dict[int, Type[Draft]] = {}
+
+
+def register(cls: Type[D]) -> Type[D]:
+    """Class decorator that makes a draft type encodable."""
+    if not 0 < cls.TAG < 256:
+        raise ValueError(f"{cls.__name__}.TAG must be between 1 and 255")
+    if _drafts.get(cls.TAG, cls) is not cls:
+        raise ValueError(f"{cls.__name__}.TAG {cls.TAG} is taken by {_drafts[cls.TAG].__name__}")
+    cls.DEFAULTS = cls().values()
+    _drafts[cls.TAG] = cls
+    return cls
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write(out: bytearray, value: Any) -> None:
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        out.append(INT)
+        _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += _float.pack(value)
+    elif isinstance(value, str):
+        encoded = value.encode()
+        out.append(STR)
+        _write_varint(out, len(encoded))
+        out += encoded
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(BYTES)
+        _write_varint(out, len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out.append(LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _write(out, item)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise CodecError(f"Dict keys must be strings, got {key!r}")
+            _write(out, key)
+            _write(out, item)
+    elif isinstance(value, Draft) and _drafts.get(value.TAG) is type(value):
+        values = value.values()
+        count = len(values)
+        while count and values[count - 1] == value.DEFAULTS[count - 1]:
+            count -= 1
+        out += bytes((DRAFT, value.TAG, value.VERSION))
+        _write_varint(out, count)
+        for item in values[:count]:
+            _write(out, item)
+    else:
+        raise CodecError(f"Can't encode {type(value).__name__}")
+
+
+class _Reader:
+    __slots__ = ("data", "position")
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.position = 0
+
+    def byte(self) -> int:
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def take(self, size: int) -> memoryview:
+        end = self.position + size
+        if end > len(self.data):
+            raise IndexError
+        chunk = self.data[self.position:end]
+        self.position = end
+        return chunk
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def value(self) -> Any:
+        tag = self.byte()
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            value = self.varint()
+            return -((value + 1) >> 1) if value & 1 else value >> 1
+        if tag == FLOAT:
+            return _float.unpack(self.take(8))[0]
+        if tag == STR:
+            return str(self.take(self.varint()), "utf-8")
+        if tag == BYTES:
+            return bytes(self.take(self.varint()))
+        if tag == LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == DICT:
+            items = {}
+            for _ in range(self.varint()):
+                key = self.value()
+                if not isinstance(key, str):
+                    raise CodecError(f"Dict keys must be strings, got {type(key).__name__}")
+                items[key] = self.value()
+            return items
+        if tag == DRAFT:
+            return self.draft()
+        raise CodecError(f"Unknown tag {tag}")
+
+    def draft(self) -> Draft:
+        tag, version = self.byte(), self.byte()
+        cls = _drafts.get(tag)
+        if cls is None:
+            raise CodecError(f"Unknown draft type {tag}")
+        if version > cls.VERSION:
+            raise CodecError(f"{cls.__name__} version {version} is newer than {cls.VERSION}")
+        values = [self.value() for _ in range(self.varint())]
+        if len(values) > len(cls.FIELDS):
+            raise CodecError(f"{cls.__name__} has {len(cls.FIELDS)} fields, got {len(values)}")
+        if version < cls.VERSION:
+            values = list(cls.upgrade(version, values))
+        return cls(*values, *cls.DEFAULTS[len(values):])
+
+
+def dumps(value: Any) -> bytes:
+    out = bytearray()
+    _write(out, value)
+    return bytes(out)
+
+
+def loads(data: bytes) -> Any:
+    reader = _Reader(data)
+    try:
+        value = reader.value()
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise CodecError("Truncated or corrupted data") from e
+    if reader.position != len(reader.data):
+        raise CodecError("Trailing bytes after the encoded value")
+    return value
+
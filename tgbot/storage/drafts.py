@@ -0,0 +1,74 @@
+from typing import Optional, Type, TypeVar
+
+from aiogram.fsm.context import FSMContext
+
+from tgbot.storage.codec import Draft, register
+
+S = TypeVar("S", bound="StateDraft")
+
+
+class StateDraft(Draft):
+    """Draft kept in the FSM data of a user under `STATE_KEY`."""
+
+    __slots__ = ()
+
+    STATE_KEY: str = ""
+
+    @classmethod
+    async def load(cls: Type[S], state: FSMContext) -> S:
+        data = await state.get_data()
+        draft = data.get(cls.STATE_KEY)
+        return draft if isinstance(draft, cls) else cls()
+
+    async def save(self, state: FSMContext) -> None:
+        await state.update_data({self.STATE_KEY: self})
+
+
+@register
+class RegistrationDraft(StateDraft):
+    """Answers of a driver going through registration."""
+
+    __slots__ = ("language", "phone", "first_name", "last_name", "truck_number")
+
+    TAG = 2
+    STATE_KEY = "registration"
+    FIELDS = __slots__
+
+    def __init__(
+        self,
+        language: str = "uz",
+        phone: str = "",
+        first_name: str = "",
+        last_name: str = "",
+        truck_number: str = "",
+    ):
+        self.language = language
+        self.phone = phone
+        self.first_name = first_name
+        self.last_name = last_name
+        self.truck_number = truck_number
+
+
+@register
+class TrackingDraft(StateDraft):
+    """Last live location shared by a driver. `updated_at` is a UTC unix timestamp."""
+
+    __slots__ = ("live_active", "latitude", "longitude", "updated_at", "reminder_active")
+
+    TAG = 3
+    STATE_KEY = "tracking"
+    FIELDS = __slots__
+
+    def __init__(
+        self,
+        live_active: bool = False,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        updated_at: float = 0.0,
+        reminder_active: bool = False,
+    ):
+        self.live_active = live_active
+        self.latitude = latitude
+        self.longitude = longitude
+        self.updated_at = updated_at
+        self.reminder_active = reminder_active
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from tgbot.services.metrics import counter
+from tgbot.storage import codec
+from tgbot.storage.snapshot import Snapshot, encode_record, key_hash, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+evictions_total = counter(
+    "bot_fsm_evictions_total", "Users whose FSM state and data were dropped from memory"
+)
+operations_total = counter(
+    "bot_fsm_operations_total",
+    "FSM storage operations, per storage and operation",
+    ("storage", "operation"),
+)
+get_state_total = operations_total.labels("memory", "get_state")
+set_state_total = operations_total.labels("memory", "set_state")
+get_data_total = operations_total.labels("memory", "get_data")
+set_data_total = operations_total.labels("memory", "set_data")
+
+# Approximate bytes a record costs besides its encoded data: the StorageKey, the record
+# itself and its OrderedDict entry, measured with tracemalloc on CPython 3.11. State
+# names are shared by every user in that state and are not counted.
+RECORD_OVERHEAD = 460
+
+NO_STATE = "-"
+
+
+class _Record:
+    __slots__ = ("hashed", "state", "data", "namespace", "size", "touched")
+
+    def __init__(self, hashed: int):
+        self.hashed = hashed
+        self.state: Optional[str] = None
+        self.data = b""
+        self.namespace = NO_STATE
+        self.size = 0
+        self.touched = 0.0
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    In-memory FSM storage that holds a bounded amount of memory.
+
+    Data is kept encoded with the codec, so every record has a known size and readers get
+    a fresh copy, like with MemoryStorage. Records are kept in least recently used order.
+    Users idle for `idle_ttl` seconds are dropped, and so are the least recently used
+    ones while the total size is over `max_bytes`. Users with neither state nor data take
+    no memory at all.
+
+    Sizes are tracked per namespace, the StatesGroup of the user's state.
+
+    The storage can be written to a snapshot file and restored from it. Restoring only
+    maps the file; a user's record is read from it the first time the user is looked up.
+    Keys that were looked up, written, evicted or cleared since the last snapshot are
+    tombstoned, so the snapshot never brings back records that changed in memory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, idle_ttl: float = 7 * 24 * 3600):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.size = 0
+        self.evicted = 0
+        self._records: "OrderedDict[StorageKey, _Record]" = OrderedDict()
+        self._namespace_users: Dict[str, int] = defaultdict(int)
+        self._namespace_bytes: Dict[str, int] = defaultdict(int)
+        self._snapshot: Optional[Snapshot] = None
+        # Hashes of keys whose snapshot records are outdated
+        self._tombstones: Set[int] = set()
+        # Keys tombstoned while a snapshot is being written, they're outdated in it too
+        self._written_tombstones: Optional[Set[int]] = None
+        self._snapshot_lock = asyncio.Lock()
+
+    def _tombstone(self, hashed: int) -> None:
+        self._tombstones.add(hashed)
+        if self._written_tombstones is not None:
+            self._written_tombstones.add(hashed)
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        record = self._records.get(key)
+        if record is not None:
+            record.touched = time.monotonic()
+            self._records.move_to_end(key)
+            return record
+        if self._snapshot is None:
+            return None
+
+        hashed = key_hash(key)
+        if hashed in self._tombstones:
+            return None
+        self._tombstone(hashed)
+        restored = self._snapshot.get(key, hashed)
+        if restored is None:
+            return None
+        state, data, used_at = restored
+        if time.time() - used_at >= self.idle_ttl:
+            return None
+        self._put(key, state, data)
+        return self._records[key]
+
+    def _account(self, record: _Record, sign: int) -> None:
+        self.size += sign * record.size
+        self._namespace_users[record.namespace] += sign
+        self._namespace_bytes[record.namespace] += sign * record.size
+
+    def _put(self, key: StorageKey, state: Optional[str], data: bytes) -> None:
+        record = self._records.get(key)
+        if record is not None:
+            self._account(record, -1)
+            if state is None and not data:
+                del self._records[key]
+                self._tombstone(record.hashed)
+                return
+        elif state is None and not data:
+            return
+        else:
+            record = self._records[key] = _Record(key_hash(key))
+
+        record.state = state
+        record.data = data
+        record.namespace = state.split(":", 1)[0] if state else NO_STATE
+        record.size = RECORD_OVERHEAD + len(data)
+        record.touched = time.monotonic()
+        self._records.move_to_end(key)
+        self._account(record, 1)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop idle users, then the least recently used ones while over the memory cap."""
+        idle_since = time.monotonic() - self.idle_ttl
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            # The user just written is never dropped for the cap, even if it alone exceeds it
+            over_cap = self.size > self.max_bytes and len(self._records) > 1
+            if record.touched >= idle_since and not over_cap:
+                return
+            del self._records[key]
+            self._account(record, -1)
+            self._tombstone(record.hashed)
+            self.evicted += 1
+            evictions_total.inc()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        set_state_total.inc()
+        state = state.state if isinstance(state, State) else state
+        record = self._get(key)
+        self._put(key, state, record.data if record is not None else b"")
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        get_state_total.inc()
+        record = self._get(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        set_data_total.inc()
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict, got {type(data).__name__}")
+        record = self._get(key)
+        state = record.state if record is not None else None
+        self._put(key, state, codec.dumps(data) if data else b"")
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        get_data_total.inc()
+        record = self._get(key)
+        if record is None or not record.data:
+            return {}
+        return codec.loads(record.data)
+
+    async def close(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def restore(self, path: str) -> int:
+        """
+        Serve users missing in memory from the snapshot at `path`, reading each one lazily.
+        Returns the number of users in the snapshot.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError, codec.CodecError):
+            logger.exception("Could not open the FSM snapshot %s, starting empty", path)
+            return 0
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = snapshot
+        self._tombstones = {record.hashed for record in self._records.values()}
+        return snapshot.count
+
+    def _snapshot_records(
+        self, records: List[Tuple[int, bytes]], previous: Optional[Snapshot], tombstones: Set[int]
+    ) -> Iterator[Tuple[int, bytes]]:
+        yield from records
+        if previous is None:
+            return
+        idle_since = time.time() - self.idle_ttl
+        for hashed, record in previous.raw_records():
+            if hashed in tombstones:
+                continue
+            if codec.loads(record)[3] >= idle_since:
+                yield hashed, bytes(record)
+
+    async def snapshot(self, path: str) -> int:
+        """
+        Write the users in memory and the ones not read from the previous snapshot yet to
+        `path`, then serve lookups from it. Returns the number of users written.
+        """
+        async with self._snapshot_lock:
+            # Records keep when they were last used as unix time, to expire them after a restart
+            offset = time.time() - time.monotonic()
+            records = [
+                (
+                    record.hashed,
+                    encode_record(key, record.state, record.data, record.touched + offset),
+                )
+                for key, record in self._records.items()
+            ]
+            previous = self._snapshot
+            self._written_tombstones = set()
+            try:
+                written = await asyncio.to_thread(
+                    write_snapshot,
+                    path,
+                    self._snapshot_records(records, previous, set(self._tombstones)),
+                )
+                snapshot = Snapshot(path)
+            finally:
+                written_tombstones, self._written_tombstones = self._written_tombstones, None
+
+            self._snapshot = snapshot
+            self._tombstones = written_tombstones | {
+                record.hashed for record in self._records.values()
+            }
+            if previous is not None:
+                previous.close()
+            logger.info("FSM snapshot written to %s: %d users", path, written)
+            return written
+
+    async def snapshot_periodically(self, path: str, interval: float = 300.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.snapshot(path)
+            except Exception:
+                logger.exception("Could not write the FSM snapshot")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._records),
+            "bytes": self.size,
+            "evicted": self.evicted,
+            "namespaces": {
+                namespace: {"users": users, "bytes": self._namespace_bytes[namespace]}
+                for namespace, users in self._namespace_users.items()
+            },
+        }
+
+    async def report_periodically(self, interval: float = 60.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("FSM memory storage: %s", self.stats())
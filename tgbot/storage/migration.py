@@ -0,0 +1,96 @@
+"""
+Conversion of FSM entries written by aiogram's RedisStorage, which the bot used before the
+drafts: the state in "<prefix>:<bot>:<chat>:<user>:<destiny>:state" and the data, one flat
+JSON object, in "...:data".
+
+The flat keys of a flow become its draft, the terminal list that route creation used to
+copy into the data is dropped, and the other keys are kept as they are.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.storage.redis import DefaultKeyBuilder
+
+from tgbot.services.route_draft import RouteDraft
+from tgbot.storage.drafts import RegistrationDraft, TrackingDraft
+
+
+def aiogram_key_builder(prefix: str = "fsm") -> DefaultKeyBuilder:
+    """Key builder the bot configured aiogram's RedisStorage with."""
+    return DefaultKeyBuilder(prefix=prefix, with_bot_id=True, with_destiny=True)
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def convert_data(state: Optional[str], data: Dict[str, Any]) -> Dict[str, Any]:
+    """FSM data in the flat layout of aiogram's RedisStorage, as drafts."""
+    data = dict(data)
+    data.pop("terminals", None)
+    converted: Dict[str, Any] = {}
+    group = state.split(":", 1)[0] if state else None
+
+    if group == "RouteCreationStates":
+        terminal_id = data.pop("selected_terminal_id", None)
+        converted[RouteDraft.STATE_KEY] = RouteDraft(
+            _text(data.pop("language", "uz")),
+            _text(data.pop("truck_number", "")),
+            terminal_id if isinstance(terminal_id, int) else None,
+            _text(data.pop("selected_terminal_name", "")),
+            _text(data.pop("eta_date", "")),
+            _text(data.pop("eta_hour", "")),
+            _text(data.pop("container_name", "")),
+            _text(data.pop("container_size", "")),
+            _text(data.pop("container_type", "")),
+        )
+    elif group == "RegistrationStates":
+        converted[RegistrationDraft.STATE_KEY] = RegistrationDraft(
+            _text(data.pop("language", "uz")),
+            _text(data.pop("phone", "")),
+            _text(data.pop("first_name", "")),
+            _text(data.pop("last_name", "")),
+            _text(data.pop("truck_number", "")),
+        )
+
+    if "live_location_active" in data:
+        latitude, longitude = data.pop("latitude", None), data.pop("longitude", None)
+        converted[TrackingDraft.STATE_KEY] = TrackingDraft(
+            bool(data.pop("live_location_active")),
+            float(latitude) if isinstance(latitude, (int, float)) else None,
+            float(longitude) if isinstance(longitude, (int, float)) else None,
+            _timestamp(data.pop("live_location_last_updated", None)),
+            bool(data.pop("reminder_active", False)),
+        )
+
+    return {**data, **converted}
+
+
+def load_entry(
+    state: Optional[bytes], data: Optional[bytes]
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    State and drafts of the raw values of aiogram's state and data keys. Data that isn't a
+    JSON object is dropped.
+    """
+    decoded_state = state.decode() if state is not None else None
+    try:
+        decoded = json.loads(data) if data else {}
+    except ValueError:
+        decoded = {}
+    if not isinstance(decoded, dict):
+        decoded = {}
+    return decoded_state, convert_data(decoded_state, decoded)
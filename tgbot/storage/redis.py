@@ -0,0 +1,275 @@
+import contextvars
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from redis.asyncio import Redis
+
+from tgbot.services.metrics import counter
+from tgbot.storage import codec, migration
+
+logger = logging.getLogger(__name__)
+
+round_trips_total = counter(
+    "bot_fsm_redis_round_trips_total", "Round trips to Redis for FSM storage"
+)
+operations_total = counter(
+    "bot_fsm_operations_total",
+    "FSM storage operations, per storage and operation",
+    ("storage", "operation"),
+)
+get_state_total = operations_total.labels("redis", "get_state")
+set_state_total = operations_total.labels("redis", "set_state")
+get_data_total = operations_total.labels("redis", "get_data")
+set_data_total = operations_total.labels("redis", "set_data")
+migrated_total = counter(
+    "bot_fsm_redis_migrated_total", "Users moved from aiogram's RedisStorage keys to a hash"
+)
+
+# How long an abandoned flow is kept, by the StatesGroup of its state, in seconds
+FLOW_TTLS = {
+    "RegistrationStates": 24 * 3600,
+    "RouteCreationStates": 2 * 3600,
+    "SupportStates": 24 * 3600,
+    "TerminalStates": 3600,
+}
+
+STATE_FIELD = "s"
+# Every top-level key of the FSM data is a field of its own, e.g. "d:route"
+DATA_PREFIX = "d:"
+
+
+class _Entry:
+    """
+    A user's hash as read from Redis, and the changes made to it since.
+
+    Only the state and the data keys that differ from what was read are written back, so
+    updates that overlap and change different keys - a route step and a live location
+    edit, say - don't overwrite each other's changes.
+    """
+
+    __slots__ = ("state", "fields", "read_state", "read_fields", "dirty")
+
+    def __init__(self, state: Optional[str], fields: Dict[str, bytes]):
+        self.state = state
+        # data key -> its value encoded with the codec
+        self.fields = fields
+        self.read_state = state
+        self.read_fields = dict(fields)
+        self.dirty = False
+
+    @classmethod
+    def from_hash(cls, values: Dict[bytes, bytes]) -> "_Entry":
+        state = values.get(STATE_FIELD.encode())
+        fields = {}
+        for field, value in values.items():
+            field = field.decode()
+            if field.startswith(DATA_PREFIX):
+                fields[field[len(DATA_PREFIX):]] = value
+        return cls(state.decode() if state is not None else None, fields)
+
+    def data(self) -> Dict[str, Any]:
+        return {key: codec.loads(value) for key, value in self.fields.items()}
+
+    def set_data(self, data: Dict[str, Any]) -> None:
+        self.fields = {key: codec.dumps(value) for key, value in data.items()}
+
+
+class _Batch:
+    """FSM entries read and written while processing one update."""
+
+    __slots__ = ("entries", "closed")
+
+    def __init__(self):
+        self.entries: Dict[str, _Entry] = {}
+        self.closed = False
+
+
+_current_batch: contextvars.ContextVar[Optional[_Batch]] = contextvars.ContextVar(
+    "fsm_batch", default=None
+)
+
+
+class PipelinedRedisStorage(BaseStorage):
+    """
+    Redis FSM storage keeping a user's state and data in one hash: the state in field "s"
+    and every top-level key of the data in a field "d:<key>", encoded with the FSM codec.
+
+    Within `batch()` - an update, with StorageBatchMiddleware - a user's hash is read once
+    with HGETALL, later reads are served from that copy, and the changes are sent together
+    in one pipeline when the update is done. Outside a batch every write goes straight to
+    Redis. Only the fields that changed since the hash was read are written, so two
+    updates of the same user running at the same time lose nothing unless they change
+    the same data key or both change the state; then the last one to finish wins.
+
+    Every write sets the hash to expire, after the TTL of the flow its state belongs to
+    (`flow_ttls`, by StatesGroup) or `default_ttl`, so abandoned flows clean themselves up.
+
+    Users stored by aiogram's RedisStorage, in separate state and data keys with flat JSON
+    data, are read along with the hash in the same round trip. When a user has no hash yet
+    but has those keys, they are converted to drafts, written as a hash and deleted.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "fsm",
+        default_ttl: float = 7 * 24 * 3600,
+        flow_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.flow_ttls = FLOW_TTLS if flow_ttls is None else flow_ttls
+        self.aiogram_keys = migration.aiogram_key_builder(prefix)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "PipelinedRedisStorage":
+        return cls(Redis.from_url(url), **kwargs)
+
+    def _key(self, key: StorageKey) -> str:
+        parts = [self.prefix, str(key.bot_id), str(key.chat_id), str(key.user_id)]
+        if key.thread_id:
+            parts.append(str(key.thread_id))
+        if key.business_connection_id:
+            parts.append(key.business_connection_id)
+        parts.append(key.destiny)
+        return ":".join(parts)
+
+    def ttl(self, state: Optional[str]) -> int:
+        group = state.split(":", 1)[0] if state else None
+        return int(self.flow_ttls.get(group, self.default_ttl))
+
+    async def _entry(self, key: StorageKey, redis_key: str) -> _Entry:
+        batch = _current_batch.get()
+        if batch is not None and not batch.closed:
+            entry = batch.entries.get(redis_key)
+            if entry is not None:
+                return entry
+
+        entry = await self._read(key, redis_key)
+        if batch is not None and not batch.closed:
+            batch.entries[redis_key] = entry
+        return entry
+
+    async def _read(self, key: StorageKey, redis_key: str) -> _Entry:
+        state_key = self.aiogram_keys.build(key, "state")
+        data_key = self.aiogram_keys.build(key, "data")
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.hgetall(redis_key)
+        pipeline.get(state_key)
+        pipeline.get(data_key)
+        values, state, data = await pipeline.execute()
+        round_trips_total.inc()
+        if values or (state is None and data is None):
+            return _Entry.from_hash(values)
+
+        state, converted = migration.load_entry(state, data)
+        entry = _Entry(None, {})
+        entry.state = state
+        entry.set_data(converted)
+        pipeline = self.redis.pipeline(transaction=False)
+        self._write(pipeline, redis_key, entry)
+        pipeline.delete(state_key, data_key)
+        await pipeline.execute()
+        round_trips_total.inc()
+        migrated_total.inc()
+        logger.info("Moved the FSM entry of %s from aiogram's RedisStorage keys", redis_key)
+        return entry
+
+    def _write(self, pipeline, redis_key: str, entry: _Entry) -> bool:
+        """
+        Queue the changes made since the entry was read, which then counts as read as
+        written. Returns whether there were any.
+        """
+        removed = [DATA_PREFIX + key for key in entry.read_fields if key not in entry.fields]
+        mapping = {
+            DATA_PREFIX + key: value
+            for key, value in entry.fields.items()
+            if entry.read_fields.get(key) != value
+        }
+        if entry.state != entry.read_state:
+            if entry.state is None:
+                removed.append(STATE_FIELD)
+            else:
+                mapping[STATE_FIELD] = entry.state
+        if not removed and not mapping:
+            return False
+
+        if removed:
+            pipeline.hdel(redis_key, *removed)
+        if mapping:
+            pipeline.hset(redis_key, mapping=mapping)
+        # Redis drops the hash once its last field is deleted, and the expiry with it
+        pipeline.expire(redis_key, self.ttl(entry.state))
+
+        entry.read_state = entry.state
+        entry.read_fields = dict(entry.fields)
+        return True
+
+    async def _changed(self, redis_key: str, entry: _Entry) -> None:
+        batch = _current_batch.get()
+        if batch is not None and not batch.closed and batch.entries.get(redis_key) is entry:
+            entry.dirty = True
+            return
+
+        pipeline = self.redis.pipeline(transaction=False)
+        if self._write(pipeline, redis_key, entry):
+            await pipeline.execute()
+            round_trips_total.inc()
+
+    async def _flush(self, batch: _Batch) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        changed = False
+        for redis_key, entry in batch.entries.items():
+            if entry.dirty:
+                changed = self._write(pipeline, redis_key, entry) or changed
+        if changed:
+            await pipeline.execute()
+            round_trips_total.inc()
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Serve reads from memory and pipeline the writes until the block exits."""
+        if _current_batch.get() is not None:
+            yield
+            return
+
+        batch = _Batch()
+        token = _current_batch.set(batch)
+        try:
+            yield
+        finally:
+            # Tasks started within the batch write straight to Redis from now on
+            batch.closed = True
+            _current_batch.reset(token)
+            await self._flush(batch)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        set_state_total.inc()
+        redis_key = self._key(key)
+        entry = await self._entry(key, redis_key)
+        entry.state = state.state if isinstance(state, State) else state
+        await self._changed(redis_key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        get_state_total.inc()
+        return (await self._entry(key, self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        set_data_total.inc()
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict, got {type(data).__name__}")
+        redis_key = self._key(key)
+        entry = await self._entry(key, redis_key)
+        entry.set_data(data)
+        await self._changed(redis_key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        get_data_total.inc()
+        return (await self._entry(key, self._key(key))).data()
+
+    async def close(self) -> None:
+        await self.redis.aclose()
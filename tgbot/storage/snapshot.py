@@ -0,0 +1,126 @@
+"""
+Snapshot file of the in-memory FSM storage.
+
+Layout: a header, the records one after another, then an index of fixed size entries
+(key hash, record offset, record length) sorted by key hash. A record is the codec
+encoding of [key fields, state, encoded data, last used unix time].
+
+The file is memory-mapped and looked up with a binary search over the index, so opening
+it costs the same for any number of users, and only the records that are used are read.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from aiogram.fsm.storage.base import StorageKey
+
+from tgbot.storage import codec
+
+MAGIC = b"T2TFSM\x00\x01"
+_header = struct.Struct("<8sQQ")  # magic, record count, index offset
+_entry = struct.Struct("<QQI")  # key hash, record offset, record length
+
+# (state, encoded data, last used unix time)
+SnapshotRecord = Tuple[Optional[str], bytes, float]
+
+
+def key_fields(key: StorageKey) -> list:
+    return [
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id,
+        key.business_connection_id,
+        key.destiny,
+    ]
+
+
+def key_hash(key: StorageKey) -> int:
+    digest = hashlib.blake2b(codec.dumps(key_fields(key)), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class Snapshot:
+    """A snapshot file opened for lookups."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _header.size:
+            self._map.close()
+            raise codec.CodecError(f"{path} is truncated")
+        magic, self.count, self._index = _header.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise codec.CodecError(f"{path} is not an FSM snapshot")
+        if self._index + self.count * _entry.size > len(self._map):
+            self._map.close()
+            raise codec.CodecError(f"{path} is truncated")
+
+    def _entry(self, position: int) -> Tuple[int, int, int]:
+        return _entry.unpack_from(self._map, self._index + position * _entry.size)
+
+    def get(self, key: StorageKey, hashed: Optional[int] = None) -> Optional[SnapshotRecord]:
+        hashed = key_hash(key) if hashed is None else hashed
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < hashed:
+                low = middle + 1
+            else:
+                high = middle
+
+        fields = key_fields(key)
+        # Keys whose hashes collide are next to each other
+        while low < self.count:
+            entry_hash, offset, length = self._entry(low)
+            if entry_hash != hashed:
+                break
+            stored_fields, state, data, used_at = codec.loads(self._map[offset:offset + length])
+            if stored_fields == fields:
+                return state, data, used_at
+            low += 1
+        return None
+
+    def raw_records(self) -> Iterator[Tuple[int, bytes]]:
+        """(key hash, encoded record) of every record, in index order."""
+        for position in range(self.count):
+            entry_hash, offset, length = self._entry(position)
+            yield entry_hash, self._map[offset:offset + length]
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def encode_record(key: StorageKey, state: Optional[str], data: bytes, used_at: float) -> bytes:
+    return codec.dumps([key_fields(key), state, data, used_at])
+
+
+def write_snapshot(path: str, records: Iterable[Tuple[int, bytes]]) -> int:
+    """
+    Write (key hash, encoded record) pairs to a snapshot file, atomically replacing it.
+    Returns the number of records written.
+    """
+    index: List[Tuple[int, int, int]] = []
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(_header.pack(MAGIC, 0, 0))
+        offset = _header.size
+        for hashed, record in records:
+            file.write(record)
+            index.append((hashed, offset, len(record)))
+            offset += len(record)
+
+        index.sort()
+        for entry in index:
+            file.write(_entry.pack(*entry))
+        file.seek(0)
+        file.write(_header.pack(MAGIC, len(index), offset))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return len(index)
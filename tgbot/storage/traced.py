@@ -0,0 +1,35 @@
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from tgbot.services.tracing import span
+
+
+class TracedStorage(BaseStorage):
+    """FSM storage wrapper that runs every call of the wrapped storage in a span."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        with span("fsm set_state"):
+            await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        with span("fsm get_state"):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        with span("fsm set_data"):
+            await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        with span("fsm get_data"):
+            return await self.storage.get_data(key)
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        with span("fsm update_data"):
+            return await super().update_data(key, data)
+
+    async def close(self) -> None:
+        await self.storage.close()